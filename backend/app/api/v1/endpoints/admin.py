@@ -4,7 +4,18 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 
-from app.core.database import get_database
+from app.core.database import get_database, get_analytics_database
+from app.core.config import settings
+from app.core.query_profiler import query_profiler
+from app.core.pool_metrics import pool_metrics
+from app.search import post_search, related_posts
+from app.core.view_counter import view_counter
+from app.core.feed_cache import feed_cache
+from app.core.user_cache import user_cache
+from app.core.llm_cache import llm_response_cache
+from app.core.llm_client import llm_client
+from app.core.diagnosis_jobs import diagnosis_jobs
+from app.core.hot_ranking import hot_ranking
 from app.schemas.user import User
 from app.schemas.admin import (
     AdminUserUpdate,
@@ -18,6 +29,10 @@ from app.schemas.category import CategoryResponse, CategoryCreate, CategoryUpdat
 from app.schemas.tag import TagResponse, TagCreate, TagUpdate
 from app.services.admin_service import AdminService
 from app.services.audit_log_service import AuditLogService
+from app.services.answer_service import AnswerService
+from app.services.post_summary_service import PostSummaryService, TAG_SUMMARY_FIELDS
+from app.core.background import run_in_background
+from app.utils.db_helpers import paginate
 from app.api.v1.endpoints.users import get_current_user
 from app.models.user import UserRole, UserStatus
 from app.models.audit_log import AuditAction
@@ -59,7 +74,7 @@ async def get_current_admin(
 @router.get("/stats")
 async def get_admin_stats(
     current_admin: User = Depends(get_current_admin),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_analytics_database)
 ):
     """
     Get dashboard statistics
@@ -135,11 +150,182 @@ async def get_admin_stats(
         raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {str(e)}")
 
 
+@router.get("/query-profile")
+async def get_query_profile(
+    limit: int = Query(20, ge=1, le=100, description="Number of query shapes to return"),
+    refresh: bool = Query(False, description="Run explain() on the top shapes before reporting"),
+    current_admin: User = Depends(get_current_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the query-shape profile and index advice
+
+    Returns the most expensive query shapes recorded by the profiler with
+    their latest explain() analysis (collection scans, in-memory sorts,
+    docs examined per document returned) and the indexes reported as
+    unused by $indexStats.
+
+    Requires QUERY_PROFILER_ENABLED; meant for development and staging.
+    """
+    if not settings.QUERY_PROFILER_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Query profiler is disabled"
+        )
+
+    try:
+        return await query_profiler.get_report(db, limit=limit, refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build query profile: {str(e)}")
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get live MongoDB connection pool statistics
+
+    Returns open/checked-out connection counts, the number of requests
+    waiting for a connection and checkout wait percentiles, along with the
+    configured pool limits.
+    """
+    return {
+        "config": {
+            "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+            "max_idle_time_ms": settings.MONGODB_MAX_IDLE_TIME_MS,
+            "wait_queue_timeout_ms": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "server_selection_timeout_ms": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "compressors": settings.MONGODB_COMPRESSORS
+        },
+        "stats": pool_metrics.snapshot()
+    }
+
+
+@router.get("/search-index")
+async def get_search_index_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get post search index state
+
+    Returns whether the index is serving searches, its size and the newest
+    post update it has caught up to.
+    """
+    return {
+        "enabled": settings.SEARCH_ENGINE_ENABLED,
+        "stats": post_search.stats()
+    }
+
+
+@router.get("/related-posts")
+async def get_related_posts_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get related posts engine state
+
+    Returns the size of the vocabulary and tag co-occurrence data and how
+    long the last matrix refresh took.
+    """
+    return {
+        "enabled": settings.RELATED_POSTS_ENABLED,
+        "stats": related_posts.stats()
+    }
+
+
+@router.get("/view-counter")
+async def get_view_counter_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get this worker's buffered post view counts
+
+    Returns how many views are waiting for the next flush and how many
+    were written so far.
+    """
+    return view_counter.stats()
+
+
+@router.get("/hot-ranking")
+async def get_hot_ranking_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get the hot ranking job state
+
+    Returns how many posts are ranked and how long the last run took and
+    how many posts it rescored.
+    """
+    return {
+        "enabled": settings.HOT_RANKING_ENABLED,
+        "stats": hot_ranking.stats()
+    }
+
+
+@router.get("/feed-cache")
+async def get_feed_cache_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get this worker's hot feed cache size and hit counts
+    """
+    return {
+        "enabled": settings.FEED_CACHE_ENABLED,
+        "stats": feed_cache.stats()
+    }
+
+
+@router.get("/user-cache")
+async def get_user_cache_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get this worker's user summary cache size and hit counts
+    """
+    return {
+        "enabled": settings.USER_CACHE_ENABLED,
+        "stats": user_cache.stats()
+    }
+
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get this worker's LLM response cache state
+
+    Returns hit rates and the provider seconds saved per prompt type, next
+    to the calls that did reach the provider.
+    """
+    return {
+        "enabled": settings.LLM_CACHE_ENABLED,
+        "stats": llm_response_cache.stats(),
+        "client": llm_client.stats()
+    }
+
+
+@router.get("/diagnosis-jobs")
+async def get_diagnosis_job_stats(
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Get the background diagnosis job queue state
+
+    Returns the number of queued and running jobs, and how many jobs this
+    worker ran, retried and recovered from expired leases with their
+    queueing and running latencies.
+    """
+    return await diagnosis_jobs.stats()
+
+
 @router.get("/activities")
 async def get_recent_activities(
     limit: int = Query(10, ge=1, le=50, description="Maximum number of activities to return"),
     current_admin: User = Depends(get_current_admin),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_analytics_database)
 ):
     """
     Get recent activities for dashboard
@@ -199,7 +385,7 @@ async def get_recent_activities(
 async def get_user_registration_chart(
     days: int = Query(7, ge=1, le=30, description="Number of days to retrieve"),
     current_admin: User = Depends(get_current_admin),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_analytics_database)
 ):
     """
     Get user registration counts by day for chart visualization
@@ -256,7 +442,7 @@ async def get_user_registration_chart(
 @router.get("/charts/posts-by-category")
 async def get_posts_by_category_chart(
     current_admin: User = Depends(get_current_admin),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_analytics_database)
 ):
     """
     Get post counts grouped by category for chart visualization
@@ -1110,6 +1296,13 @@ async def update_tag_admin(
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="No changes made")
+
+        # Refresh the tag summary embedded on posts carrying the tag
+        if any(field in update_data for field in TAG_SUMMARY_FIELDS):
+            run_in_background(
+                PostSummaryService(db).fan_out_tag(tag_id),
+                f"tag fan-out for tag {tag_id}"
+            )
         
         # Return updated tag
         updated_tag = await db.tags.find_one({"_id": obj_id})
@@ -1238,9 +1431,8 @@ async def get_posts_admin(
         # Calculate skip
         skip = (page - 1) * limit
         
-        # Get posts with author information
-        pipeline = [
-            {"$match": query},
+        # Get posts with author information and the total count
+        author_lookup = [
             {
                 "$lookup": {
                     "from": "users",
@@ -1249,17 +1441,13 @@ async def get_posts_admin(
                     "as": "author"
                 }
             },
-            {"$unwind": "$author"},
-            {"$sort": {"created_at": -1}},
-            {"$skip": skip},
-            {"$limit": limit}
+            {"$unwind": "$author"}
         ]
-        
-        posts_cursor = db.posts.aggregate(pipeline)
-        posts = await posts_cursor.to_list(None)
-        
-        # Get total count
-        total = await db.posts.count_documents(query)
+        posts, total, _ = await paginate(
+            db.posts, query, skip, limit,
+            sort=[("created_at", -1)],
+            page_stages=author_lookup
+        )
         
         # Format response
         formatted_posts = []
@@ -1322,12 +1510,19 @@ async def delete_post_admin(
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Post not found")
+
+        post_search.remove_post(obj_id)
+        related_posts.remove_post(obj_id)
+        feed_cache.invalidate_post(post)
         
         # Log the admin action (simplified for now)
         # TODO: Add proper audit logging later
         
-        # Also delete related answers if any
+        # Also delete related answers, their votes and moved comments if any
+        answer_ids = await db.answers.distinct("_id", {"post_id": obj_id})
         await db.answers.delete_many({"post_id": obj_id})
+        await db.answer_votes.delete_many({"answer_id": {"$in": answer_ids}})
+        await db.answer_comments.delete_many({"answer_id": {"$in": answer_ids}})
         
         return None
         
@@ -1456,10 +1651,13 @@ async def delete_answer_admin(
         
         # Decrement answer count on the post
         if post_id:
-            await db.posts.update_one(
+            post = await db.posts.find_one_and_update(
                 {"_id": post_id},
-                {"$inc": {"answer_count": -1}}
+                {"$inc": {"answer_count": -1}},
+                projection={"category": 1, "tag_ids": 1}
             )
+            if post:
+                feed_cache.invalidate_post(post)
         
         return {"message": "Answer deleted successfully", "reason": delete_request.reason}
         
@@ -1482,34 +1680,15 @@ async def delete_comment_admin(
     """
     try:
         # Validate ObjectIds
-        try:
-            answer_obj_id = ObjectId(answer_id)
-            comment_obj_id = ObjectId(comment_id)
-        except Exception:
+        if not ObjectId.is_valid(answer_id) or not ObjectId.is_valid(comment_id):
             raise HTTPException(status_code=400, detail="Invalid ID format")
         
-        # Check if answer exists and has the comment
-        answer = await db.answers.find_one({
-            "_id": answer_obj_id,
-            "is_deleted": {"$ne": True},
-            "comments.id": comment_obj_id
-        })
+        # Remove the comment, from the embedded thread or answer_comments
+        answer = await AnswerService(db).delete_comment(answer_id, comment_id)
         
         if not answer:
             raise HTTPException(status_code=404, detail="Answer or comment not found")
         
-        # Remove the comment from the answer
-        result = await db.answers.update_one(
-            {"_id": answer_obj_id},
-            {
-                "$pull": {"comments": {"id": comment_obj_id}},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-        
-        if result.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Comment not found")
-        
         # Log the deletion (optional: could be stored in a separate audit log)
         # For now, we just return success with the reason
         
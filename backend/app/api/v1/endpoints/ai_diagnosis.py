@@ -5,22 +5,28 @@ This module provides REST API endpoints for AI-powered lecture analysis,
 question generation, and student evaluation.
 """
 
+import time
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel
 
-from app.core.database import get_database
+from app.core.config import settings
+from app.core.database import get_database, get_listing_database, causal_session
+from app.core.diagnosis_jobs import diagnosis_jobs
 from app.schemas.ai_diagnosis import (
     AIDiagnosisCreate,
     AIDiagnosisUpdate,
     AIDiagnosis,
     QuestionAnswerSubmit,
     DiagnosisEvaluation,
+    DiagnosisJobAccepted,
     InputSchema,
     LearnerProfileSchema
 )
 from app.services.ai_diagnosis_service import AIDiagnosisService
+from app.models.ai_diagnosis import AIDiagnosisModel, DiagnosisStatus
+from app.core.serialization import DocumentEncoder, FastJSONResponse
 from app.api.v1.endpoints.users import get_current_user
 from app.schemas.user import User
 from app.i18n.dependencies import get_translator, Translator
@@ -28,6 +34,9 @@ from app.i18n.dependencies import get_translator, Translator
 
 router = APIRouter()
 
+# Shapes raw diagnosis documents like AIDiagnosisModel(**doc).model_dump(by_alias=True)
+DIAGNOSIS_ENCODER = DocumentEncoder(AIDiagnosisModel)
+
 
 def get_diagnosis_service(
     db: AsyncIOMotorDatabase = Depends(get_database)
@@ -36,6 +45,13 @@ def get_diagnosis_service(
     return AIDiagnosisService(db)
 
 
+def get_diagnosis_listing_service(
+    db: AsyncIOMotorDatabase = Depends(get_listing_database)
+) -> AIDiagnosisService:
+    """Dependency to get AI diagnosis service reading from the listing read preference."""
+    return AIDiagnosisService(db)
+
+
 # =============================================================================
 # Request/Response Schemas
 # =============================================================================
@@ -56,6 +72,14 @@ class DiagnosisListResponse(BaseModel):
     total: int
 
 
+def is_pending(diagnosis: dict) -> bool:
+    """Whether a background step of a diagnosis document is still running."""
+    return (
+        diagnosis.get("status") == DiagnosisStatus.PENDING
+        or diagnosis.get("questions_status") == DiagnosisStatus.PENDING
+    )
+
+
 # =============================================================================
 # Endpoints
 # =============================================================================
@@ -74,7 +98,8 @@ async def create_diagnosis(
     - **input**: The lecture content (type: text/audio, content: string)
     - **learner_profile**: Student background (nationality, level)
     """
-    diagnosis = await service.create_diagnosis(diagnosis_data, current_user.id)
+    async with causal_session(current_user.email) as session:
+        diagnosis = await service.create_diagnosis(diagnosis_data, current_user.id, session=session)
     
     # Convert to response format
     result = diagnosis.model_dump(by_alias=True)
@@ -84,7 +109,7 @@ async def create_diagnosis(
     return result
 
 
-@router.post("/form", status_code=status.HTTP_201_CREATED)
+@router.post("/form", status_code=status.HTTP_202_ACCEPTED)
 async def create_diagnosis_from_form(
     lesson_content: str = Form(default=""),
     nationality: str = Form(...),
@@ -107,6 +132,10 @@ async def create_diagnosis_from_form(
     - **age**: Student age
     - **subject**: Subject of the lesson
     - **audio_file**: Optional audio file upload
+    
+    Returns as soon as the diagnosis is created; the analysis runs in the
+    background. Poll ``GET /diagnoses/{id}?wait=...`` until its status is
+    no longer pending.
     """
     import datetime
     
@@ -140,14 +169,20 @@ async def create_diagnosis_from_form(
     )
     
     # Create diagnosis
-    diagnosis = await service.create_diagnosis(diagnosis_data, current_user.id, subject=subject)
+    async with causal_session(current_user.email) as session:
+        diagnosis = await service.create_diagnosis(
+            diagnosis_data, current_user.id, subject=subject, session=session
+        )
     
-    # Trigger analysis
-    analyzed_diagnosis = await service.analyze_lecture(str(diagnosis.id), current_user.id)
+    # Analyze in the background, the client polls GET /diagnoses/{id}
+    job = await service.request_analysis(str(diagnosis.id), current_user.id)
     
-    # Build response matching expected frontend format
-    result = {
+    # Build response matching expected frontend format; the analysis
+    # results are read from the diagnosis once it is completed
+    return {
         "_id": str(diagnosis.id),
+        "status": diagnosis.status,
+        "job_id": str(job["_id"]),
         "subject": subject,
         "level": level,
         "age": age,
@@ -155,46 +190,6 @@ async def create_diagnosis_from_form(
         "uploaded_files": uploaded_files,
         "created_at": datetime.datetime.now().isoformat(),
     }
-    
-    # Add AI analysis results if available
-    if analyzed_diagnosis and analyzed_diagnosis.ai_result:
-        ai_result = analyzed_diagnosis.ai_result
-        result["difficulty_points"] = ai_result.misunderstanding_points or [
-            "専門用語の定義が明確ではなく、混乱しやすい。",
-            "図や例が少なく、内容の流れを追いにくい。"
-        ]
-        result["difficulty_level"] = "high" if len(ai_result.misunderstanding_points) > 2 else "medium" if ai_result.misunderstanding_points else "low"
-        result["comprehension_scores"] = {
-            "logic": 60,
-            "examples": 40,
-            "level_fit": 80
-        }
-        result["suggestions"] = ai_result.suggestions if ai_result.suggestions else [
-            "抽象的な部分を、具体例やイラストで補足する。",
-            "専門用語を使う前に、簡単な言葉で説明する。",
-            "段階的に説明して、理解を確認しながら進める。",
-            "動画や図表など、視覚的な教材を活用する。"
-        ]
-    else:
-        # Mock data for testing
-        result["difficulty_points"] = [
-            "専門用語の定義が明確ではなく、混乱しやすい。",
-            "図や例が少なく、内容の流れを追いにくい。"
-        ]
-        result["difficulty_level"] = "high"
-        result["comprehension_scores"] = {
-            "logic": 60,
-            "examples": 40,
-            "level_fit": 80
-        }
-        result["suggestions"] = [
-            "抽象的な部分を、具体例やイラストで補足する。",
-            "専門用語を使う前に、簡単な言葉で説明する。",
-            "段階的に説明して、理解を確認しながら進める。",
-            "動画や図表など、視覚的な教材を活用する。"
-        ]
-    
-    return result
 
 
 @router.post("/{diagnosis_id}/save", status_code=status.HTTP_200_OK)
@@ -230,7 +225,7 @@ async def list_diagnoses(
     start_date: Optional[str] = Query(None, description="Start date filter (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date filter (YYYY-MM-DD)"),
     current_user: User = Depends(get_current_user),
-    service: AIDiagnosisService = Depends(get_diagnosis_service),
+    service: AIDiagnosisService = Depends(get_diagnosis_listing_service),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -260,47 +255,53 @@ async def list_diagnoses(
         except ValueError:
             pass
     
-    diagnoses = await service.get_diagnoses_by_user(
-        current_user.id,
-        skip=skip,
-        limit=limit,
-        search=search,
-        subject=subject,
-        start_date=parsed_start_date,
-        end_date=parsed_end_date
-    )
-    total = await service.count_diagnoses_by_user(
-        current_user.id,
-        search=search,
-        subject=subject,
-        start_date=parsed_start_date,
-        end_date=parsed_end_date
-    )
+    async with causal_session(current_user.email) as session:
+        diagnoses, total = await service.get_diagnoses_by_user(
+            current_user.id,
+            skip=skip,
+            limit=limit,
+            search=search,
+            subject=subject,
+            start_date=parsed_start_date,
+            end_date=parsed_end_date,
+            session=session
+        )
     
-    result = []
-    for d in diagnoses:
-        d_dict = d.model_dump(by_alias=True)
-        d_dict["_id"] = str(d_dict["_id"])
-        d_dict["user_id"] = str(d_dict["user_id"])
-        # Convert question IDs
-        for q in d_dict.get("generated_questions", []):
-            q["id"] = str(q["id"])
-        result.append(d_dict)
+    result = DIAGNOSIS_ENCODER.encode_many(diagnoses)
     
-    return {"diagnoses": result, "total": total}
+    return FastJSONResponse({"diagnoses": result, "total": total})
 
 
 @router.get("/{diagnosis_id}")
 async def get_diagnosis(
     diagnosis_id: str,
+    wait: int = Query(
+        0, ge=0, le=settings.DIAGNOSIS_WAIT_MAX_SECONDS,
+        description="Seconds to wait for a pending analysis or question generation to finish"
+    ),
     current_user: User = Depends(get_current_user),
     service: AIDiagnosisService = Depends(get_diagnosis_service),
     t: Translator = Depends(get_translator)
 ):
     """
     Get a specific diagnosis by ID.
+    
+    With ``wait``, a diagnosis whose analysis (``status``) or question
+    generation (``questions_status``) is pending is returned once that
+    step finishes, or after ``wait`` seconds, whichever comes first.
     """
-    diagnosis = await service.get_diagnosis_by_id(diagnosis_id, current_user.id)
+    diagnosis = await service.get_diagnosis_document(diagnosis_id, current_user.id)
+    
+    deadline = time.monotonic() + wait
+    while diagnosis and is_pending(diagnosis):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Jobs finished by this worker wake us up, others are seen on the next read
+        await diagnosis_jobs.wait_for_update(
+            diagnosis_id, min(remaining, settings.DIAGNOSIS_JOB_POLL_SECONDS)
+        )
+        diagnosis = await service.get_diagnosis_document(diagnosis_id, current_user.id)
     
     if not diagnosis:
         raise HTTPException(
@@ -308,13 +309,7 @@ async def get_diagnosis(
             detail=t("errors.not_found")
         )
     
-    result = diagnosis.model_dump(by_alias=True)
-    result["_id"] = str(result["_id"])
-    result["user_id"] = str(result["user_id"])
-    for q in result.get("generated_questions", []):
-        q["id"] = str(q["id"])
-    
-    return result
+    return FastJSONResponse(DIAGNOSIS_ENCODER.encode(diagnosis))
 
 
 @router.put("/{diagnosis_id}")
@@ -328,9 +323,10 @@ async def update_diagnosis(
     """
     Update a diagnosis (title, status, etc.).
     """
-    diagnosis = await service.update_diagnosis(
-        diagnosis_id, update_data, current_user.id
-    )
+    async with causal_session(current_user.email) as session:
+        diagnosis = await service.update_diagnosis(
+            diagnosis_id, update_data, current_user.id, session=session
+        )
     
     if not diagnosis:
         raise HTTPException(
@@ -357,7 +353,8 @@ async def delete_diagnosis(
     """
     Delete a diagnosis.
     """
-    success = await service.delete_diagnosis(diagnosis_id, current_user.id)
+    async with causal_session(current_user.email) as session:
+        success = await service.delete_diagnosis(diagnosis_id, current_user.id, session=session)
     
     if not success:
         raise HTTPException(
@@ -368,7 +365,11 @@ async def delete_diagnosis(
     return None
 
 
-@router.post("/{diagnosis_id}/analyze")
+@router.post(
+    "/{diagnosis_id}/analyze",
+    response_model=DiagnosisJobAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
 async def analyze_lecture(
     diagnosis_id: str,
     current_user: User = Depends(get_current_user),
@@ -382,32 +383,31 @@ async def analyze_lecture(
     - Identify potentially confusing points
     - Simulate how students might misunderstand
     - Suggest optimized explanations
+    
+    The analysis runs in the background: the diagnosis is pending until it
+    completes or fails, poll ``GET /diagnoses/{id}?wait=...`` for it.
     """
-    try:
-        diagnosis = await service.analyze_lecture(diagnosis_id, current_user.id)
-        
-        if not diagnosis:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=t("errors.not_found")
-            )
-        
-        result = diagnosis.model_dump(by_alias=True)
-        result["_id"] = str(result["_id"])
-        result["user_id"] = str(result["user_id"])
-        for q in result.get("generated_questions", []):
-            q["id"] = str(q["id"])
-        
-        return result
-        
-    except Exception as e:
+    job = await service.request_analysis(diagnosis_id, current_user.id)
+    
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Analysis failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=t("errors.not_found")
         )
+    
+    return DiagnosisJobAccepted(
+        diagnosis_id=diagnosis_id,
+        job_id=str(job["_id"]),
+        kind=job["kind"],
+        status=job["status"]
+    )
 
 
-@router.post("/{diagnosis_id}/generate-questions")
+@router.post(
+    "/{diagnosis_id}/generate-questions",
+    response_model=DiagnosisJobAccepted,
+    status_code=status.HTTP_202_ACCEPTED
+)
 async def generate_questions(
     diagnosis_id: str,
     request: QuestionGenerationRequest = QuestionGenerationRequest(),
@@ -423,36 +423,32 @@ async def generate_questions(
     Questions focus on commonly misunderstood points and can be:
     - Multiple choice (4 options)
     - Short answer
+    
+    The questions are generated in the background: ``questions_status`` is
+    pending until they are stored, poll ``GET /diagnoses/{id}?wait=...``.
     """
     try:
-        diagnosis = await service.generate_questions(
+        job = await service.request_questions(
             diagnosis_id, current_user.id, request.num_questions
         )
-        
-        if not diagnosis:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=t("errors.not_found")
-            )
-        
-        result = diagnosis.model_dump(by_alias=True)
-        result["_id"] = str(result["_id"])
-        result["user_id"] = str(result["user_id"])
-        for q in result.get("generated_questions", []):
-            q["id"] = str(q["id"])
-        
-        return result
-        
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    except Exception as e:
+    
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Question generation failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=t("errors.not_found")
         )
+    
+    return DiagnosisJobAccepted(
+        diagnosis_id=diagnosis_id,
+        job_id=str(job["_id"]),
+        kind=job["kind"],
+        status=job["status"]
+    )
 
 
 @router.post("/{diagnosis_id}/evaluate", response_model=DiagnosisEvaluation)
@@ -471,6 +467,7 @@ async def evaluate_answers(
     - Number of correct answers
     - Score percentage
     - Detailed feedback
+    - Grading metadata (per short answer latency, partial result flag)
     """
     try:
         result = await service.evaluate_answers(
@@ -1,20 +1,30 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from typing import List, Optional
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_database
-from app.schemas.answer import Answer, AnswerCreate, AnswerUpdate, CommentCreate
+from app.core.http_cache import PRIVATE_REVALIDATE, REVALIDATE, conditional_json
+from app.core.serialization import DocumentEncoder, FastJSONResponse
+from app.core.loaders import DataLoaders, get_loaders
+from app.schemas.answer import Answer, AnswerCreate, AnswerUpdate, CommentCreate, CommentPage
 from app.services.answer_service import AnswerService
 from app.services.post_service import PostService
 from app.services.notification_service import NotificationService
 from app.services.user_service import UserService
-from app.api.v1.endpoints.users import get_current_user
+from app.api.v1.endpoints.users import get_current_user, get_optional_token_subject
 from app.schemas.user import User
 from app.i18n.dependencies import get_translator, Translator
 from app.models.notification import NotificationType
+from app.models.answer import AnswerModel, CommentModel
+from app.utils.db_helpers import InvalidCursorError
 
 router = APIRouter()
 
+# Shapes raw answer documents like AnswerModel(**doc).model_dump(by_alias=True)
+ANSWER_ENCODER = DocumentEncoder(AnswerModel)
+COMMENT_ENCODER = DocumentEncoder(CommentModel)
+
 
 def get_answer_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> AnswerService:
     """
@@ -54,15 +64,16 @@ async def send_answer_notification(
     """
     Send notification to post author and bookmarked users when someone answers
     """
-    post = await post_service.get_post_by_id(post_id)
-    if not post:
+    posts = await post_service.get_posts_by_ids([post_id], {"author_id": 1})
+    if not posts:
         return
+    post_author_id = str(posts[0]["author_id"])
     
     # Notify post author
-    if str(post.author_id) != answer_author_id:
-        print(f"[DEBUG] Creating notification for post author {post.author_id}, answerer: {answer_author_id}")
+    if post_author_id != answer_author_id:
+        print(f"[DEBUG] Creating notification for post author {post_author_id}, answerer: {answer_author_id}")
         await notification_service.create_notification(
-            user_id=str(post.author_id),
+            user_id=post_author_id,
             notification_type=NotificationType.NEW_ANSWER,
             message="Có câu trả lời mới cho bài viết của bạn",
             link=f"/forum/{post_id}",
@@ -82,7 +93,7 @@ async def send_answer_notification(
     # Notify bookmarked users (except the answer author and post author)
     for user in bookmarked_users:
         user_id = str(user["_id"])
-        if user_id not in [answer_author_id, str(post.author_id)]:
+        if user_id not in [answer_author_id, post_author_id]:
             print(f"[DEBUG] Creating notification for bookmarked user {user_id}")
             await notification_service.create_notification(
                 user_id=user_id,
@@ -123,15 +134,16 @@ async def send_comment_notification(
         print(f"[DEBUG] Notification created successfully")
     
     # Get post details
-    post = await post_service.get_post_by_id(post_id)
-    if not post:
+    posts = await post_service.get_posts_by_ids([post_id], {"author_id": 1})
+    if not posts:
         return
+    post_author_id = str(posts[0]["author_id"])
     
     # Notify post author if different from comment author and answer author
-    if str(post.author_id) != comment_author_id and str(post.author_id) != str(answer.author_id):
-        print(f"[DEBUG] Creating notification for post author {post.author_id}")
+    if post_author_id != comment_author_id and post_author_id != str(answer.author_id):
+        print(f"[DEBUG] Creating notification for post author {post_author_id}")
         await notification_service.create_notification(
-            user_id=str(post.author_id),
+            user_id=post_author_id,
             notification_type=NotificationType.NEW_COMMENT,
             message="Có bình luận mới trong bài viết của bạn",
             link=f"/forum/{post_id}",
@@ -152,7 +164,7 @@ async def send_comment_notification(
     # Notify bookmarked users (except the comment author, post author, and answer author)
     for user in bookmarked_users:
         user_id = str(user["_id"])
-        if user_id not in [comment_author_id, str(post.author_id), str(answer.author_id)]:
+        if user_id not in [comment_author_id, post_author_id, str(answer.author_id)]:
             print(f"[DEBUG] Creating notification for bookmarked user {user_id}")
             await notification_service.create_notification(
                 user_id=user_id,
@@ -163,6 +175,23 @@ async def send_comment_notification(
             )
 
 
+async def populate_author_names(answer_dicts: List[dict], loaders: DataLoaders) -> None:
+    """
+    Fill in the author names of answers and their comments
+
+    Every lookup goes through the request's user loader, so a whole page
+    of answers and comments costs a single users query.
+    """
+    items = []
+    for answer_dict in answer_dicts:
+        items.append(answer_dict)
+        items.extend(answer_dict.get("comments", []))
+
+    names = await asyncio.gather(*(loaders.get_user_name(item["author_id"]) for item in items))
+    for item, name in zip(items, names):
+        item["author_name"] = name
+
+
 @router.post("/", response_model=Answer, status_code=status.HTTP_201_CREATED)
 async def create_answer(
     answer_data: AnswerCreate,
@@ -197,8 +226,6 @@ async def create_answer(
     answer_dict["_id"] = str(answer_dict["_id"])
     answer_dict["post_id"] = str(answer_dict["post_id"])
     answer_dict["author_id"] = str(answer_dict["author_id"])
-    answer_dict["votes"]["upvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("upvoted_by", [])]
-    answer_dict["votes"]["downvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("downvoted_by", [])]
 
     # Convert comment IDs
     for comment in answer_dict.get("comments", []):
@@ -211,56 +238,43 @@ async def create_answer(
 @router.get("/post/{post_id}", response_model=List[Answer])
 async def get_answers_by_post(
     post_id: str,
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     answer_service: AnswerService = Depends(get_answer_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    user_service: UserService = Depends(get_user_service),
+    loaders: DataLoaders = Depends(get_loaders),
+    viewer: Optional[str] = Depends(get_optional_token_subject),
     t: Translator = Depends(get_translator)
 ):
     """
     Get all answers for a post, sorted by score (most helpful first)
+
+    Answers carry author names resolved at read time, so the ETag is a
+    hash of the payload rather than of the answers' versions. A signed-in
+    viewer also gets their own vote on each answer as ``my_vote``, fetched
+    for the whole page in one query; that response is private.
     """
-    answers = await answer_service.get_answers_by_post(post_id, skip, limit)
-
-    # Convert to response models
-    answer_list = []
-    for answer in answers:
-        answer_dict = answer.model_dump(by_alias=True)
-        answer_dict["_id"] = str(answer_dict["_id"])
-        answer_dict["post_id"] = str(answer_dict["post_id"])
-        answer_author_id = answer_dict["author_id"]
-        answer_dict["author_id"] = str(answer_author_id)
-        answer_dict["votes"]["upvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("upvoted_by", [])]
-        answer_dict["votes"]["downvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("downvoted_by", [])]
-
-        # Fetch answer author name from users collection
-        from bson import ObjectId
-        if ObjectId.is_valid(str(answer_author_id)):
-            user = await db.users.find_one({"_id": ObjectId(str(answer_author_id))})
-            if user:
-                answer_dict["author_name"] = user.get("name", "Unknown User")
-            else:
-                answer_dict["author_name"] = "Unknown User"
-        else:
-            answer_dict["author_name"] = "Unknown User"
-
-        # Populate author names for comments
-        for comment in answer_dict.get("comments", []):
-            comment["id"] = str(comment["id"])
-            comment_author_id = comment["author_id"]
-            comment["author_id"] = str(comment_author_id)
-            
-            # Fetch author name from users collection
-            if ObjectId.is_valid(str(comment_author_id)):
-                user = await db.users.find_one({"_id": ObjectId(str(comment_author_id))})
-                if user:
-                    comment["author_name"] = user.get("name", "Unknown User")
-                else:
-                    comment["author_name"] = "Unknown User"
-
-        answer_list.append(Answer(**answer_dict))
-
-    return answer_list
+    if viewer:
+        answers, viewer_id = await asyncio.gather(
+            answer_service.get_answers_by_post(post_id, skip, limit),
+            user_service.get_user_id_by_email(viewer)
+        )
+    else:
+        answers, viewer_id = await answer_service.get_answers_by_post(post_id, skip, limit), None
+
+    # Shape the raw documents straight into the response, ids as strings
+    answer_dicts = ANSWER_ENCODER.encode_many(answers)
+
+    await populate_author_names(answer_dicts, loaders)
+
+    if viewer_id is None:
+        return conditional_json(request, answer_dicts, REVALIDATE)
+
+    my_votes = await answer_service.get_my_votes([answer["_id"] for answer in answers], viewer_id)
+    for answer_dict in answer_dicts:
+        answer_dict["my_vote"] = my_votes.get(answer_dict["_id"], 0)
+    return conditional_json(request, answer_dicts, PRIVATE_REVALIDATE)
 
 
 @router.put("/{answer_id}", response_model=Answer)
@@ -269,6 +283,7 @@ async def update_answer(
     answer_data: AnswerUpdate,
     current_user: User = Depends(get_current_user),
     answer_service: AnswerService = Depends(get_answer_service),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -287,14 +302,14 @@ async def update_answer(
     answer_dict["_id"] = str(answer_dict["_id"])
     answer_dict["post_id"] = str(answer_dict["post_id"])
     answer_dict["author_id"] = str(answer_dict["author_id"])
-    answer_dict["votes"]["upvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("upvoted_by", [])]
-    answer_dict["votes"]["downvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("downvoted_by", [])]
 
     # Convert comment IDs
     for comment in answer_dict.get("comments", []):
         comment["id"] = str(comment["id"])
         comment["author_id"] = str(comment["author_id"])
 
+    await populate_author_names([answer_dict], loaders)
+
     return Answer(**answer_dict)
 
 
@@ -337,15 +352,15 @@ async def vote_answer(
     is_upvote: bool = Query(..., description="True for helpful, False for not helpful"),
     current_user: User = Depends(get_current_user),
     answer_service: AnswerService = Depends(get_answer_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
     Vote on an answer (helpful or not helpful)
     """
-    answer = await answer_service.vote_answer(answer_id, current_user.id, is_upvote)
+    voted = await answer_service.vote_answer(answer_id, current_user.id, is_upvote)
 
-    if not answer:
+    if not voted:
         # Check if answer exists to give appropriate error message
         existing_answer = await answer_service.get_answer_by_id(answer_id)
         if existing_answer and str(existing_answer.author_id) == current_user.id:
@@ -359,38 +374,18 @@ async def vote_answer(
         )
 
     # Convert to response model
+    answer, my_vote = voted
     answer_dict = answer.model_dump(by_alias=True)
     answer_dict["_id"] = str(answer_dict["_id"])
     answer_dict["post_id"] = str(answer_dict["post_id"])
-    answer_author_id = answer_dict["author_id"]
-    answer_dict["author_id"] = str(answer_author_id)
-    answer_dict["votes"]["upvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("upvoted_by", [])]
-    answer_dict["votes"]["downvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("downvoted_by", [])]
-
-    # Fetch answer author name
-    from bson import ObjectId
-    if ObjectId.is_valid(str(answer_author_id)):
-        user = await db.users.find_one({"_id": ObjectId(str(answer_author_id))})
-        if user:
-            answer_dict["author_name"] = user.get("name", "Unknown User")
-        else:
-            answer_dict["author_name"] = "Unknown User"
-    else:
-        answer_dict["author_name"] = "Unknown User"
+    answer_dict["author_id"] = str(answer_dict["author_id"])
+    answer_dict["my_vote"] = my_vote
 
-    # Populate author names for comments
     for comment in answer_dict.get("comments", []):
         comment["id"] = str(comment["id"])
-        comment_author_id = comment["author_id"]
-        comment["author_id"] = str(comment_author_id)
-        
-        # Fetch author name from users collection
-        if ObjectId.is_valid(str(comment_author_id)):
-            user = await db.users.find_one({"_id": ObjectId(str(comment_author_id))})
-            if user:
-                comment["author_name"] = user.get("name", "Unknown User")
-            else:
-                comment["author_name"] = "Unknown User"
+        comment["author_id"] = str(comment["author_id"])
+
+    await populate_author_names([answer_dict], loaders)
 
     return answer_dict
 
@@ -405,7 +400,7 @@ async def add_comment(
     notification_service: NotificationService = Depends(get_notification_service),
     post_service: PostService = Depends(get_post_service),
     user_service: UserService = Depends(get_user_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -434,47 +429,67 @@ async def add_comment(
     answer_dict = answer.model_dump(by_alias=True)
     answer_dict["_id"] = str(answer_dict["_id"])
     answer_dict["post_id"] = str(answer_dict["post_id"])
-    answer_author_id = answer_dict["author_id"]
-    answer_dict["author_id"] = str(answer_author_id)
-    answer_dict["votes"]["upvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("upvoted_by", [])]
-    answer_dict["votes"]["downvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("downvoted_by", [])]
-
-    # Fetch answer author name
-    from bson import ObjectId
-    if ObjectId.is_valid(str(answer_author_id)):
-        user = await db.users.find_one({"_id": ObjectId(str(answer_author_id))})
-        if user:
-            answer_dict["author_name"] = user.get("name", "Unknown User")
-        else:
-            answer_dict["author_name"] = "Unknown User"
-    else:
-        answer_dict["author_name"] = "Unknown User"
+    answer_dict["author_id"] = str(answer_dict["author_id"])
 
-    # Populate author names for comments
-    from bson import ObjectId
     for comment in answer_dict.get("comments", []):
         comment["id"] = str(comment["id"])
-        comment_author_id = comment["author_id"]
-        comment["author_id"] = str(comment_author_id)
-        
-        # Fetch author name from users collection
-        if ObjectId.is_valid(str(comment_author_id)):
-            user = await db.users.find_one({"_id": ObjectId(str(comment_author_id))})
-            if user:
-                comment["author_name"] = user.get("name", "Unknown User")
-            else:
-                comment["author_name"] = "Unknown User"
+        comment["author_id"] = str(comment["author_id"])
+
+    await populate_author_names([answer_dict], loaders)
 
     return Answer(**answer_dict)
 
 
+@router.get("/{answer_id}/comments", response_model=CommentPage)
+async def get_answer_comments(
+    answer_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    answer_service: AnswerService = Depends(get_answer_service),
+    loaders: DataLoaders = Depends(get_loaders),
+    t: Translator = Depends(get_translator)
+):
+    """
+    Page through an answer's comments, newest first
+
+    Answer listings only carry the newest comments; this pages through the
+    rest with a keyset cursor.
+    """
+    try:
+        page = await answer_service.get_comments_by_cursor(answer_id, limit, cursor)
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=t("errors.bad_request")
+        )
+
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=t("errors.not_found")
+        )
+
+    comments, comment_count, next_cursor, has_more = page
+    comment_dicts = COMMENT_ENCODER.encode_many(comments)
+    names = await asyncio.gather(*(loaders.get_user_name(comment["author_id"]) for comment in comment_dicts))
+    for comment, name in zip(comment_dicts, names):
+        comment["author_name"] = name
+
+    return FastJSONResponse({
+        "comments": comment_dicts,
+        "comment_count": comment_count,
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    })
+
+
 @router.delete("/{answer_id}/comments/{comment_id}")
 async def delete_comment(
     answer_id: str,
     comment_id: str,
     current_user: User = Depends(get_current_user),
     answer_service: AnswerService = Depends(get_answer_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -492,34 +507,12 @@ async def delete_comment(
     answer_dict = answer.model_dump(by_alias=True)
     answer_dict["_id"] = str(answer_dict["_id"])
     answer_dict["post_id"] = str(answer_dict["post_id"])
-    answer_author_id = answer_dict["author_id"]
-    answer_dict["author_id"] = str(answer_author_id)
-    answer_dict["votes"]["upvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("upvoted_by", [])]
-    answer_dict["votes"]["downvoted_by"] = [str(uid) for uid in answer_dict["votes"].get("downvoted_by", [])]
-
-    # Fetch answer author name
-    from bson import ObjectId
-    if ObjectId.is_valid(str(answer_author_id)):
-        user = await db.users.find_one({"_id": ObjectId(str(answer_author_id))})
-        if user:
-            answer_dict["author_name"] = user.get("name", "Unknown User")
-        else:
-            answer_dict["author_name"] = "Unknown User"
-    else:
-        answer_dict["author_name"] = "Unknown User"
+    answer_dict["author_id"] = str(answer_dict["author_id"])
 
-    # Populate author names for comments
     for comment in answer_dict.get("comments", []):
         comment["id"] = str(comment["id"])
-        comment_author_id = comment["author_id"]
-        comment["author_id"] = str(comment_author_id)
-        
-        # Fetch author name from users collection
-        if ObjectId.is_valid(str(comment_author_id)):
-            user = await db.users.find_one({"_id": ObjectId(str(comment_author_id))})
-            if user:
-                comment["author_name"] = user.get("name", "Unknown User")
-            else:
-                comment["author_name"] = "Unknown User"
+        comment["author_id"] = str(comment["author_id"])
+
+    await populate_author_names([answer_dict], loaders)
 
     return answer_dict
@@ -1,12 +1,14 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_database
-from app.schemas.post import Post
+from app.core.loaders import DataLoaders, get_loaders
 from app.services.user_service import UserService
 from app.services.post_service import PostService
+from app.utils.db_helpers import InvalidCursorError
 from app.api.v1.endpoints.users import get_current_user
+from app.api.v1.endpoints.posts import build_post_responses
 from app.schemas.user import User
 from app.i18n.dependencies import get_translator, Translator
 
@@ -39,8 +41,8 @@ async def add_bookmark(
     Add a post to user's bookmarks
     """
     # Check if post exists
-    post = await post_service.get_post_by_id(post_id)
-    if not post:
+    posts = await post_service.get_posts_by_ids([post_id], {"_id": 1})
+    if not posts:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=t("errors.not_found")
@@ -78,56 +80,51 @@ async def remove_bookmark(
     return {"message": t("common.success")}
 
 
-@router.get("/", response_model=List[dict])
+@router.get("/")
 async def get_bookmarks(
+    paginate: str = Query("all", pattern="^(all|cursor)$", description="Pagination mode"),
+    limit: int = Query(20, ge=1, le=100, description="Page size in cursor mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (implies cursor mode)"),
     current_user: User = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
     post_service: PostService = Depends(get_post_service),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
     Get user's bookmarked posts with bookmark timestamps
-    """
-    # Get user data including bookmarks
-    user_data = await user_service.get_user_by_id(current_user.id)
-    if not user_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=t("errors.not_found")
-        )
 
-    # Get bookmarks with timestamps
-    bookmarks = user_data.bookmarks if hasattr(user_data, 'bookmarks') else []
-    
-    # If no new format bookmarks, fall back to old format
-    if not bookmarks and hasattr(user_data, 'bookmarked_post_ids'):
-        bookmarked_post_ids = user_data.bookmarked_post_ids
-        posts = []
-        for post_id in bookmarked_post_ids:
-            post = await post_service.get_post_by_id(str(post_id))
-            if post:
-                post_dict = post.model_dump(by_alias=True)
-                post_dict["_id"] = str(post_dict["_id"])
-                post_dict["author_id"] = str(post_dict["author_id"])
-                post_dict["tag_ids"] = [str(tag_id) for tag_id in post_dict.get("tag_ids", [])]
-                # Add bookmarked_at as the post creation date for legacy bookmarks
-                post_dict["bookmarked_at"] = post_dict.get("created_at")
-                posts.append(post_dict)
-        return posts
-
-    # Fetch full post details with bookmark timestamps
-    result = []
-    for bookmark in bookmarks:
-        post_id = str(bookmark.post_id) if hasattr(bookmark, 'post_id') else str(bookmark.get('post_id'))
-        post = await post_service.get_post_by_id(post_id)
-        if post:
-            post_dict = post.model_dump(by_alias=True)
-            post_dict["_id"] = str(post_dict["_id"])
-            post_dict["author_id"] = str(post_dict["author_id"])
-            post_dict["tag_ids"] = [str(tag_id) for tag_id in post_dict.get("tag_ids", [])]
-            # Add bookmark timestamp
-            created_at = bookmark.created_at if hasattr(bookmark, 'created_at') else bookmark.get('created_at')
-            post_dict["bookmarked_at"] = created_at.isoformat() if created_at else None
-            result.append(post_dict)
-
-    return result
+    By default every bookmark is returned as a list, in bookmarking order.
+    Cursor mode (paginate=cursor, or any cursor) returns the most recent
+    bookmarks first as {"posts", "next_cursor", "has_more"}. Posts deleted
+    since they were bookmarked are left out, so a page can be short.
+    """
+    use_cursor = paginate == "cursor" or cursor is not None
+    next_cursor = None
+    has_more = False
+
+    if use_cursor:
+        try:
+            entries, next_cursor, has_more = await user_service.get_bookmarks_page(current_user.id, limit, cursor)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=t("errors.bad_request")
+            )
+    else:
+        entries = await user_service.get_bookmark_entries(current_user.id)
+
+    # Fetch all bookmarked posts with one query, without counting views
+    documents = await post_service.get_posts_by_ids([post_id for post_id, _ in entries])
+
+    # Resolve authors and tags for the whole list at once
+    post_dicts = await build_post_responses(documents, loaders)
+    bookmarked_at = {str(post_id): created_at for post_id, created_at in entries}
+    for post_dict in post_dicts:
+        # Legacy bookmarks have no timestamp, use the post creation date
+        created_at = bookmarked_at.get(post_dict["_id"])
+        post_dict["bookmarked_at"] = created_at.isoformat() if created_at else post_dict.get("created_at")
+
+    if use_cursor:
+        return {"posts": post_dicts, "next_cursor": next_cursor, "has_more": has_more}
+    return post_dicts
@@ -1,8 +1,9 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_database
+from app.core.http_cache import catalog_policy, conditional_json
 from app.schemas.category import Category, CategoryCreate, CategoryUpdate, CategoryList
 from app.services.category_service import CategoryService
 from app.api.v1.endpoints.users import get_current_user
@@ -48,6 +49,7 @@ async def create_category(
 
 @router.get("/", response_model=CategoryList)
 async def get_categories(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     category_service: CategoryService = Depends(get_category_service),
@@ -69,11 +71,14 @@ async def get_categories(
         category_dict["_id"] = str(category_dict["_id"])
         category_list.append(Category(**category_dict))
 
-    return {"categories": category_list, "total": total}
+    return conditional_json(
+        request, CategoryList(categories=category_list, total=total), catalog_policy()
+    )
 
 
 @router.get("/popular", response_model=List[Category])
 async def get_popular_categories(
+    request: Request,
     limit: int = Query(10, ge=1, le=50),
     category_service: CategoryService = Depends(get_category_service),
     t: Translator = Depends(get_translator)
@@ -90,12 +95,13 @@ async def get_popular_categories(
         category_dict["_id"] = str(category_dict["_id"])
         category_list.append(Category(**category_dict))
 
-    return category_list
+    return conditional_json(request, category_list, catalog_policy())
 
 
 @router.get("/{category_id}", response_model=Category)
 async def get_category(
     category_id: str,
+    request: Request,
     category_service: CategoryService = Depends(get_category_service),
     t: Translator = Depends(get_translator)
 ):
@@ -114,7 +120,7 @@ async def get_category(
     category_dict = category.model_dump(by_alias=True)
     category_dict["_id"] = str(category_dict["_id"])
 
-    return Category(**category_dict)
+    return conditional_json(request, Category(**category_dict), catalog_policy())
 
 
 @router.put("/{category_id}", response_model=Category)
@@ -1,8 +1,9 @@
 """
 I18n endpoints - Demo và quản lý ngôn ngữ
 """
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from typing import Dict, Any
+from app.core.http_cache import LOCALE_VARY, conditional_json, i18n_policy
 from app.i18n import get_i18n
 from app.i18n.dependencies import get_translator, Translator
 from app.i18n.middleware import get_locale
@@ -11,7 +12,7 @@ router = APIRouter()
 
 
 @router.get("/languages")
-async def get_supported_languages() -> Dict[str, Any]:
+async def get_supported_languages(request: Request) -> Response:
     """
     Lấy danh sách ngôn ngữ được hỗ trợ
     
@@ -19,14 +20,15 @@ async def get_supported_languages() -> Dict[str, Any]:
         Dict chứa thông tin về các ngôn ngữ được hỗ trợ
     """
     i18n = get_i18n()
-    return {
+    response = {
         "supported_languages": i18n.get_supported_locales(),
         "default_language": i18n.default_locale
     }
+    return conditional_json(request, response, i18n_policy())
 
 
 @router.get("/current-language")
-async def get_current_language(request: Request) -> Dict[str, str]:
+async def get_current_language(request: Request) -> Response:
     """
     Lấy ngôn ngữ hiện tại của request
     
@@ -37,15 +39,17 @@ async def get_current_language(request: Request) -> Dict[str, str]:
         Dict chứa ngôn ngữ hiện tại
     """
     locale = get_locale(request)
-    return {
+    response = {
         "current_language": locale
     }
+    return conditional_json(request, response, i18n_policy(), vary=LOCALE_VARY)
 
 
 @router.get("/demo")
 async def demo_translation(
+    request: Request,
     t: Translator = Depends(get_translator)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Endpoint demo về cách sử dụng translation
     
@@ -57,7 +61,7 @@ async def demo_translation(
     Returns:
         Dict chứa các message đã dịch
     """
-    return {
+    response = {
         "welcome": t("messages.welcome"),
         "goodbye": t("messages.goodbye"),
         "auth": {
@@ -83,13 +87,15 @@ async def demo_translation(
             "profile_updated": t("user.profile_updated")
         }
     }
+    return conditional_json(request, response, i18n_policy(), vary=LOCALE_VARY)
 
 
 @router.get("/translate/{key}")
 async def translate_key(
     key: str,
+    request: Request,
     t: Translator = Depends(get_translator)
-) -> Dict[str, str]:
+) -> Response:
     """
     Dịch một key cụ thể
     
@@ -101,10 +107,11 @@ async def translate_key(
         Dict chứa key và translation
     """
     translation = t(key)
-    return {
+    response = {
         "key": key,
         "translation": translation
     }
+    return conditional_json(request, response, i18n_policy(), vary=LOCALE_VARY)
 
 
 @router.post("/set-language/{locale}")
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_database
+from app.core.loaders import DataLoaders, get_loaders
 from app.schemas.notification import Notification, NotificationCount
 from app.services.notification_service import NotificationService
 from app.api.v1.endpoints.users import get_current_user
@@ -26,14 +27,12 @@ async def get_notifications(
     unread_only: bool = Query(False),
     current_user: User = Depends(get_current_user),
     notification_service: NotificationService = Depends(get_notification_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
     Get notifications for current user
     """
-    from bson import ObjectId
-    
     notifications = await notification_service.get_user_notifications(
         current_user.id,
         skip,
@@ -41,26 +40,26 @@ async def get_notifications(
         unread_only
     )
 
-    # Convert to response models and lookup actor info
+    # Actor names and avatars for the whole page, mostly from the user cache
+    actors = await loaders.load_user_summaries(
+        notification.actor_id for notification in notifications if notification.actor_id
+    )
+
+    # Convert to response models
     notification_list = []
     for notification in notifications:
         notification_dict = notification.model_dump(by_alias=True)
         notification_dict["_id"] = str(notification_dict["_id"])
         notification_dict["user_id"] = str(notification_dict["user_id"])
         
-        # Lookup actor info if actor_id exists
         actor_name = None
         actor_avatar = None
         if notification_dict.get("actor_id"):
-            actor_id = notification_dict["actor_id"]
-            notification_dict["actor_id"] = str(actor_id)
-            
-            # Lookup user info
-            if ObjectId.is_valid(str(actor_id)):
-                actor = await db.users.find_one({"_id": ObjectId(str(actor_id))})
-                if actor:
-                    actor_name = actor.get("name", "Unknown User")
-                    actor_avatar = actor.get("avatar_url")
+            notification_dict["actor_id"] = str(notification_dict["actor_id"])
+            actor = actors.get(notification_dict["actor_id"])
+            if actor:
+                actor_name = actor.get("name", "Unknown User")
+                actor_avatar = actor.get("avatar_url")
         
         notification_dict["actor_name"] = actor_name
         notification_dict["actor_avatar"] = actor_avatar
@@ -1,11 +1,22 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
 
-from app.core.database import get_database
+from app.core.config import settings
+from app.core.database import get_database, get_listing_database, causal_session, causal_tokens
+from app.core.feed_cache import feed_cache
+from app.core.http_cache import REVALIDATE, conditional_json, etag_matches, not_modified, weak_etag
+from app.core.loaders import DataLoaders, get_loaders, get_listing_loaders
+from app.core.serialization import DocumentEncoder, FastJSONResponse, dumps
 from app.schemas.post import Post, PostCreate, PostUpdate, PostList, PostWithAuthor
 from app.services.post_service import PostService
-from app.api.v1.endpoints.users import get_current_user
+from app.search import related_posts
+from app.services.post_summary_service import build_author_summary, build_tag_summaries
+from app.models.post import PostModel
+from app.utils.db_helpers import InvalidCursorError
+from app.api.v1.endpoints.users import get_current_user, get_optional_token_subject
 from app.schemas.user import User
 from app.i18n.dependencies import get_translator, Translator
 
@@ -19,6 +30,89 @@ def get_post_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> PostSe
     return PostService(db)
 
 
+def get_post_listing_service(db: AsyncIOMotorDatabase = Depends(get_listing_database)) -> PostService:
+    """
+    Dependency to get post service reading from the listing read preference
+    """
+    return PostService(db)
+
+
+# Shapes raw post documents like PostModel(**doc).model_dump(by_alias=True)
+POST_ENCODER = DocumentEncoder(PostModel)
+
+
+async def build_post_responses(posts: List[dict], loaders: DataLoaders) -> List[dict]:
+    """
+    Convert raw post documents to response dicts with author and tag info
+
+    Uses the author and tag summaries embedded on the posts. Posts written
+    before the summaries existed have their users and tags resolved through
+    the request's loaders, one query each for the whole page.
+    """
+    post_dicts = POST_ENCODER.encode_many(posts)
+    missing_author_ids = [post["author_id"] for post in post_dicts if post["author"] is None]
+    missing_tag_ids = [
+        tag_id
+        for post in post_dicts
+        if len(post["tags"]) != len(post["tag_ids"])
+        for tag_id in post["tag_ids"]
+    ]
+
+    users, tag_list = await asyncio.gather(
+        loaders.load_user_summaries(missing_author_ids),
+        loaders.load_tags(missing_tag_ids)
+    )
+    authors = {user_id: build_author_summary(user) for user_id, user in users.items()}
+    tags = {tag["_id"]: tag for tag in tag_list}
+
+    for post_dict in post_dicts:
+        if post_dict["author"] is None:
+            author = authors.get(post_dict["author_id"])
+            post_dict["author"] = {**author, "_id": str(author["_id"])} if author else None
+        if len(post_dict["tags"]) != len(post_dict["tag_ids"]):
+            summaries = build_tag_summaries([ObjectId(tag_id) for tag_id in post_dict["tag_ids"]], tags)
+            post_dict["tags"] = [{**tag, "_id": str(tag["_id"])} for tag in summaries]
+
+    return post_dicts
+
+
+async def load_posts_page(
+    post_service: PostService,
+    loaders: DataLoaders,
+    session,
+    skip: int,
+    limit: int,
+    author_id: Optional[str],
+    tag_ids: Optional[List[str]],
+    category: Optional[str],
+    sort_by: str,
+    sort_order: int,
+    search: Optional[str],
+    estimate_total: bool
+) -> dict:
+    """
+    Build an offset-mode posts page response
+    """
+    # Get posts and the total count in one round trip
+    posts, total, total_is_lower_bound = await post_service.get_posts(
+        skip=skip,
+        limit=limit,
+        author_id=author_id,
+        tag_ids=tag_ids,
+        category=category,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        search=search,
+        count_limit=settings.PAGINATION_COUNT_LIMIT if estimate_total else None,
+        session=session
+    )
+
+    # Convert to response models with author info and tags
+    post_list = await build_post_responses(posts, loaders)
+
+    return {"posts": post_list, "total": total, "total_is_lower_bound": total_is_lower_bound}
+
+
 @router.post("/", response_model=Post, status_code=status.HTTP_201_CREATED)
 async def create_post(
     post_data: PostCreate,
@@ -29,7 +123,8 @@ async def create_post(
     """
     Create a new post (forum question)
     """
-    post = await post_service.create_post(post_data, current_user.id)
+    async with causal_session(current_user.email) as session:
+        post = await post_service.create_post(post_data, current_user.id, session=session)
 
     # Convert to response model
     post_dict = post.model_dump(by_alias=True)
@@ -43,14 +138,23 @@ async def create_post(
 @router.get("/{post_id}")
 async def get_post(
     post_id: str,
+    request: Request,
     post_service: PostService = Depends(get_post_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
     Get a post by ID
+
+    The response includes up to RELATED_POSTS_LIMIT related posts, ranked
+    in memory by content similarity and tag co-occurrence.
+
+    The weak ETag is derived from the post's version fields, so a client
+    revalidating an unchanged post gets a 304 before the response is built.
+    The view count is left out of it: it moves with every read and does not
+    make the post worth downloading again.
     """
-    post = await post_service.get_post_by_id(post_id)
+    post = await post_service.view_post(post_id)
 
     if not post:
         raise HTTPException(
@@ -58,43 +162,22 @@ async def get_post(
             detail=t("errors.not_found")
         )
 
-    # Convert to response model
-    post_dict = post.model_dump(by_alias=True)
-    post_dict["_id"] = str(post_dict["_id"])
-    author_id_str = str(post_dict["author_id"])
-    post_dict["author_id"] = author_id_str
-    
-    tag_ids = post_dict.get("tag_ids", [])
-    post_dict["tag_ids"] = [str(tag_id) for tag_id in tag_ids]
-
-    # Get author info
-    from bson import ObjectId
-    author = await db.users.find_one({"_id": ObjectId(author_id_str)})
-    if author:
-        post_dict["author"] = {
-            "_id": str(author["_id"]),
-            "name": author.get("name", ""),
-            "email": author.get("email", ""),
-            "avatar_url": author.get("avatar_url", "")
-        }
-    
-    # Get tags info
-    post_dict["tags"] = []
-    if tag_ids:
-        tag_object_ids = [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(str(tag_id))]
-        if tag_object_ids:
-            tags_cursor = db.tags.find({"_id": {"$in": tag_object_ids}})
-            tags = await tags_cursor.to_list(length=len(tag_object_ids))
-            post_dict["tags"] = [
-                {
-                    "_id": str(tag["_id"]),
-                    "name": tag.get("name", ""),
-                    "description": tag.get("description", "")
-                }
-                for tag in tags
-            ]
-
-    return post_dict
+    related = related_posts.related(post_id)
+    etag = weak_etag(
+        post["_id"],
+        post.get("updated_at"),
+        post.get("answer_count"),
+        post.get("author"),
+        post.get("tags"),
+        [item["_id"] for item in related]
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, REVALIDATE)
+
+    responses = await build_post_responses([post], loaders)
+    response = responses[0]
+    response["related"] = related
+    return conditional_json(request, response, REVALIDATE, etag=etag)
 
 
 @router.get("/")
@@ -104,79 +187,116 @@ async def get_posts(
     author_id: Optional[str] = None,
     tag_ids: Optional[List[str]] = Query(None),
     category: Optional[str] = Query(None, description="Filter by category name"),
-    sort_by: str = Query("created_at", pattern="^(created_at|votes.score|view_count|answer_count)$"),
+    sort_by: str = Query("created_at", pattern="^(created_at|votes.score|view_count|answer_count|relevance|hot)$"),
     sort_order: int = Query(-1, ge=-1, le=1),
     search: Optional[str] = Query(None, description="Search in post title and content"),
-    post_service: PostService = Depends(get_post_service),
-    db: AsyncIOMotorDatabase = Depends(get_database),
+    paginate: str = Query("offset", pattern="^(offset|cursor)$", description="Pagination mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (implies cursor mode)"),
+    include_total: bool = Query(False, description="Also count matching posts in cursor mode"),
+    estimate_total: bool = Query(False, description="Stop counting at PAGINATION_COUNT_LIMIT matches (offset mode)"),
+    post_service: PostService = Depends(get_post_listing_service),
+    loaders: DataLoaders = Depends(get_listing_loaders),
+    viewer: Optional[str] = Depends(get_optional_token_subject),
     t: Translator = Depends(get_translator)
 ):
     """
     Get list of posts with filters and sorting
+
+    Served from the listing read preference; a signed-in viewer still
+    sees their own latest writes through a causally consistent session.
+
+    A search is answered by the in-process search index when it is ready;
+    sort_by=relevance then orders by match quality, and sort_by=hot orders
+    by the materialized hot ranking (both offset mode only).
+
+    Offset mode (default) pages with skip/limit and returns the total from
+    the same query; with estimate_total the count stops at
+    PAGINATION_COUNT_LIMIT and total_is_lower_bound tells when it did.
+    Cursor mode (paginate=cursor, or any cursor) seeks past the previous
+    page instead and returns next_cursor/has_more; the total is only counted
+    when include_total is set.
+
+    First pages without search or author filter, narrowed to at most one
+    category and one tag, are served from the hot feed cache.
     """
-    # Get total count (pass db for author name search)
-    total = await post_service.count_posts(
-        author_id=author_id,
-        tag_ids=tag_ids,
-        category=category,
-        search=search,
-        db=db
-    )
-    
-    # Get posts (pass db for author name search)
-    posts = await post_service.get_posts(
-        skip=skip,
-        limit=limit,
-        author_id=author_id,
-        tag_ids=tag_ids,
-        category=category,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        search=search,
-        db=db
+    use_cursor = paginate == "cursor" or cursor is not None
+    if use_cursor and sort_by in ("relevance", "hot"):
+        # Ranked orders have no stable keyset, page through them with skip
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=t("errors.bad_request")
+        )
+    cacheable = (
+        settings.FEED_CACHE_ENABLED
+        and not use_cursor
+        and skip == 0
+        and not search
+        and not author_id
+        and len(tag_ids or []) <= 1
+        and sort_by != "relevance"
     )
+    if cacheable and viewer is not None:
+        # Viewers with a recent write read through their causal session
+        cacheable = await causal_tokens.get(viewer) is None
+    if cacheable:
+        async def build_page() -> bytes:
+            page = await load_posts_page(
+                post_service, loaders, None, skip, limit, None, tag_ids, category,
+                sort_by, sort_order, None, estimate_total
+            )
+            return dumps(page)
+
+        key = feed_cache.make_key(category, tag_ids[0] if tag_ids else None, sort_by, sort_order, limit, estimate_total)
+        body = await feed_cache.get_or_build(key, build_page)
+        return Response(content=body, media_type="application/json")
+
+    total = None
+    next_cursor = None
+    has_more = False
+
+    async with causal_session(viewer) as session:
+        if use_cursor and include_total:
+            # Get total count
+            total = await post_service.count_posts(
+                author_id=author_id,
+                tag_ids=tag_ids,
+                category=category,
+                search=search,
+                session=session
+            )
+
+        if use_cursor:
+            try:
+                posts, next_cursor, has_more = await post_service.get_posts_by_cursor(
+                    limit=limit,
+                    cursor=cursor,
+                    author_id=author_id,
+                    tag_ids=tag_ids,
+                    category=category,
+                    sort_by=sort_by,
+                    sort_order=sort_order,
+                    search=search,
+                    session=session
+                )
+            except InvalidCursorError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=t("errors.bad_request")
+                )
+        else:
+            page = await load_posts_page(
+                post_service, loaders, session, skip, limit, author_id, tag_ids, category,
+                sort_by, sort_order, search, estimate_total
+            )
+            return FastJSONResponse(page)
 
     # Convert to response models with author info and tags
-    post_list = []
-    from bson import ObjectId
-    for post in posts:
-        post_dict = post.model_dump(by_alias=True)
-        post_dict["_id"] = str(post_dict["_id"])
-        author_id_str = str(post_dict["author_id"])
-        post_dict["author_id"] = author_id_str
-        
-        tag_ids = post_dict.get("tag_ids", [])
-        post_dict["tag_ids"] = [str(tag_id) for tag_id in tag_ids]
-        
-        # Get author info
-        author = await db.users.find_one({"_id": ObjectId(author_id_str)})
-        if author:
-            post_dict["author"] = {
-                "_id": str(author["_id"]),
-                "name": author.get("name", ""),
-                "email": author.get("email", ""),
-                "avatar_url": author.get("avatar_url", "")
-            }
-        
-        # Get tags info
-        post_dict["tags"] = []
-        if tag_ids:
-            tag_object_ids = [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(str(tag_id))]
-            if tag_object_ids:
-                tags_cursor = db.tags.find({"_id": {"$in": tag_object_ids}})
-                tags = await tags_cursor.to_list(length=len(tag_object_ids))
-                post_dict["tags"] = [
-                    {
-                        "_id": str(tag["_id"]),
-                        "name": tag.get("name", ""),
-                        "description": tag.get("description", "")
-                    }
-                    for tag in tags
-                ]
-        
-        post_list.append(post_dict)
-
-    return {"posts": post_list, "total": total}
+    post_list = await build_post_responses(posts, loaders)
+
+    response = {"posts": post_list, "next_cursor": next_cursor, "has_more": has_more}
+    if include_total:
+        response["total"] = total
+    return FastJSONResponse(response)
 
 
 @router.put("/{post_id}", response_model=Post)
@@ -190,7 +310,8 @@ async def update_post(
     """
     Update a post (only by author)
     """
-    post = await post_service.update_post(post_id, post_data, current_user.id)
+    async with causal_session(current_user.email) as session:
+        post = await post_service.update_post(post_id, post_data, current_user.id, session=session)
 
     if not post:
         raise HTTPException(
@@ -217,7 +338,8 @@ async def delete_post(
     """
     Delete a post (only by author)
     """
-    success = await post_service.delete_post(post_id, current_user.id)
+    async with causal_session(current_user.email) as session:
+        success = await post_service.delete_post(post_id, current_user.id, session=session)
 
     if not success:
         raise HTTPException(
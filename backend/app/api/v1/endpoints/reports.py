@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_database
+from app.core.loaders import DataLoaders, get_loaders
 from app.schemas.report import (
     Report,
     ReportCreate,
@@ -89,6 +90,7 @@ async def get_reports(
     report_type: Optional[ReportType] = Query(None, alias="type"),
     current_user: User = Depends(get_current_user),
     report_service: ReportService = Depends(get_report_service),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -137,10 +139,11 @@ async def get_reports(
 
     # Enrich with user details
     if user_target_ids:
-        user_map = await report_service.get_user_names(user_target_ids)
+        user_map = await loaders.load_users(user_target_ids)
         for r in result:
             if r.report_type == ReportType.USER and r.target_id in user_map:
-                r.target_info = {"name": user_map[r.target_id]}
+                target_user = user_map[r.target_id]
+                r.target_info = {"name": target_user.get("name", target_user.get("email", "Unknown"))}
 
     return result
 
@@ -357,6 +360,7 @@ async def get_report_details(
     report_id: str,
     current_user: User = Depends(get_current_user),
     report_service: ReportService = Depends(get_report_service),
+    loaders: DataLoaders = Depends(get_loaders),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -376,7 +380,7 @@ async def get_report_details(
             detail=t("report.admin_only", default="Admin access required")
         )
 
-    report_details = await report_service.get_report_with_details(report_id)
+    report_details = await report_service.get_report_with_details(report_id, loaders)
 
     if not report_details:
         raise HTTPException(
@@ -1,11 +1,12 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from app.core.database import get_database
+from app.core.database import get_database, get_listing_database, causal_session, causal_tokens
+from app.core.http_cache import PRIVATE_REVALIDATE, catalog_policy, conditional_json
 from app.schemas.tag import Tag, TagCreate, TagUpdate
 from app.services.tag_service import TagService
-from app.api.v1.endpoints.users import get_current_user
+from app.api.v1.endpoints.users import get_current_user, get_optional_token_subject
 from app.schemas.user import User
 from app.i18n.dependencies import get_translator, Translator
 
@@ -19,6 +20,13 @@ def get_tag_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> TagServ
     return TagService(db)
 
 
+def get_tag_listing_service(db: AsyncIOMotorDatabase = Depends(get_listing_database)) -> TagService:
+    """
+    Dependency to get tag service reading from the listing read preference
+    """
+    return TagService(db)
+
+
 @router.post("/", response_model=Tag, status_code=status.HTTP_201_CREATED)
 async def create_tag(
     tag_data: TagCreate,
@@ -37,7 +45,8 @@ async def create_tag(
             detail=t("tag.already_exists")
         )
 
-    tag = await tag_service.create_tag(tag_data, current_user.id)
+    async with causal_session(current_user.email) as session:
+        tag = await tag_service.create_tag(tag_data, current_user.id, session=session)
 
     # Convert to response model
     tag_dict = tag.model_dump(by_alias=True)
@@ -50,6 +59,7 @@ async def create_tag(
 @router.get("/{tag_id}", response_model=Tag)
 async def get_tag(
     tag_id: str,
+    request: Request,
     tag_service: TagService = Depends(get_tag_service),
     t: Translator = Depends(get_translator)
 ):
@@ -67,22 +77,27 @@ async def get_tag(
     tag_dict["_id"] = str(tag_dict["_id"])
     tag_dict["created_by"] = str(tag_dict["created_by"])
 
-    return Tag(**tag_dict)
+    return conditional_json(request, Tag(**tag_dict), catalog_policy())
 
 
 @router.get("/")
 async def get_tags(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = Query(None),
-    tag_service: TagService = Depends(get_tag_service),
+    tag_service: TagService = Depends(get_tag_listing_service),
+    viewer: Optional[str] = Depends(get_optional_token_subject),
     t: Translator = Depends(get_translator)
 ):
     """
     Get list of tags with optional search
+
+    Cacheable by shared caches, except for a viewer reading their own
+    recent write through a causal session.
     """
-    tags = await tag_service.get_tags(skip=skip, limit=limit, search=search)
-    total = await tag_service.count_tags(search=search)
+    async with causal_session(viewer) as session:
+        tags, total = await tag_service.get_tags(skip=skip, limit=limit, search=search, session=session)
 
     tags_list = []
     for tag in tags:
@@ -91,18 +106,21 @@ async def get_tags(
         tag_dict["created_by"] = str(tag_dict["created_by"])
         tags_list.append(tag_dict)
 
-    return {
+    response = {
         "tags": tags_list,
         "total": total,
         "skip": skip,
         "limit": limit
     }
+    fresh_read = viewer is not None and await causal_tokens.get(viewer) is not None
+    return conditional_json(request, response, PRIVATE_REVALIDATE if fresh_read else catalog_policy())
 
 
 @router.get("/popular/list")
 async def get_popular_tags(
+    request: Request,
     limit: int = Query(20, ge=1, le=50),
-    tag_service: TagService = Depends(get_tag_service),
+    tag_service: TagService = Depends(get_tag_listing_service),
     t: Translator = Depends(get_translator)
 ):
     """
@@ -117,10 +135,11 @@ async def get_popular_tags(
         tag_dict["created_by"] = str(tag_dict["created_by"])
         tags_list.append(tag_dict)
 
-    return {
+    response = {
         "tags": tags_list,
         "total": len(tags_list)
     }
+    return conditional_json(request, response, catalog_policy())
 
 
 @router.put("/{tag_id}", response_model=Tag)
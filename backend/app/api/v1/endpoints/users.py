@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
@@ -10,6 +10,7 @@ from app.services.user_service import UserService
 
 router = APIRouter()
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 def get_user_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> UserService:
@@ -58,6 +59,23 @@ async def get_current_user(
     return User(**user_dict)
 
 
+def get_optional_token_subject(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[str]:
+    """
+    Get the subject (email) of the bearer token if a valid one is sent
+
+    Does not hit the database; used by public endpoints that only need to
+    know who is asking, e.g. to give a signed-in user read-your-writes.
+    """
+    if credentials is None:
+        return None
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        return None
+    return payload.get("sub")
+
+
 @router.get("/me", response_model=User)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user)
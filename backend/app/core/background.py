@@ -0,0 +1,48 @@
+"""
+Fire-and-forget background tasks
+
+Work that must not delay the response (fan-out updates, cache refreshes) is
+started with ``run_in_background``. Tasks are referenced until they finish so
+they are not garbage collected mid-flight, failures are logged, and shutdown
+waits briefly for the ones still running.
+"""
+from typing import Awaitable, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def run_in_background(coro: Awaitable, description: str) -> asyncio.Task:
+    """
+    Schedule a coroutine on the running loop without awaiting it
+    """
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+
+    def _done(finished: asyncio.Task) -> None:
+        _tasks.discard(finished)
+        if finished.cancelled():
+            return
+        error = finished.exception()
+        if error is not None:
+            logger.error(f"Background task failed ({description}): {error}")
+
+    task.add_done_callback(_done)
+    return task
+
+
+async def wait_for_background_tasks(timeout: float = 10.0) -> None:
+    """
+    Wait for running background tasks, cancelling whatever is left after timeout
+    """
+    if not _tasks:
+        return
+    pending = set(_tasks)
+    _, still_running = await asyncio.wait(pending, timeout=timeout)
+    for task in still_running:
+        task.cancel()
+    if still_running:
+        logger.warning(f"Cancelled {len(still_running)} background tasks at shutdown")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -20,6 +20,102 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "teach_better_db"
+    MONGODB_ENSURE_INDEXES: bool = True  # Reconcile declared indexes at startup
+
+    # MongoDB connection pool (0 disables the idle/wait timeouts)
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # Comma-separated, in order of preference; unavailable ones are skipped
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"
+
+    # Read routing (primary, primaryPreferred, secondary, secondaryPreferred, nearest)
+    MONGODB_ANALYTICS_READ_PREFERENCE: str = "secondaryPreferred"
+    MONGODB_LISTING_READ_PREFERENCE: str = "secondaryPreferred"
+    MONGODB_MAX_STALENESS_SECONDS: int = -1  # -1 = no limit, otherwise >= 90
+    CAUSAL_TOKEN_TTL_SECONDS: int = 300  # How long a user's last write is tracked
+
+    # Post search index (falls back to MongoDB regex search when disabled)
+    SEARCH_ENGINE_ENABLED: bool = True
+    SEARCH_INDEX_PATH: str = "data/search_index.json.gz"
+    SEARCH_INDEX_SYNC_INTERVAL_SECONDS: int = 60  # Catch-up and snapshot interval
+    SEARCH_MAX_RESULTS: int = 1000  # Best matches considered per query
+
+    # Estimated totals stop counting list matches after this many
+    PAGINATION_COUNT_LIMIT: int = 10000
+
+    # Hot feed cache for first pages of GET /posts
+    FEED_CACHE_ENABLED: bool = True
+    FEED_CACHE_TTL_SECONDS: int = 10
+    FEED_CACHE_MAX_ENTRIES: int = 256
+
+    # HTTP caching of read endpoints (Cache-Control max-age)
+    HTTP_CACHE_CATALOG_MAX_AGE_SECONDS: int = 60  # Tag and category listings
+    HTTP_CACHE_I18N_MAX_AGE_SECONDS: int = 3600
+
+    # Related posts (needs NumPy and SciPy)
+    RELATED_POSTS_ENABLED: bool = True
+    RELATED_POSTS_LIMIT: int = 5
+    RELATED_POSTS_TAG_WEIGHT: float = 0.3  # Share of the score from tag co-occurrence
+    RELATED_POSTS_REFRESH_SECONDS: int = 30  # Catch-up and matrix refresh interval
+    RELATED_POSTS_FULL_REBUILD_SECONDS: int = 3600  # Drops columns of terms and tags no post uses anymore
+
+    # Materialized hot ranking (GET /posts?sort_by=hot)
+    HOT_RANKING_ENABLED: bool = True
+    HOT_RANKING_INTERVAL_SECONDS: int = 60  # Incremental rescoring interval
+    HOT_RANKING_FULL_REBUILD_SECONDS: int = 3600
+    HOT_RANKING_DECAY_SECONDS: int = 45000  # Freshness worth 10x engagement
+
+    # Per-worker cache of user summaries (name, avatar, role)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # Answer comments: listings embed only the newest few, long threads move
+    # to the answer_comments collection
+    ANSWER_COMMENT_PREVIEW_SIZE: int = 3
+    ANSWER_COMMENT_EXTERNAL_THRESHOLD: int = 200
+
+    # Write-behind post view counter
+    VIEW_COUNT_FLUSH_INTERVAL_SECONDS: int = 10
+    VIEW_COUNT_FLUSH_MAX_EVENTS: int = 1000  # Flush early once this many views are pending
+
+    # LLM provider (OpenAI-compatible API) used by the AI diagnosis
+    LLM_BASE_URL: str = "https://ai.megallm.io/v1"
+    MEGALLM_API_KEY: Optional[str] = None
+    LLM_MODEL: str = "gpt-3.5-turbo"
+    LLM_TIMEOUT_SECONDS: float = 120  # Per call, generating long answers is slow
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 10
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = 60
+    LLM_MAX_RETRIES: int = 2  # Connection errors, 429 and 5xx, with backoff
+    LLM_EVALUATION_TIMEOUT_SECONDS: float = 30  # Grading one short answer
+    LLM_EVALUATION_CONCURRENCY: int = 4  # Short answers graded at once per submission
+    LLM_EVALUATION_BATCH_ENABLED: bool = True  # Grade a submission's short answers in one prompt
+    LLM_EVALUATION_BATCH_TIMEOUT_SECONDS: float = 60
+    LLM_MAX_CONCURRENT_CALLS: int = 16  # Per worker, further calls wait for a slot
+
+    # LLM response cache: per-worker LRU in front of the llm_responses collection
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 604800  # 7 days
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+
+    # Background AI diagnosis jobs (analysis, question generation)
+    DIAGNOSIS_JOB_WORKERS: int = 2  # Jobs run at once per app worker, 0 only enqueues
+    DIAGNOSIS_JOB_LEASE_SECONDS: int = 60  # Renewed every third of it while running
+    DIAGNOSIS_JOB_MAX_ATTEMPTS: int = 3
+    DIAGNOSIS_JOB_RETRY_BACKOFF_SECONDS: float = 10  # Doubled for each further attempt
+    DIAGNOSIS_JOB_POLL_SECONDS: float = 2
+    DIAGNOSIS_JOB_RETENTION_SECONDS: int = 604800  # Finished jobs, 7 days
+    DIAGNOSIS_WAIT_MAX_SECONDS: int = 25  # Longest long poll of GET /diagnoses/{id}
+
+    # Query profiler (development/staging only)
+    QUERY_PROFILER_ENABLED: bool = False
+    QUERY_PROFILER_EXPLAIN_INTERVAL_SECONDS: int = 300
+    QUERY_PROFILER_TOP_SHAPES: int = 20
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
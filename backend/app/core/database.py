@@ -1,5 +1,20 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession, AsyncIOMotorDatabase
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred
+)
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from app.core.config import settings
+from app.core.query_profiler import query_profiler
+from app.core.pool_metrics import pool_metrics
+import asyncio
+import importlib.util
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,10 +23,77 @@ logger = logging.getLogger(__name__)
 class Database:
     client: AsyncIOMotorClient = None
     db: AsyncIOMotorDatabase = None
+    read_dbs: Dict[str, AsyncIOMotorDatabase] = {}
 
 
 db = Database()
 
+# Wire compressor name -> module that must be importable for it to work
+COMPRESSOR_MODULES = {
+    "zstd": "zstandard",
+    "snappy": "snappy",
+    "zlib": "zlib",
+}
+
+
+def get_available_compressors() -> List[str]:
+    """
+    Get the configured wire compressors whose optional packages are installed,
+    keeping the configured order of preference
+    """
+    available = []
+    for name in settings.MONGODB_COMPRESSORS.split(","):
+        name = name.strip()
+        module = COMPRESSOR_MODULES.get(name)
+        if not module:
+            logger.warning(f"Unknown MongoDB compressor ignored: {name}")
+            continue
+        if importlib.util.find_spec(module) is None:
+            logger.warning(f"MongoDB compressor '{name}' skipped, package '{module}' is not installed")
+            continue
+        available.append(name)
+    return available
+
+
+def get_client_options() -> Dict[str, Any]:
+    """
+    Build AsyncIOMotorClient keyword options from settings
+    """
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS or None,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS or None,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    }
+
+    compressors = get_available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+
+    event_listeners = [pool_metrics]
+    if settings.QUERY_PROFILER_ENABLED:
+        event_listeners.append(query_profiler)
+    options["event_listeners"] = event_listeners
+
+    return options
+
+
+async def warm_connection_pool():
+    """
+    Open minPoolSize connections before serving traffic
+
+    Concurrent pings force the pool to check out (and therefore create)
+    that many connections at once instead of on the first burst of requests.
+    """
+    size = settings.MONGODB_MIN_POOL_SIZE
+    if not db.client or size <= 0:
+        return
+
+    await asyncio.gather(*(db.client.admin.command('ping') for _ in range(size)))
+    stats = pool_metrics.snapshot()
+    logger.info(f"MongoDB connection pool warmed: {stats['connections_open']} connections open")
+
 
 async def connect_to_mongo():
     """
@@ -19,8 +101,9 @@ async def connect_to_mongo():
     """
     try:
         logger.info("Connecting to MongoDB...")
-        db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        db.client = AsyncIOMotorClient(settings.MONGODB_URL, **get_client_options())
         db.db = db.client[settings.MONGODB_DB_NAME]
+        db.read_dbs = {}
         
         # Test the connection
         await db.client.admin.command('ping')
@@ -49,3 +132,153 @@ def get_database() -> AsyncIOMotorDatabase:
     Get database instance
     """
     return db.db
+
+
+# =============================================================================
+# Read routing
+# =============================================================================
+
+# Read preference mode name -> pymongo read preference class
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Workload name -> setting holding its read preference mode
+READ_WORKLOADS = {
+    "analytics": "MONGODB_ANALYTICS_READ_PREFERENCE",
+    "listing": "MONGODB_LISTING_READ_PREFERENCE",
+}
+
+
+def build_read_preference(mode: str):
+    """
+    Build a pymongo read preference from its mode name
+    """
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference: {mode}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=settings.MONGODB_MAX_STALENESS_SECONDS)
+
+
+def get_read_database(workload: str) -> AsyncIOMotorDatabase:
+    """
+    Get a database handle routed with the read preference of a workload
+
+    Handles are cached per workload; they share the client's connection pools.
+    """
+    if workload not in db.read_dbs:
+        mode = getattr(settings, READ_WORKLOADS[workload])
+        db.read_dbs[workload] = db.db.with_options(read_preference=build_read_preference(mode))
+    return db.read_dbs[workload]
+
+
+def get_analytics_database() -> AsyncIOMotorDatabase:
+    """
+    Get database instance for admin statistics, charts and activity feeds
+    """
+    return get_read_database("analytics")
+
+
+def get_listing_database() -> AsyncIOMotorDatabase:
+    """
+    Get database instance for heavy list reads (posts, tags, diagnoses)
+    """
+    return get_read_database("listing")
+
+
+class CausalTokenStore:
+    """
+    Remembers the cluster/operation time of each user's latest write
+
+    A read session advanced to these times makes a secondary wait until it
+    has replicated that write, which gives the user read-your-writes while
+    their reads are still served by secondaries. The tokens are kept in the
+    causal_tokens collection and read from the primary, so the next request
+    observes the write whichever worker or replica serves it. The TTL index
+    drops them after CAUSAL_TOKEN_TTL_SECONDS, by then replication has long
+    caught up.
+    """
+
+    def _collection(self):
+        if db.db is None:
+            return None
+        return db.db.causal_tokens.with_options(read_preference=Primary())
+
+    async def get(self, key: str) -> Optional[Tuple[Any, Any]]:
+        """
+        Get (cluster_time, operation_time) for a user, if still fresh
+        """
+        collection = self._collection()
+        if collection is None:
+            return None
+        try:
+            token = await collection.find_one({"_id": key})
+        except PyMongoError as e:
+            logger.warning(f"Causal token lookup failed: {e}")
+            return None
+        # The TTL monitor runs once a minute, expired tokens can linger
+        if token is None or token["expires_at"] < datetime.utcnow():
+            return None
+        return token.get("cluster_time"), token["operation_time"]
+
+    async def record(self, key: str, session: AsyncIOMotorClientSession) -> None:
+        """
+        Store the times observed by a session that performed writes
+        """
+        collection = self._collection()
+        if collection is None or session.operation_time is None:
+            # Standalone servers do not report operation times
+            return
+        try:
+            # Never move a token back when a slower concurrent request records an older time
+            await collection.update_one(
+                {"_id": key, "operation_time": {"$lt": session.operation_time}},
+                {"$set": {
+                    "cluster_time": session.cluster_time,
+                    "operation_time": session.operation_time,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=settings.CAUSAL_TOKEN_TTL_SECONDS)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # A newer token is already stored
+            pass
+        except PyMongoError as e:
+            logger.warning(f"Failed to record causal token: {e}")
+
+
+causal_tokens = CausalTokenStore()
+
+
+@asynccontextmanager
+async def causal_session(user_key: Optional[str]) -> AsyncIterator[Optional[AsyncIOMotorClientSession]]:
+    """
+    Open a causally consistent session for a user
+
+    The session starts from the user's latest recorded write, so reads
+    through it observe that write even on a secondary. Whatever the session
+    writes is recorded for the user's next request. Yields None for
+    anonymous callers, who have no writes to read back.
+
+    Usage:
+        async with causal_session(current_user.email) as session:
+            await collection.insert_one(doc, session=session)
+    """
+    if not user_key or not db.client:
+        yield None
+        return
+
+    async with await db.client.start_session(causal_consistency=True) as session:
+        token = await causal_tokens.get(user_key)
+        if token:
+            cluster_time, operation_time = token
+            if cluster_time is not None:
+                session.advance_cluster_time(cluster_time)
+            session.advance_operation_time(operation_time)
+        yield session
+        await causal_tokens.record(user_key, session)
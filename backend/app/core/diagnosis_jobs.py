@@ -0,0 +1,356 @@
+"""
+Background diagnosis jobs
+
+Lecture analysis and question generation take one or more LLM calls, far
+longer than an HTTP request should stay open behind a proxy. The endpoints
+only enqueue a job in the ``diagnosis_jobs`` collection and return; every
+app worker runs DIAGNOSIS_JOB_WORKERS coroutines that claim queued jobs
+and run them. A claim is a lease renewed while the job runs, so the job of
+a worker that crashed is claimed again once its lease runs out. Failed
+jobs are retried with exponential backoff up to DIAGNOSIS_JOB_MAX_ATTEMPTS
+times. Writes about a job are fenced by its lease token, a worker that
+lost its lease can't overwrite the new owner's outcome.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.diagnosis_job import DiagnosisJobKind, DiagnosisJobStatus
+
+logger = logging.getLogger(__name__)
+
+# Runs a claimed job; ValueError means it can never succeed and is not retried
+JobRunner = Callable[[dict], Awaitable[None]]
+# Called once a job has failed for good, with the last error
+JobFailureHandler = Callable[[dict, str], Awaitable[None]]
+
+
+class DiagnosisJobQueue:
+    """
+    MongoDB-backed job queue with leases, retries and crash recovery
+    """
+
+    def __init__(self):
+        self._collection = None
+        self._run: Optional[JobRunner] = None
+        self._give_up: Optional[JobFailureHandler] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.recovered = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._runs = 0
+        self._run_seconds = 0.0
+        self._max_run_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    async def enqueue(
+        self,
+        kind: DiagnosisJobKind,
+        diagnosis_id: ObjectId,
+        user_id: ObjectId,
+        params: Optional[Dict[str, Any]] = None
+    ) -> dict:
+        """
+        Queue a job, or return the one already pending for this diagnosis and kind
+        """
+        if self._collection is None:
+            raise RuntimeError("Diagnosis job queue is not started")
+
+        now = datetime.utcnow()
+        job = {
+            "diagnosis_id": diagnosis_id,
+            "user_id": user_id,
+            "kind": kind.value,
+            "params": params or {},
+            "status": DiagnosisJobStatus.QUEUED.value,
+            "active": True,
+            "attempts": 0,
+            "available_at": now,
+            "lease_token": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None
+        }
+        # A pending job can finish between the failed insert and the lookup
+        for _ in range(3):
+            try:
+                result = await self._collection.insert_one(job)
+            except DuplicateKeyError:
+                pending = await self._collection.find_one(
+                    {"diagnosis_id": diagnosis_id, "kind": kind.value, "active": True}
+                )
+                if pending is not None:
+                    return pending
+                job.pop("_id", None)
+                continue
+            job["_id"] = result.inserted_id
+            self.enqueued += 1
+            self._wake.set()
+            return job
+        raise RuntimeError("Could not enqueue diagnosis job")
+
+    async def wait_for_update(self, diagnosis_id: str, timeout: float) -> None:
+        """
+        Wait until a job of this diagnosis finishes in this worker, or timeout
+
+        Jobs finished by other workers don't wake the caller, who should
+        re-read the diagnosis after at most DIAGNOSIS_JOB_POLL_SECONDS.
+        """
+        event = asyncio.Event()
+        self._waiters.setdefault(diagnosis_id, set()).add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(diagnosis_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[diagnosis_id]
+
+    def _notify(self, diagnosis_id: Any) -> None:
+        for event in self._waiters.get(str(diagnosis_id), ()):
+            event.set()
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+
+    def start(self, database: AsyncIOMotorDatabase, run: JobRunner, give_up: JobFailureHandler) -> None:
+        """
+        Start the job workers of this app worker
+        """
+        self._collection = database.diagnosis_jobs
+        self._run = run
+        self._give_up = give_up
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._work())
+            for _ in range(settings.DIAGNOSIS_JOB_WORKERS)
+        ]
+
+    async def stop(self) -> None:
+        """
+        Stop the job workers, handing running jobs back to the queue
+        """
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _work(self) -> None:
+        while True:
+            # Cleared before looking, so an enqueue during the lookup is not missed
+            self._wake.clear()
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Claiming a diagnosis job failed: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), settings.DIAGNOSIS_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Recording the outcome failed, the lease runs out and the job is retried
+                logger.error(f"Diagnosis job {job['_id']} could not be recorded: {e}")
+
+    async def _claim(self) -> Optional[dict]:
+        """
+        Lease the oldest due job, or else one whose worker stopped renewing its lease
+        """
+        now = datetime.utcnow()
+        update = {
+            "$set": {
+                "status": DiagnosisJobStatus.RUNNING.value,
+                "started_at": now,
+                "lease_token": str(ObjectId()),
+                "lease_expires_at": now + timedelta(seconds=settings.DIAGNOSIS_JOB_LEASE_SECONDS)
+            },
+            "$inc": {"attempts": 1}
+        }
+        job = await self._collection.find_one_and_update(
+            {"status": DiagnosisJobStatus.QUEUED.value, "available_at": {"$lte": now}},
+            update,
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            return job
+
+        job = await self._collection.find_one_and_update(
+            {"status": DiagnosisJobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}},
+            update,
+            sort=[("lease_expires_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            self.recovered += 1
+            logger.warning(f"Recovered diagnosis job {job['_id']} after its lease expired")
+        return job
+
+    async def _execute(self, job: dict) -> None:
+        self._record_wait((datetime.utcnow() - job["available_at"]).total_seconds())
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.perf_counter()
+        try:
+            if job["attempts"] > settings.DIAGNOSIS_JOB_MAX_ATTEMPTS:
+                # Its workers kept dying while running it
+                await self._fail(job, "Lease expired too many times", permanent=True)
+                return
+            await self._run(job)
+        except asyncio.CancelledError:
+            await self._release(job)
+            raise
+        except Exception as e:
+            await self._fail(job, str(e) or type(e).__name__, permanent=isinstance(e, ValueError))
+        else:
+            if await self._finish(job, DiagnosisJobStatus.COMPLETED):
+                self.completed += 1
+        finally:
+            heartbeat.cancel()
+            self._record_run(time.perf_counter() - started)
+            self._notify(job["diagnosis_id"])
+
+    async def _heartbeat(self, job: dict) -> None:
+        interval = settings.DIAGNOSIS_JOB_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await self._collection.update_one(
+                    {"_id": job["_id"], "lease_token": job["lease_token"]},
+                    {"$set": {
+                        "lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.DIAGNOSIS_JOB_LEASE_SECONDS)
+                    }}
+                )
+            except Exception as e:
+                logger.warning(f"Renewing the lease of diagnosis job {job['_id']} failed: {e}")
+                continue
+            if result.matched_count == 0:
+                logger.warning(f"Diagnosis job {job['_id']} lost its lease")
+                return
+
+    async def _finish(self, job: dict, status: DiagnosisJobStatus, error: Optional[str] = None) -> bool:
+        """
+        Record a job's outcome, False if another worker owns it by now
+        """
+        result = await self._collection.update_one(
+            {"_id": job["_id"], "lease_token": job["lease_token"]},
+            {
+                "$set": {"status": status.value, "finished_at": datetime.utcnow(), "last_error": error},
+                "$unset": {"active": "", "lease_token": "", "lease_expires_at": ""}
+            }
+        )
+        return result.matched_count > 0
+
+    async def _fail(self, job: dict, error: str, permanent: bool) -> None:
+        if permanent or job["attempts"] >= settings.DIAGNOSIS_JOB_MAX_ATTEMPTS:
+            logger.error(f"Diagnosis job {job['_id']} ({job['kind']}) failed: {error}")
+            if not await self._finish(job, DiagnosisJobStatus.FAILED, error):
+                return
+            self.failed += 1
+            try:
+                await self._give_up(job, error)
+            except Exception as e:
+                logger.error(f"Marking diagnosis {job['diagnosis_id']} as failed failed: {e}")
+            return
+
+        delay = settings.DIAGNOSIS_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+        logger.warning(f"Diagnosis job {job['_id']} ({job['kind']}) failed, retrying in {delay:.0f}s: {error}")
+        result = await self._collection.update_one(
+            {"_id": job["_id"], "lease_token": job["lease_token"]},
+            {
+                "$set": {
+                    "status": DiagnosisJobStatus.QUEUED.value,
+                    "available_at": datetime.utcnow() + timedelta(seconds=delay),
+                    "last_error": error
+                },
+                "$unset": {"lease_token": "", "lease_expires_at": ""}
+            }
+        )
+        if result.matched_count:
+            self.retried += 1
+
+    async def _release(self, job: dict) -> None:
+        """
+        Hand a job interrupted by shutdown back to the queue without using up an attempt
+        """
+        try:
+            await self._collection.update_one(
+                {"_id": job["_id"], "lease_token": job["lease_token"]},
+                {
+                    "$set": {"status": DiagnosisJobStatus.QUEUED.value, "available_at": datetime.utcnow()},
+                    "$unset": {"lease_token": "", "lease_expires_at": ""},
+                    "$inc": {"attempts": -1}
+                }
+            )
+        except Exception as e:
+            # Its lease runs out and another worker picks it up
+            logger.warning(f"Releasing diagnosis job {job['_id']} failed: {e}")
+
+    def _record_wait(self, seconds: float) -> None:
+        seconds = max(seconds, 0.0)
+        self._waited += 1
+        self._wait_seconds += seconds
+        self._max_wait_seconds = max(self._max_wait_seconds, seconds)
+
+    def _record_run(self, seconds: float) -> None:
+        self._runs += 1
+        self._run_seconds += seconds
+        self._max_run_seconds = max(self._max_run_seconds, seconds)
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and this worker's job counts and latencies for diagnostics
+        """
+        depth = {}
+        if self._collection is not None:
+            for status in (DiagnosisJobStatus.QUEUED, DiagnosisJobStatus.RUNNING):
+                depth[status.value] = await self._collection.count_documents({"status": status.value})
+        return {
+            "workers": len(self._tasks),
+            "depth": depth,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "recovered": self.recovered,
+            "average_queue_seconds": round(self._wait_seconds / self._waited, 3) if self._waited else None,
+            "max_queue_seconds": round(self._max_wait_seconds, 3),
+            "average_run_seconds": round(self._run_seconds / self._runs, 3) if self._runs else None,
+            "max_run_seconds": round(self._max_run_seconds, 3)
+        }
+
+
+diagnosis_jobs = DiagnosisJobQueue()
@@ -0,0 +1,129 @@
+"""
+Hot feed cache
+
+Most ``GET /posts`` traffic is the first page in the default sort, optionally
+narrowed to one category or one tag. Those responses are kept in process,
+already serialized, for FEED_CACHE_TTL_SECONDS. Post writes in this worker
+drop the affected entries immediately; writes made by other workers become
+visible once the TTL runs out. Only one rebuild of a missing entry runs at
+a time, concurrent requests for the same key wait for its result (see
+app.core.single_flight).
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from collections import OrderedDict
+import logging
+import time
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# (category, tag_id, sort_by, sort_order, limit, estimate_total)
+FeedKey = Tuple[Optional[str], Optional[str], str, int, int, bool]
+
+
+class FeedCache:
+    """
+    Size-bounded TTL cache of first feed pages with single-flight rebuilds
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[FeedKey, Tuple[float, Any]]" = OrderedDict()
+        self._single_flight = SingleFlight()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        category: Optional[str],
+        tag_id: Optional[str],
+        sort_by: str,
+        sort_order: int,
+        limit: int,
+        estimate_total: bool
+    ) -> FeedKey:
+        """
+        Build the cache key of a first feed page
+        """
+        return (category or None, tag_id or None, sort_by, sort_order, limit, estimate_total)
+
+    async def get_or_build(self, key: FeedKey, build: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached page, building it with ``build`` when missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if key in self._single_flight:
+            # Someone is already rebuilding this key
+            self.hits += 1
+        else:
+            self.misses += 1
+        value, _ = await self._single_flight.do(key, lambda: self._build(key, build))
+        return value
+
+    async def _build(self, key: FeedKey, build: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generation
+        value = await build()
+        # A write that landed while building may not be reflected, don't keep it
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    def _store(self, key: FeedKey, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + settings.FEED_CACHE_TTL_SECONDS, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.FEED_CACHE_MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, category: Optional[str] = None, tag_ids: Optional[Iterable[Any]] = None) -> None:
+        """
+        Drop the pages a post with this category and these tags can appear on
+
+        Without arguments every page is dropped.
+        """
+        self._generation += 1
+        if category is None and tag_ids is None:
+            self._entries.clear()
+            return
+
+        tags = {str(tag_id) for tag_id in tag_ids or []}
+        for key in list(self._entries):
+            key_category, key_tag = key[0], key[1]
+            if key_category is not None and key_category != category:
+                continue
+            if key_tag is not None and key_tag not in tags:
+                continue
+            del self._entries[key]
+
+    def invalidate_post(self, post: Optional[dict]) -> None:
+        """
+        Drop the pages affected by a change to a post document
+
+        Falls back to dropping everything when the post is unknown.
+        """
+        if not post:
+            self.invalidate()
+            return
+        self.invalidate(post.get("category"), post.get("tag_ids") or [])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache state for diagnostics
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+feed_cache = FeedCache()
@@ -0,0 +1,310 @@
+"""
+Materialized "hot" ranking of posts
+
+Each live post gets a score from its views, answers and answer votes plus
+its age, in the style of Reddit's hot ranking::
+
+    score = log10(max(engagement, 1)) + created_at / HOT_RANKING_DECAY_SECONDS
+
+Because recency enters as an offset instead of a time-dependent divisor, a
+post's score only changes when the post itself changes: ten times the
+engagement is worth one decay period of freshness. That lets a background job
+keep an in-memory ranking current by rescoring just the posts changed since
+its previous run (posts and answers touched via ``updated_at``, plus posts
+whose buffered views this worker flushed), with a periodic full rebuild to
+pick up view counts flushed by other workers.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import math
+import time
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+POST_PROJECTION = {
+    "view_count": 1, "answer_count": 1, "created_at": 1,
+    "category": 1, "tag_ids": 1, "author_id": 1, "is_deleted": 1, "updated_at": 1
+}
+
+# Engagement weights: one answer is worth 40 views, one answer upvote 20
+VIEW_WEIGHT = 0.05
+ANSWER_WEIGHT = 2.0
+ANSWER_VOTE_WEIGHT = 1.0
+
+# Posts rescored per round trip
+BATCH_SIZE = 500
+
+# Changes are re-read this far behind the watermarks, since writes from other
+# workers can commit slightly out of timestamp order
+SYNC_OVERLAP = timedelta(seconds=5)
+
+EPOCH = datetime(2024, 1, 1)
+
+
+def hot_score(view_count: int, answer_count: int, answer_votes: int, created_at: Optional[datetime]) -> float:
+    """
+    Compute the hot score of a post
+    """
+    engagement = view_count * VIEW_WEIGHT + answer_count * ANSWER_WEIGHT + answer_votes * ANSWER_VOTE_WEIGHT
+    age_offset = ((created_at or EPOCH) - EPOCH).total_seconds() / settings.HOT_RANKING_DECAY_SECONDS
+    return math.log10(max(engagement, 1.0)) + age_offset
+
+
+class HotRanking:
+    """
+    In-memory hot ranking kept current by an incremental background job
+    """
+
+    def __init__(self):
+        self.ready = False
+        # post id -> (score, category, tag ids, author id)
+        self._entries: Dict[str, Tuple[float, Optional[str], Tuple[str, ...], str]] = {}
+        # (-score, post id), sorted
+        self._ranked: List[Tuple[float, str]] = []
+        self._dirty: Set[ObjectId] = set()
+        self._post_watermark: Optional[datetime] = None
+        self._answer_watermark: Optional[datetime] = None
+        self._last_full_build = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_run_ms = 0.0
+        self.last_run_posts = 0
+        self.last_run_full = False
+        self.last_run_at: Optional[datetime] = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def page(
+        self,
+        skip: int,
+        limit: int,
+        author_id: Optional[str] = None,
+        tag_ids: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        post_ids: Optional[Iterable[str]] = None
+    ) -> Optional[Tuple[List[str], int]]:
+        """
+        Get one page of post ids in hot order and the number of matches
+
+        post_ids restricts the ranking to those posts (e.g. search hits).
+        Returns None while the ranking is not ready, so callers can fall
+        back to another sort.
+        """
+        if not self.ready:
+            return None
+
+        tag_set = set(tag_ids or [])
+        allowed = set(post_ids) if post_ids is not None else None
+        if not (author_id or tag_set or category or allowed is not None):
+            return [post_id for _, post_id in self._ranked[skip:skip + limit]], len(self._ranked)
+
+        matches = []
+        for _, post_id in self._ranked:
+            if allowed is not None and post_id not in allowed:
+                continue
+            entry = self._entries.get(post_id)
+            if entry is None:
+                continue
+            _, post_category, post_tags, post_author = entry
+            if category and post_category != category:
+                continue
+            if author_id and post_author != author_id:
+                continue
+            if tag_set and tag_set.isdisjoint(post_tags):
+                continue
+            matches.append(post_id)
+        return matches[skip:skip + limit], len(matches)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get ranking state and the cost of the last job run
+        """
+        return {
+            "ready": self.ready,
+            "ranked_posts": len(self._ranked),
+            "pending_dirty_posts": len(self._dirty),
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_ms": round(self.last_run_ms, 2),
+            "last_run_posts": self.last_run_posts,
+            "last_run_full": self.last_run_full
+        }
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, post_ids: Iterable[ObjectId]) -> None:
+        """
+        Queue posts for rescoring on the next run (e.g. after a view flush)
+        """
+        self._dirty.update(post_ids)
+
+    async def rescore(self, database: AsyncIOMotorDatabase, post_ids: List[ObjectId]) -> int:
+        """
+        Recompute the scores of the given posts, returns how many were touched
+        """
+        touched = 0
+        for start in range(0, len(post_ids), BATCH_SIZE):
+            batch = post_ids[start:start + BATCH_SIZE]
+            posts = await database.posts.find({"_id": {"$in": batch}}, POST_PROJECTION).to_list(length=None)
+            touched += await self._apply(database, posts, self._entries)
+        return touched
+
+    async def build(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Score every live post from scratch
+        """
+        # Built aside, so queries keep using the current entries meanwhile
+        entries: Dict[str, Tuple[float, Optional[str], Tuple[str, ...], str]] = {}
+        self._dirty.clear()
+        # Answers changed from here on are caught by the next catch-up
+        self._advance_answer_watermark(datetime.utcnow())
+        touched = 0
+        batch = []
+        async for post in database.posts.find({"is_deleted": False}, POST_PROJECTION).batch_size(BATCH_SIZE):
+            batch.append(post)
+            if len(batch) >= BATCH_SIZE:
+                touched += await self._apply(database, batch, entries)
+                batch = []
+        touched += await self._apply(database, batch, entries)
+        self._entries = entries
+        self._last_full_build = time.monotonic()
+        return touched
+
+    async def catch_up(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Rescore posts changed since the previous run
+
+        A post is changed when it was updated itself, when one of its answers
+        was (answer votes bump the answer's ``updated_at``), or when it was
+        marked dirty by this worker.
+        """
+        changed: Set[ObjectId] = set(self._dirty)
+        self._dirty.clear()
+
+        post_query = {"updated_at": {"$gte": self._post_watermark - SYNC_OVERLAP}} if self._post_watermark else {}
+        async for post in database.posts.find(post_query, {"_id": 1}):
+            changed.add(post["_id"])
+
+        if self._answer_watermark:
+            answer_query = {"updated_at": {"$gte": self._answer_watermark - SYNC_OVERLAP}}
+            async for answer in database.answers.find(answer_query, {"post_id": 1, "updated_at": 1}):
+                changed.add(answer["post_id"])
+                self._advance_answer_watermark(answer.get("updated_at"))
+
+        return await self.rescore(database, list(changed))
+
+    async def _apply(self, database: AsyncIOMotorDatabase, posts: List[dict], entries: Dict[str, Any]) -> int:
+        if not posts:
+            return 0
+
+        live_ids = [post["_id"] for post in posts if not post.get("is_deleted")]
+        answer_votes: Dict[ObjectId, int] = {}
+        if live_ids:
+            pipeline = [
+                {"$match": {"post_id": {"$in": live_ids}, "is_deleted": False}},
+                {"$group": {"_id": "$post_id", "votes": {"$sum": "$votes.score"}, "updated_at": {"$max": "$updated_at"}}}
+            ]
+            async for row in database.answers.aggregate(pipeline):
+                answer_votes[row["_id"]] = row["votes"]
+                self._advance_answer_watermark(row.get("updated_at"))
+
+        for post in posts:
+            post_id = str(post["_id"])
+            if post.get("is_deleted"):
+                entries.pop(post_id, None)
+            else:
+                score = hot_score(
+                    post.get("view_count", 0),
+                    post.get("answer_count", 0),
+                    answer_votes.get(post["_id"], 0),
+                    post.get("created_at")
+                )
+                entries[post_id] = (
+                    score,
+                    post.get("category"),
+                    tuple(str(tag_id) for tag_id in post.get("tag_ids") or []),
+                    str(post.get("author_id", ""))
+                )
+            updated_at = post.get("updated_at")
+            if updated_at and (self._post_watermark is None or updated_at > self._post_watermark):
+                self._post_watermark = updated_at
+        return len(posts)
+
+    def _advance_answer_watermark(self, updated_at: Optional[datetime]) -> None:
+        if updated_at and (self._answer_watermark is None or updated_at > self._answer_watermark):
+            self._answer_watermark = updated_at
+
+    def _publish(self) -> None:
+        ranked = [(-score, post_id) for post_id, (score, _, _, _) in self._entries.items()]
+        ranked.sort()
+        self._ranked = ranked
+
+    async def run_once(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Run one job pass: a full build when due, otherwise a catch-up
+        """
+        started = time.perf_counter()
+        full = (
+            not self.ready
+            or time.monotonic() - self._last_full_build >= settings.HOT_RANKING_FULL_REBUILD_SECONDS
+        )
+        touched = await (self.build(database) if full else self.catch_up(database))
+        if full or touched:
+            self._publish()
+        self.ready = True
+
+        self.runs += 1
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        self.last_run_posts = touched
+        self.last_run_full = full
+        self.last_run_at = datetime.utcnow()
+        if full or touched:
+            logger.info(f"Hot ranking {'rebuilt' if full else 'updated'}: {touched} posts in {self.last_run_ms:.0f} ms")
+        return touched
+
+    # ------------------------------------------------------------------
+    # Background job
+    # ------------------------------------------------------------------
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        """
+        Start the ranking job
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(database))
+
+    async def stop(self) -> None:
+        """
+        Stop the ranking job
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, database: AsyncIOMotorDatabase) -> None:
+        while True:
+            try:
+                await self.run_once(database)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Hot ranking job failed: {e}")
+            await asyncio.sleep(settings.HOT_RANKING_INTERVAL_SECONDS)
+
+
+hot_ranking = HotRanking()
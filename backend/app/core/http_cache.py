@@ -0,0 +1,109 @@
+"""
+Conditional GET support for read endpoints
+
+Endpoints build a weak ETag, either from the version fields of what they
+serve (cheap, checked before the payload is built) or from a hash of the
+serialized payload, and answer a matching ``If-None-Match`` with an empty
+304. Every response carries a per-route ``Cache-Control`` policy so the
+nginx in front of the frontend can cache the public catalog responses.
+"""
+from typing import Any, Dict, Optional
+import hashlib
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.serialization import FastJSONResponse, dumps
+
+# Per-route Cache-Control policies. Content that changes with user activity
+# may be stored but must be revalidated (cheap thanks to the ETag); catalog
+# and translation responses can be served from caches for a while.
+REVALIDATE = "public, no-cache"
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def catalog_policy() -> str:
+    """
+    Cache-Control for tag and category listings
+    """
+    max_age = settings.HTTP_CACHE_CATALOG_MAX_AGE_SECONDS
+    return f"public, max-age={max_age}, stale-while-revalidate={max_age * 5}"
+
+
+def i18n_policy() -> str:
+    """
+    Cache-Control for translation and language responses
+    """
+    return f"public, max-age={settings.HTTP_CACHE_I18N_MAX_AGE_SECONDS}"
+
+
+# Responses chosen by the request locale (see I18nMiddleware)
+LOCALE_VARY = "Accept-Language, Cookie"
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from version fields (ids, updated_at, counters...)
+    """
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def content_etag(body: bytes) -> str:
+    """
+    Build a weak ETag from a serialized payload
+    """
+    return f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check If-None-Match against an ETag, using weak comparison
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def cache_headers(etag: str, cache_control: str, vary: Optional[str] = None) -> Dict[str, str]:
+    """
+    Build the validator and caching headers of a response
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def not_modified(etag: str, cache_control: str, vary: Optional[str] = None) -> Response:
+    """
+    Build an empty 304 response
+    """
+    return Response(status_code=304, headers=cache_headers(etag, cache_control, vary))
+
+
+def conditional_json(
+    request: Request,
+    content: Any,
+    cache_control: str,
+    etag: Optional[str] = None,
+    vary: Optional[str] = None
+) -> Response:
+    """
+    Serialize a payload and answer it, or a 304 when the client has it
+
+    Without an explicit etag the ETag is a hash of the serialized payload.
+    """
+    body = dumps(content)
+    etag = etag or content_etag(body)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control, vary)
+    return Response(
+        content=body,
+        media_type=FastJSONResponse.media_type,
+        headers=cache_headers(etag, cache_control, vary)
+    )
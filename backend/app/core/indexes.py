@@ -0,0 +1,291 @@
+"""
+MongoDB index registry
+
+Collects the single-field index hints declared on the models with
+``Field(..., index=True)`` together with the compound indexes backing the hot
+list queries, and reconciles them against the database at startup.
+"""
+from typing import Dict, List, Optional, Tuple, Type
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+from app.models.user import UserModel
+from app.models.post import PostModel
+from app.models.answer import AnswerModel
+from app.models.tag import TagModel
+from app.models.category import CategoryModel
+from app.models.report import ReportModel
+from app.models.notification import NotificationModel
+from app.models.ai_diagnosis import AIDiagnosisModel
+
+logger = logging.getLogger(__name__)
+
+# Server error codes raised when an index with the same name or key pattern
+# already exists with different options
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_KEY_SPECS_CONFLICT = 86
+
+
+class IndexSpec:
+    """
+    Declarative description of a single index
+    """
+
+    def __init__(
+        self,
+        keys: List[Tuple[str, int]],
+        unique: bool = False,
+        sparse: bool = False,
+        name: Optional[str] = None,
+        expire_after_seconds: Optional[int] = None,
+        partial_filter: Optional[dict] = None
+    ):
+        self.keys = keys
+        self.unique = unique
+        self.sparse = sparse
+        self.expire_after_seconds = expire_after_seconds
+        self.partial_filter = partial_filter
+        self.name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    def to_index_model(self) -> IndexModel:
+        """
+        Convert to a pymongo IndexModel
+        """
+        options = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.sparse:
+            options["sparse"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return IndexModel(self.keys, **options)
+
+    def matches(self, existing: dict) -> bool:
+        """
+        Check whether an index returned by list_indexes() is equivalent
+        """
+        existing_keys = [
+            (field, int(direction) if isinstance(direction, (int, float)) else direction)
+            for field, direction in existing["key"].items()
+        ]
+        return (
+            existing_keys == self.keys
+            and bool(existing.get("unique", False)) == self.unique
+            and bool(existing.get("sparse", False)) == self.sparse
+            and existing.get("expireAfterSeconds") == self.expire_after_seconds
+            and existing.get("partialFilterExpression") == self.partial_filter
+        )
+
+
+# Collection name -> model whose ``index=True`` hints should be honoured
+MODEL_COLLECTIONS: Dict[str, Type[BaseModel]] = {
+    "users": UserModel,
+    "posts": PostModel,
+    "answers": AnswerModel,
+    "tags": TagModel,
+    "categories": CategoryModel,
+    "reports": ReportModel,
+    "notifications": NotificationModel,
+    "ai_diagnoses": AIDiagnosisModel,
+}
+
+# Compound indexes for each hot query shape, keyed by collection name.
+# Equality fields first, then the sort keys in the direction the services use.
+COMPOUND_INDEXES: Dict[str, List[IndexSpec]] = {
+    "posts": [
+        # PostService.get_posts / get_posts_by_cursor feed and the admin activity
+        # feed. The trailing _id is the keyset tie-breaker, so cursor pages are
+        # served from the index without an in-memory sort.
+        IndexSpec([("is_deleted", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("is_deleted", ASCENDING), ("category", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("is_deleted", ASCENDING), ("tag_ids", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("is_deleted", ASCENDING), ("author_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("is_deleted", ASCENDING), ("view_count", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("is_deleted", ASCENDING), ("answer_count", DESCENDING), ("_id", DESCENDING)]),
+        IndexSpec([("is_deleted", ASCENDING), ("votes.score", DESCENDING), ("_id", DESCENDING)]),
+        # Search index and hot ranking catch-up
+        IndexSpec([("updated_at", ASCENDING)]),
+        # Search index catch-up on author/tag summary fan-outs
+        IndexSpec([("summary_updated_at", ASCENDING)]),
+    ],
+    "answers": [
+        # AnswerService.get_answers_by_post
+        IndexSpec([
+            ("post_id", ASCENDING),
+            ("is_deleted", ASCENDING),
+            ("votes.score", DESCENDING),
+            ("created_at", DESCENDING)
+        ]),
+        IndexSpec([("created_at", DESCENDING)]),
+        # Hot ranking catch-up (app.core.hot_ranking)
+        IndexSpec([("updated_at", ASCENDING)]),
+    ],
+    "answer_comments": [
+        # AnswerService.get_comments_by_cursor on threads moved out of the answer
+        IndexSpec([("answer_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "answer_votes": [
+        # One vote per user and answer; also serves AnswerService.get_my_votes
+        IndexSpec([("answer_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+    ],
+    "causal_tokens": [
+        # Latest write of each user (app.core.database.CausalTokenStore),
+        # removed by the TTL monitor once expires_at has passed
+        IndexSpec([("expires_at", ASCENDING)], expire_after_seconds=0),
+    ],
+    "llm_responses": [
+        # Persistent LLM response cache (app.core.llm_cache): documents are
+        # removed by the TTL monitor once their expires_at has passed
+        IndexSpec([("expires_at", ASCENDING)], expire_after_seconds=0),
+    ],
+    "notifications": [
+        # NotificationService.get_user_notifications / get_unread_count
+        IndexSpec([("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)]),
+        IndexSpec([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "reports": [
+        # ReportService.get_reports / get_user_reports / get_target_reports
+        IndexSpec([("status", ASCENDING), ("report_type", ASCENDING), ("created_at", DESCENDING)]),
+        IndexSpec([("reporter_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexSpec([("target_id", ASCENDING), ("report_type", ASCENDING), ("created_at", DESCENDING)]),
+        IndexSpec([("created_at", DESCENDING)]),
+    ],
+    "ai_diagnoses": [
+        # AIDiagnosisService.get_diagnoses_by_user
+        IndexSpec([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "diagnosis_jobs": [
+        # One pending job per diagnosis and kind (app.core.diagnosis_jobs)
+        IndexSpec(
+            [("diagnosis_id", ASCENDING), ("kind", ASCENDING)],
+            unique=True,
+            partial_filter={"active": True}
+        ),
+        # Claiming the next queued job and recovering expired leases
+        IndexSpec([("status", ASCENDING), ("available_at", ASCENDING)]),
+        IndexSpec([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        # Finished jobs are kept for a while for diagnostics
+        IndexSpec([("finished_at", ASCENDING)], expire_after_seconds=settings.DIAGNOSIS_JOB_RETENTION_SECONDS),
+    ],
+    "audit_logs": [
+        # AuditLogService.get_logs
+        IndexSpec([("created_at", DESCENDING)]),
+        IndexSpec([("target_user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexSpec([("admin_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "users": [
+        # Admin user listing and registration charts
+        IndexSpec([("created_at", DESCENDING)]),
+        # Bookmark fan-out in the answer/comment notification helpers
+        IndexSpec([("bookmarked_post_ids", ASCENDING)]),
+    ],
+    "tags": [
+        # TagService.get_tags / get_popular_tags
+        IndexSpec([("post_count", DESCENDING)]),
+    ],
+}
+
+
+def get_model_index_specs(model: Type[BaseModel]) -> List[IndexSpec]:
+    """
+    Build single-field index specs from ``Field(..., index=True)`` hints
+
+    Pydantic keeps unknown ``Field`` keyword arguments in ``json_schema_extra``,
+    which is where the ``index`` and ``unique`` hints end up.
+    """
+    specs = []
+    for field_name, field in model.model_fields.items():
+        extra = field.json_schema_extra
+        if not isinstance(extra, dict) or not extra.get("index"):
+            continue
+        specs.append(IndexSpec(
+            [(field.alias or field_name, ASCENDING)],
+            unique=bool(extra.get("unique", False))
+        ))
+    return specs
+
+
+def get_index_registry() -> Dict[str, List[IndexSpec]]:
+    """
+    Get all declared indexes grouped by collection, deduplicated by key pattern
+    """
+    registry: Dict[str, List[IndexSpec]] = {}
+    collections = set(MODEL_COLLECTIONS) | set(COMPOUND_INDEXES)
+
+    for collection in sorted(collections):
+        specs = []
+        model = MODEL_COLLECTIONS.get(collection)
+        if model:
+            specs.extend(get_model_index_specs(model))
+        specs.extend(COMPOUND_INDEXES.get(collection, []))
+
+        seen = set()
+        unique_specs = []
+        for spec in specs:
+            key = tuple(spec.keys)
+            if key in seen:
+                continue
+            seen.add(key)
+            unique_specs.append(spec)
+        registry[collection] = unique_specs
+
+    return registry
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """
+    Reconcile the declared indexes with the database
+
+    Missing indexes are created. Indexes whose keys or options drifted from
+    the declaration and undeclared indexes are only reported, since dropping
+    them on a live collection has to be a deliberate operation.
+    A failure on one index is logged and does not block startup.
+
+    Returns:
+        Dict with the names of created, drifted, undeclared and failed indexes
+    """
+    summary = {"created": [], "drifted": [], "undeclared": [], "failed": []}
+
+    for collection_name, specs in get_index_registry().items():
+        collection = database[collection_name]
+        existing = {index["name"]: index async for index in collection.list_indexes()}
+        declared_names = {spec.name for spec in specs}
+
+        to_create = []
+        for spec in specs:
+            current = existing.get(spec.name)
+            if current is None:
+                to_create.append(spec)
+            elif not spec.matches(current):
+                logger.warning(f"Index {collection_name}.{spec.name} differs from its declaration")
+                summary["drifted"].append(f"{collection_name}.{spec.name}")
+
+        for spec in to_create:
+            try:
+                await collection.create_indexes([spec.to_index_model()])
+                summary["created"].append(f"{collection_name}.{spec.name}")
+            except OperationFailure as e:
+                if e.code in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                    # Same key pattern already exists under another name
+                    logger.warning(f"Index {collection_name}.{spec.name} conflicts with an existing index: {e}")
+                else:
+                    logger.error(f"Failed to create index {collection_name}.{spec.name}: {e}")
+                summary["failed"].append(f"{collection_name}.{spec.name}")
+
+        for name in existing:
+            if name != "_id_" and name not in declared_names:
+                summary["undeclared"].append(f"{collection_name}.{name}")
+
+    logger.info(
+        f"Index reconciliation done: {len(summary['created'])} created, "
+        f"{len(summary['drifted'])} drifted, {len(summary['failed'])} failed, "
+        f"{len(summary['undeclared'])} undeclared"
+    )
+    return summary
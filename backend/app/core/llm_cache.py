@@ -0,0 +1,225 @@
+"""
+Content-addressed LLM response cache
+
+Teachers re-run the analysis of a lecture or submit the same lecture again,
+and every identical prompt used to pay the full provider latency and cost.
+Responses are keyed by a hash of (template version, model, rendered prompt)
+and kept in two tiers: a size-bounded LRU in this worker and the
+``llm_responses`` collection, shared by all workers and expired by a TTL
+index. Concurrent identical prompts share one upstream call. Hits, misses
+and the provider latency they saved are counted per prompt type.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from app.core.background import run_in_background
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM responses with single-flight upstream calls
+    """
+
+    def __init__(self):
+        # key -> (expires_at, response, latency of the original call)
+        self._entries: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._single_flight = SingleFlight()
+        self._collection = None
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.evictions = 0
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        """
+        Enable the persistent tier
+        """
+        self._collection = database.llm_responses
+
+    def stop(self) -> None:
+        """
+        Disable the persistent tier and drop the in-memory entries
+        """
+        self._collection = None
+        self._entries.clear()
+
+    @staticmethod
+    def make_key(template: str, model: str, prompt: str) -> str:
+        """
+        Build the cache key of a prompt
+        """
+        digest = hashlib.sha256()
+        for part in (template, model, prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _counters(self, prompt_type: str) -> Dict[str, float]:
+        counters = self._stats.get(prompt_type)
+        if counters is None:
+            counters = {
+                "memory_hits": 0,
+                "persistent_hits": 0,
+                "shared": 0,
+                "misses": 0,
+                "saved_seconds": 0.0,
+                "upstream_seconds": 0.0
+            }
+            self._stats[prompt_type] = counters
+        return counters
+
+    async def get_or_call(
+        self,
+        prompt_type: str,
+        template: str,
+        prompt: str,
+        call: Callable[[], Awaitable[str]],
+        model: Optional[str] = None,
+        cacheable: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        Get the cached response to a prompt, calling the provider when missing
+
+        Args:
+            prompt_type: Bucket for the statistics (diagnosis, questions...)
+            template: Version of the template the prompt was rendered from
+            prompt: The rendered prompt
+            call: Coroutine factory sending the prompt upstream
+            model: Model answering the prompt, LLM_MODEL by default
+            cacheable: Predicate a fresh response must pass to be stored,
+                so malformed completions are not served again
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            return await call()
+
+        model = model or settings.LLM_MODEL
+        key = self.make_key(template, model, prompt)
+        counters = self._counters(prompt_type)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, response, latency = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                counters["memory_hits"] += 1
+                counters["saved_seconds"] += latency
+                return response
+            del self._entries[key]
+
+        shared = key in self._single_flight
+        response, latency = (await self._single_flight.do(
+            key, lambda: self._fetch(key, prompt_type, model, call, cacheable)
+        ))[0]
+        if shared:
+            # The same prompt was already on its way to the provider
+            counters["shared"] += 1
+            counters["saved_seconds"] += latency
+        return response
+
+    async def _fetch(
+        self,
+        key: str,
+        prompt_type: str,
+        model: str,
+        call: Callable[[], Awaitable[str]],
+        cacheable: Optional[Callable[[str], bool]]
+    ) -> Tuple[str, float]:
+        """
+        Get a response from the persistent tier or the provider, once per key
+        """
+        counters = self._counters(prompt_type)
+        stored = await self._load(key)
+        if stored is not None:
+            response, latency, ttl = stored
+            counters["persistent_hits"] += 1
+            counters["saved_seconds"] += latency
+            self._remember(key, response, latency, ttl)
+            return response, latency
+
+        started = time.perf_counter()
+        response = await call()
+        latency = time.perf_counter() - started
+        counters["misses"] += 1
+        counters["upstream_seconds"] += latency
+        if cacheable is None or cacheable(response):
+            self._remember(key, response, latency, settings.LLM_CACHE_TTL_SECONDS)
+            self._persist(key, prompt_type, model, response, latency)
+        return response, latency
+
+    async def _load(self, key: str) -> Optional[Tuple[str, float, float]]:
+        """
+        Read a response from the persistent tier with its remaining lifetime
+        """
+        if self._collection is None:
+            return None
+        try:
+            doc = await self._collection.find_one({"_id": key})
+        except PyMongoError as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+        if doc is None:
+            return None
+        # The TTL monitor runs once a minute, expired documents can linger
+        ttl = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        if ttl <= 0:
+            return None
+        return doc["response"], doc.get("latency_seconds", 0.0), ttl
+
+    def _remember(self, key: str, response: str, latency: float, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, response, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.LLM_CACHE_MAX_ENTRIES:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _persist(self, key: str, prompt_type: str, model: str, response: str, latency: float) -> None:
+        if self._collection is None:
+            return
+        now = datetime.utcnow()
+        doc = {
+            "prompt_type": prompt_type,
+            "model": model,
+            "response": response,
+            "latency_seconds": latency,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS)
+        }
+        run_in_background(
+            self._collection.replace_one({"_id": key}, doc, upsert=True),
+            "persist LLM response"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache state and per prompt type hit rates for diagnostics
+        """
+        prompt_types = {}
+        for prompt_type, counters in self._stats.items():
+            hits = counters["memory_hits"] + counters["persistent_hits"] + counters["shared"]
+            lookups = hits + counters["misses"]
+            prompt_types[prompt_type] = {
+                **counters,
+                "saved_seconds": round(counters["saved_seconds"], 3),
+                "upstream_seconds": round(counters["upstream_seconds"], 3),
+                "hit_ratio": round(hits / lookups, 4) if lookups else None
+            }
+        return {
+            "entries": len(self._entries),
+            "max_entries": settings.LLM_CACHE_MAX_ENTRIES,
+            "persistent": self._collection is not None,
+            "in_flight": len(self._single_flight),
+            "evictions": self.evictions,
+            "prompt_types": prompt_types
+        }
+
+
+llm_response_cache = LLMResponseCache()
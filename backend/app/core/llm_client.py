@@ -0,0 +1,132 @@
+"""
+Shared asynchronous LLM client
+
+One ``AsyncOpenAI`` client per worker, created in the lifespan hook and
+closed on shutdown. It sits on a single httpx connection pool with
+keep-alive, so consecutive calls reuse warm TLS connections to the
+provider instead of handshaking every time, and awaiting a completion
+yields the event loop to other requests instead of blocking the worker.
+At most LLM_MAX_CONCURRENT_CALLS completions run at once, later calls
+queue for a slot instead of piling onto the provider's rate limits.
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """
+    Owns the worker's LLM HTTP client and its connection pool
+    """
+
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    def start(self) -> None:
+        """
+        Create the HTTP pool and the client
+        """
+        if self._client is not None:
+            return
+        self._slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENT_CALLS)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=self._timeout(settings.LLM_TIMEOUT_SECONDS)
+        )
+        self._client = AsyncOpenAI(
+            base_url=settings.LLM_BASE_URL,
+            api_key=settings.MEGALLM_API_KEY,
+            http_client=self._http,
+            max_retries=settings.LLM_MAX_RETRIES,
+            timeout=self._timeout(settings.LLM_TIMEOUT_SECONDS)
+        )
+        logger.info(
+            "LLM client started (%s, model %s, %d connections)",
+            settings.LLM_BASE_URL, settings.LLM_MODEL, settings.LLM_MAX_CONNECTIONS
+        )
+
+    async def stop(self) -> None:
+        """
+        Close the client and its pooled connections
+        """
+        if self._client is None:
+            return
+        client, self._client, self._http = self._client, None, None
+        await client.close()
+
+    @staticmethod
+    def _timeout(seconds: float) -> httpx.Timeout:
+        # Connecting should fail fast, generating a completion takes a while
+        return httpx.Timeout(seconds, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+    async def complete(self, prompt: str, timeout: Optional[float] = None, model: Optional[str] = None) -> str:
+        """
+        Send one user prompt and return the completion text
+
+        Outside the app (scripts), the client is started on first use.
+        """
+        if self._client is None:
+            self.start()
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self._client.chat.completions.create(
+                model=model or settings.LLM_MODEL,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                timeout=self._timeout(timeout or settings.LLM_TIMEOUT_SECONDS)
+            )
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._slots.release()
+            self._in_flight -= 1
+            self.calls += 1
+            self.total_seconds += time.perf_counter() - started
+
+        return response.choices[0].message.content
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get client state for diagnostics
+        """
+        return {
+            "started": self._client is not None,
+            "model": settings.LLM_MODEL,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "calls": self.calls,
+            "errors": self.errors,
+            "average_seconds": round(self.total_seconds / self.calls, 3) if self.calls else None
+        }
+
+
+llm_client = LLMClient()
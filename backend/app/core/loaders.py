@@ -0,0 +1,201 @@
+"""
+Request-scoped batching loaders
+
+A loader collects every key requested during one event-loop tick and
+resolves them with a single ``$in`` query, then memoizes the results for the
+rest of the request. Code can keep asking for one user at a time (for
+example once per comment, under ``asyncio.gather``) and still cost one round
+trip. Use one ``DataLoaders`` per request through the ``get_loaders``
+dependency; never share one across requests, its memo is not invalidated.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+import asyncio
+
+from bson import ObjectId
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.database import get_database, get_listing_database
+from app.core.user_cache import user_cache
+
+# Fields loaded for users: enough for author names, avatars and moderation
+# views, never password hashes or bookmark lists
+USER_PROJECTION = {
+    "name": 1, "email": 1, "avatar_url": 1, "role": 1,
+    "status": 1, "violation_count": 1
+}
+
+TAG_PROJECTION = {"name": 1, "description": 1}
+
+
+class BatchLoader:
+    """
+    Coalesces single-key loads issued in the same tick into one batch call
+
+    ``batch_fn`` receives the list of distinct, not yet loaded keys and
+    returns a mapping from key to value; keys missing from the mapping
+    resolve to None.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        self._batch_fn = batch_fn
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        """
+        Get a future for one key, scheduling it for the next batch if needed
+        """
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if not self._queue:
+                # Dispatch once the current tick's callers have queued their keys
+                loop.call_soon(self._start_dispatch)
+            self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        """
+        Load several keys, returned in the order given
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """
+        Seed the memo with an already known value
+        """
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def _start_dispatch(self) -> None:
+        task = asyncio.ensure_future(self._dispatch())
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        try:
+            results = await self._batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+class DataLoaders:
+    """
+    Per-request user and tag loaders keyed by ObjectId
+
+    User summaries (name, avatar, role) resolve through the process-wide
+    user_cache first, only the authors it misses are batched into a query.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.users = BatchLoader(self._fetch_users)
+        self.user_summaries = BatchLoader(self._fetch_user_summaries)
+        self.tags = BatchLoader(self._fetch_tags)
+
+    async def load_user(self, user_id: Any) -> Optional[dict]:
+        """
+        Get a user document (USER_PROJECTION fields) by id, None if missing or invalid
+        """
+        key = to_object_id(user_id)
+        if key is None:
+            return None
+        return await self.users.load(key)
+
+    async def load_users(self, user_ids: Iterable[Any]) -> Dict[str, dict]:
+        """
+        Get several users as a {str(id): document} map, skipping missing ones
+        """
+        keys = list(dict.fromkeys(key for key in map(to_object_id, user_ids) if key is not None))
+        users = await self.users.load_many(keys)
+        return {str(key): user for key, user in zip(keys, users) if user is not None}
+
+    async def load_user_summary(self, user_id: Any) -> Optional[dict]:
+        """
+        Get a user's summary (USER_SUMMARY_PROJECTION fields), None if missing or invalid
+
+        Summaries are shared with other requests, copy before changing them.
+        """
+        key = to_object_id(user_id)
+        if key is None:
+            return None
+        return await self.user_summaries.load(key)
+
+    async def load_user_summaries(self, user_ids: Iterable[Any]) -> Dict[str, dict]:
+        """
+        Get several user summaries as a {str(id): summary} map, skipping missing ones
+        """
+        keys = list(dict.fromkeys(key for key in map(to_object_id, user_ids) if key is not None))
+        users = await self.user_summaries.load_many(keys)
+        return {str(key): user for key, user in zip(keys, users) if user is not None}
+
+    async def load_tags(self, tag_ids: Iterable[Any]) -> List[dict]:
+        """
+        Get tag documents in the order given, skipping missing ones
+        """
+        keys = list(dict.fromkeys(key for key in map(to_object_id, tag_ids) if key is not None))
+        tags = await self.tags.load_many(keys)
+        return [tag for tag in tags if tag is not None]
+
+    async def get_user_name(self, user_id: Any, default: str = "Unknown User") -> str:
+        """
+        Get a user's display name
+        """
+        user = await self.load_user_summary(user_id)
+        return user.get("name", default) if user else default
+
+    async def _fetch_users(self, keys: List[ObjectId]) -> Dict[ObjectId, dict]:
+        cursor = self.db.users.find({"_id": {"$in": keys}}, USER_PROJECTION)
+        return {user["_id"]: user async for user in cursor}
+
+    async def _fetch_user_summaries(self, keys: List[ObjectId]) -> Dict[ObjectId, dict]:
+        return await user_cache.load_many(self.db, keys)
+
+    async def _fetch_tags(self, keys: List[ObjectId]) -> Dict[ObjectId, dict]:
+        cursor = self.db.tags.find({"_id": {"$in": keys}}, TAG_PROJECTION)
+        return {tag["_id"]: tag async for tag in cursor}
+
+
+def to_object_id(value: Any) -> Optional[ObjectId]:
+    """
+    Normalize an id to ObjectId, None if it is not a valid id
+    """
+    if isinstance(value, ObjectId):
+        return value
+    if value is not None and ObjectId.is_valid(str(value)):
+        return ObjectId(str(value))
+    return None
+
+
+def get_loaders(db: AsyncIOMotorDatabase = Depends(get_database)) -> DataLoaders:
+    """
+    Dependency to get the request's data loaders
+
+    FastAPI caches dependency results per request, so every endpoint
+    parameter and sub-dependency asking for loaders shares one instance.
+    """
+    return DataLoaders(db)
+
+
+def get_listing_loaders(db: AsyncIOMotorDatabase = Depends(get_listing_database)) -> DataLoaders:
+    """
+    Dependency to get data loaders reading with the listing read preference
+
+    User summaries still come from the primary: they fill the process-wide
+    user_cache, which must not keep a stale secondary read.
+    """
+    return DataLoaders(db)
@@ -0,0 +1,165 @@
+"""
+Connection pool metrics
+
+A pymongo CMAP (connection monitoring and pooling) listener that keeps live
+counters for pool checkouts, so checkout waits under burst load are visible.
+"""
+from typing import Any, Deque, Dict, Optional
+from collections import deque
+import threading
+import time
+
+from pymongo import monitoring
+
+# Number of recent checkout waits kept for percentile calculation
+WAIT_SAMPLE_SIZE = 2048
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener aggregating checkout and wait statistics
+
+    Callbacks run on driver threads, so counters are guarded by a lock.
+    Checkout start times are tracked per thread because the started and
+    checked-out events of one checkout are published on the same thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._waits_ms: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Reset all counters
+        """
+        with self._lock:
+            self.pools_created = 0
+            self.pools_cleared = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.checkout_failures: Dict[str, int] = {}
+            self.waiting = 0
+            self.max_waiting = 0
+            self.max_checked_out = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self._waits_ms.clear()
+
+    # ------------------------------------------------------------------
+    # ConnectionPoolListener interface
+    # ------------------------------------------------------------------
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self.pools_created += 1
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started_at = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._pop_wait_ms(event)
+        reason = str(event.reason)
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        wait_ms = self._pop_wait_ms(event)
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checkouts - self.checkins)
+            if wait_ms is not None:
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+                self._waits_ms.append(wait_ms)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def _pop_wait_ms(self, event) -> Optional[float]:
+        """
+        Get the checkout wait for an event, preferring the driver's own duration
+        """
+        started_at = getattr(self._local, "started_at", None)
+        self._local.started_at = None
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            return duration * 1000
+        if started_at is not None:
+            return (time.perf_counter() - started_at) * 1000
+        return None
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a consistent copy of the current pool statistics
+        """
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            return {
+                "pools_created": self.pools_created,
+                "pools_cleared": self.pools_cleared,
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checked_out": self.checkouts - self.checkins,
+                "max_checked_out": self.max_checked_out,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_ms": {
+                    "avg": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0,
+                    "max": round(self.max_wait_ms, 3),
+                    "p50": round(percentile(waits, 0.50), 3),
+                    "p95": round(percentile(waits, 0.95), 3),
+                    "p99": round(percentile(waits, 0.99), 3),
+                    "samples": len(waits)
+                }
+            }
+
+
+pool_metrics = PoolMetrics()
@@ -0,0 +1,448 @@
+"""
+Query-shape profiler and index advisor
+
+A pymongo command listener records the normalized shape of every ``find``,
+``count_documents`` and ``aggregate`` sent to the application database. A
+background task periodically runs ``explain()`` on the most frequent shapes
+and flags collection scans, in-memory sorts and poor docs-examined/returned
+ratios. Meant for development and staging, enable with QUERY_PROFILER_ENABLED.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILED_COMMANDS = {"find", "aggregate", "count"}
+
+# Keys of a find/aggregate command that are forwarded to explain()
+EXPLAIN_KEYS = ("filter", "sort", "projection", "skip", "limit", "hint", "pipeline", "collation")
+
+# A shape is flagged when it examines this many documents per returned document
+EXAMINED_RATIO_THRESHOLD = 10
+
+# Upper bound on distinct shapes kept in memory
+MAX_SHAPES = 500
+
+# Started commands never seen completing (killed connections, pool resets)
+# are forgotten after this long, or once this many are waiting
+PENDING_TIMEOUT_SECONDS = 300
+MAX_PENDING = 10000
+
+
+def normalize_filter(value: Any) -> Any:
+    """
+    Replace literal values in a query filter with placeholders
+
+    Field names and operators are kept, so two queries that only differ
+    in their parameters produce the same shape.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_filter(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $and/$or/$nor hold sub-filters, every other list is a literal
+        if value and all(isinstance(item, dict) for item in value):
+            return [normalize_filter(item) for item in value]
+        return "?"
+    return "?"
+
+
+def normalize_pipeline(pipeline: List[dict]) -> List[Any]:
+    """
+    Normalize an aggregation pipeline, keeping only the structure of each stage
+
+    Sub-pipelines ($facet branches, $lookup pipelines) are normalized too,
+    so every page of a paginate() listing shares one shape.
+    """
+    shape = []
+    for stage in pipeline:
+        if not isinstance(stage, dict) or not stage:
+            continue
+        name, spec = next(iter(stage.items()))
+        if name == "$match":
+            shape.append({name: normalize_filter(spec)})
+        elif name == "$facet" and isinstance(spec, dict):
+            shape.append({name: {
+                branch: normalize_pipeline(stages) if isinstance(stages, list) else "?"
+                for branch, stages in spec.items()
+            }})
+        elif name == "$lookup" and isinstance(spec, dict) and isinstance(spec.get("pipeline"), list):
+            shape.append({name: {**spec, "pipeline": normalize_pipeline(spec["pipeline"])}})
+        elif name in ("$sort", "$group", "$project", "$unwind", "$lookup", "$replaceRoot", "$count"):
+            shape.append({name: spec})
+        else:
+            # $skip/$limit/$sample and friends only differ by their literal
+            shape.append({name: "?"})
+    return shape
+
+
+def is_count_documents(pipeline: List[dict]) -> bool:
+    """
+    Check whether a pipeline was generated by Collection.count_documents()
+    """
+    if not pipeline:
+        return False
+    last = pipeline[-1]
+    return (
+        isinstance(last, dict)
+        and "$group" in last
+        and last["$group"].get("_id") == 1
+        and "n" in last["$group"]
+    )
+
+
+class QueryShape:
+    """
+    Aggregated statistics for a single query shape
+    """
+
+    def __init__(self, operation: str, collection: str, shape: Any, sample: dict):
+        self.operation = operation
+        self.collection = collection
+        self.shape = shape
+        self.sample = sample  # Last concrete command, used for explain()
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen: Optional[datetime] = None
+        self.analysis: Optional[dict] = None
+        self.analyzed_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert to dict for JSON response
+        """
+        return {
+            "operation": self.operation,
+            "collection": self.collection,
+            "shape": self.shape,
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "total_ms": round(self.total_ms, 3),
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "analysis": self.analysis,
+            "analyzed_at": self.analyzed_at.isoformat() if self.analyzed_at else None
+        }
+
+
+def analyze_explain(explain: dict) -> Dict[str, Any]:
+    """
+    Summarize an explain("executionStats") result
+
+    Works for both find and aggregate explain output, including pipelines
+    whose first stages were pushed down into the query layer.
+    """
+    plan_stages = set()
+    index_names = set()
+    execution_stats = {}
+
+    def walk(node: Any, in_plan: bool = False):
+        if isinstance(node, dict):
+            if in_plan and isinstance(node.get("stage"), str):
+                plan_stages.add(node["stage"])
+                if node.get("indexName"):
+                    index_names.add(node["indexName"])
+            for key, value in node.items():
+                if key == "executionStats" and isinstance(value, dict) and not execution_stats:
+                    execution_stats.update(value)
+                walk(value, in_plan or key in ("winningPlan", "queryPlan"))
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_plan)
+
+    walk(explain)
+
+    # Aggregation stages that were not pushed down show up by name
+    pipeline_stages = [
+        next(iter(stage)) for stage in explain.get("stages", [])
+        if isinstance(stage, dict) and stage
+    ]
+
+    docs_examined = execution_stats.get("totalDocsExamined", 0)
+    keys_examined = execution_stats.get("totalKeysExamined", 0)
+    n_returned = execution_stats.get("nReturned", 0)
+    examined_ratio = round(docs_examined / max(n_returned, 1), 2)
+
+    collscan = "COLLSCAN" in plan_stages
+    in_memory_sort = "SORT" in plan_stages or "$sort" in pipeline_stages
+
+    issues = []
+    if collscan:
+        issues.append("collection_scan")
+    if in_memory_sort:
+        issues.append("in_memory_sort")
+    if examined_ratio > EXAMINED_RATIO_THRESHOLD:
+        issues.append("high_examined_ratio")
+
+    return {
+        "plan_stages": sorted(plan_stages),
+        "indexes_used": sorted(index_names),
+        "collscan": collscan,
+        "in_memory_sort": in_memory_sort,
+        "docs_examined": docs_examined,
+        "keys_examined": keys_examined,
+        "n_returned": n_returned,
+        "examined_ratio": examined_ratio,
+        "execution_time_ms": execution_stats.get("executionTimeMillis"),
+        "issues": issues
+    }
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """
+    Command listener that aggregates query shapes and explains the hottest ones
+
+    Listener callbacks run on driver threads, so shared state is guarded
+    by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes: Dict[Tuple[str, str, str], QueryShape] = {}
+        # (connection_id, request_id) -> (shape key, start time), oldest first
+        self._pending: Dict[Tuple[Any, int], Tuple[Tuple[str, str, str], float]] = {}
+        self._dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # CommandListener interface
+    # ------------------------------------------------------------------
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in PROFILED_COMMANDS:
+            return
+        if event.database_name != settings.MONGODB_DB_NAME:
+            return
+
+        command = event.command
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+
+        if event.command_name == "aggregate":
+            pipeline = command.get("pipeline", [])
+            # Skip the profiler's own $indexStats calls
+            if pipeline and isinstance(pipeline[0], dict) and "$indexStats" in pipeline[0]:
+                return
+            operation = "count_documents" if is_count_documents(pipeline) else "aggregate"
+            shape = {"pipeline": normalize_pipeline(pipeline)}
+        elif event.command_name == "find":
+            operation = "find"
+            shape = {"filter": normalize_filter(command.get("filter", {}))}
+            if command.get("sort"):
+                shape["sort"] = dict(command["sort"])
+            if command.get("projection"):
+                shape["projection"] = sorted(command["projection"])
+        else:
+            operation = "count"
+            shape = {"filter": normalize_filter(command.get("query", {}))}
+
+        shape_key = json.dumps(shape, sort_keys=True, default=str)
+        key = (operation, collection, shape_key)
+        sample = {event.command_name: collection}
+        sample.update({k: command[k] for k in EXPLAIN_KEYS if k in command})
+        if event.command_name == "count" and "query" in command:
+            sample["query"] = command["query"]
+        if event.command_name == "aggregate":
+            sample["cursor"] = {}
+
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= MAX_SHAPES:
+                    self._dropped += 1
+                    return
+                entry = QueryShape(operation, collection, shape, sample)
+                self._shapes[key] = entry
+            else:
+                entry.sample = sample
+            now = time.monotonic()
+            self._pending[(event.connection_id, event.request_id)] = (key, now)
+            self._expire_pending(now)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+            if pending is None:
+                return
+            key = pending[0]
+            entry = self._shapes.get(key)
+            if entry is None:
+                return
+            duration_ms = event.duration_micros / 1000
+            entry.count += 1
+            entry.total_ms += duration_ms
+            entry.max_ms = max(entry.max_ms, duration_ms)
+            entry.last_seen = datetime.utcnow()
+            if failed:
+                entry.failures += 1
+
+    def _expire_pending(self, now: float) -> None:
+        # Called with the lock held; insertion order is start order
+        while self._pending:
+            oldest = next(iter(self._pending))
+            if len(self._pending) <= MAX_PENDING and now - self._pending[oldest][1] < PENDING_TIMEOUT_SECONDS:
+                break
+            del self._pending[oldest]
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def top_shapes(self, limit: int = 20) -> List[QueryShape]:
+        """
+        Get the shapes with the highest cumulative execution time
+        """
+        with self._lock:
+            shapes = list(self._shapes.values())
+        shapes.sort(key=lambda s: s.total_ms, reverse=True)
+        return shapes[:limit]
+
+    async def explain_top_shapes(self, database: AsyncIOMotorDatabase, limit: int = 20) -> int:
+        """
+        Run explain("executionStats") on the top shapes and store the analysis
+
+        Returns:
+            Number of shapes explained
+        """
+        explained = 0
+        for entry in self.top_shapes(limit):
+            try:
+                result = await database.command(
+                    {"explain": entry.sample, "verbosity": "executionStats"}
+                )
+            except PyMongoError as e:
+                logger.warning(f"explain() failed for {entry.collection} {entry.operation}: {e}")
+                continue
+            entry.analysis = analyze_explain(result)
+            entry.analyzed_at = datetime.utcnow()
+            explained += 1
+        return explained
+
+    async def get_index_usage(self, database: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+        """
+        Collect $indexStats for every collection in the database
+        """
+        usage = []
+        for collection_name in await database.list_collection_names():
+            if collection_name.startswith("system."):
+                continue
+            try:
+                stats = await database[collection_name].aggregate(
+                    [{"$indexStats": {}}]
+                ).to_list(length=None)
+            except PyMongoError as e:
+                logger.warning(f"$indexStats failed for {collection_name}: {e}")
+                continue
+            for index in stats:
+                accesses = index.get("accesses", {})
+                since = accesses.get("since")
+                usage.append({
+                    "collection": collection_name,
+                    "name": index.get("name"),
+                    "key": dict(index.get("key", {})),
+                    "ops": accesses.get("ops", 0),
+                    "since": since.isoformat() if isinstance(since, datetime) else since
+                })
+        return usage
+
+    async def get_report(
+        self,
+        database: AsyncIOMotorDatabase,
+        limit: int = 20,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Build the advisor report: top shapes with their plan analysis and
+        indexes that have not served a single operation
+        """
+        if refresh:
+            await self.explain_top_shapes(database, limit)
+
+        shapes = [shape.to_dict() for shape in self.top_shapes(limit)]
+        index_usage = await self.get_index_usage(database)
+
+        with self._lock:
+            tracked = len(self._shapes)
+            dropped = self._dropped
+
+        return {
+            "enabled": settings.QUERY_PROFILER_ENABLED,
+            "tracked_shapes": tracked,
+            "dropped_shapes": dropped,
+            "shapes": shapes,
+            "needs_index": [
+                shape for shape in shapes
+                if shape["analysis"] and shape["analysis"]["issues"]
+            ],
+            "unused_indexes": [
+                index for index in index_usage
+                if index["ops"] == 0 and index["name"] != "_id_"
+            ],
+            "index_usage": index_usage
+        }
+
+    def reset(self) -> None:
+        """
+        Forget all recorded shapes
+        """
+        with self._lock:
+            self._shapes.clear()
+            self._pending.clear()
+            self._dropped = 0
+
+    # ------------------------------------------------------------------
+    # Background explain loop
+    # ------------------------------------------------------------------
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        """
+        Start the periodic explain task
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(database))
+
+    async def stop(self) -> None:
+        """
+        Stop the periodic explain task
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, database: AsyncIOMotorDatabase) -> None:
+        while True:
+            await asyncio.sleep(settings.QUERY_PROFILER_EXPLAIN_INTERVAL_SECONDS)
+            try:
+                explained = await self.explain_top_shapes(
+                    database, settings.QUERY_PROFILER_TOP_SHAPES
+                )
+                logger.info(f"Query profiler explained {explained} shapes")
+            except Exception as e:
+                logger.error(f"Query profiler explain run failed: {e}")
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,162 @@
+"""
+Fast BSON document to JSON serialization
+
+Read endpoints used to turn every MongoDB document into a Pydantic model,
+dump it again, patch ObjectIds into strings and then have FastAPI validate
+and encode the result against the response model. A ``DocumentEncoder`` is
+compiled once per model instead: it walks the model's fields a single time
+at import, and afterwards shapes a raw document into the same output as
+``model_dump(by_alias=True)`` with string ids, without validation. The
+result is written to JSON bytes by ``dumps`` (orjson when installed, the
+standard library's C encoder otherwise) through ``FastJSONResponse``.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union, get_args, get_origin
+from datetime import date, datetime
+from enum import Enum
+import json
+import types
+
+from bson import ObjectId
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from starlette.responses import Response
+
+from app.models.user import PyObjectId
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Field kinds of a compiled encoder
+VALUE, OBJECT_ID, OBJECT_IDS, MODEL, MODELS = range(5)
+
+
+def _unwrap(annotation: Any) -> Tuple[Any, bool]:
+    """
+    Strip Optional[...] and Annotated[...] from an annotation, and tell whether it is a list
+    """
+    is_list = False
+    while True:
+        origin = get_origin(annotation)
+        args = get_args(annotation)
+        if origin in (Union, types.UnionType):
+            members = [arg for arg in args if arg is not type(None)]
+            if len(members) != 1:
+                return annotation, is_list
+            annotation = members[0]
+        elif origin in (list, List, tuple, set) and args and not is_list:
+            annotation = args[0]
+            is_list = True
+        elif origin is not None and getattr(annotation, "__metadata__", None) is not None:
+            # Annotated[X, ...]
+            annotation = args[0]
+        else:
+            return annotation, is_list
+
+
+class DocumentEncoder:
+    """
+    Shapes raw documents of one model into JSON-ready dicts
+
+    Missing fields get the model's defaults, unknown fields are dropped and
+    ObjectId fields become strings, exactly as validating the document and
+    dumping it by alias would, but without building a model instance.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._fields: List[Tuple[str, str, int, Any, Optional[Callable[[], Any]], Optional["DocumentEncoder"]]] = []
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            annotation, is_list = _unwrap(field.annotation)
+            nested = None
+            if annotation is PyObjectId:
+                kind = OBJECT_IDS if is_list else OBJECT_ID
+            elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+                kind = MODELS if is_list else MODEL
+                nested = DocumentEncoder(annotation)
+            else:
+                kind = VALUE
+            default = field.default
+            factory = field.default_factory
+            self._fields.append((key, name, kind, default, factory, nested))
+
+    def encode(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Shape one raw document
+        """
+        result = {}
+        for key, name, kind, default, factory, nested in self._fields:
+            if key in doc:
+                value = doc[key]
+            elif name in doc:
+                value = doc[name]
+            elif factory is not None:
+                value = factory()
+            elif default is not PydanticUndefined:
+                value = default
+            else:
+                continue
+
+            if value is None:
+                pass
+            elif kind == OBJECT_ID:
+                value = str(value)
+            elif kind == OBJECT_IDS:
+                value = [str(item) for item in value]
+            elif kind == MODEL:
+                value = nested.encode(_as_dict(value))
+            elif kind == MODELS:
+                value = [nested.encode(_as_dict(item)) for item in value]
+            result[key] = value
+        return result
+
+    def encode_many(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Shape several raw documents
+        """
+        encode = self.encode
+        return [encode(doc) for doc in docs]
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    # Defaults built by a default_factory are model instances
+    return value.model_dump(by_alias=True) if isinstance(value, BaseModel) else value
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to JSON bytes, handling ObjectId, datetime, enums and models
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with ``dumps``
+
+    Return it from an endpoint to skip FastAPI's response_model validation
+    and jsonable_encoder pass.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,71 @@
+"""
+Single-flight calls
+
+Concurrent callers asking for the same key share one call instead of each
+starting their own. The call runs in its own task rather than in the
+coroutine of whoever came first, so a caller that is cancelled (client
+disconnect, ``asyncio.wait_for`` timeout) only stops waiting: the callers
+still waiting get the result, and the call is cancelled only once nobody
+is waiting for it anymore.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await ``fn()``, or the call already running for ``key``
+
+        Returns:
+            The call's result and whether it was shared with an earlier caller.
+            Errors raised by the call are raised to every caller.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            # Only we were cancelled, the call goes on while others wait for it
+            if call.waiters == 1 and not call.task.done():
+                # Later callers start a new call instead of joining this one
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # An error nobody waited for anymore must not be reported as unretrieved
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,139 @@
+"""
+Process-wide user summary cache
+
+Author names and avatars are needed on almost every read path, and the
+same few active users author most of what is read. This worker keeps their
+``{name, avatar_url, role, created_at}`` summaries in a size-bounded LRU with
+a TTL, underneath the request-scoped loaders, so a hot author is fetched
+from MongoDB once per USER_CACHE_TTL_SECONDS instead of once per request.
+Writes to a user in this worker invalidate the entry explicitly; writes
+made by other workers become visible once the TTL runs out. Entries are
+always fetched from the primary, whatever the caller's read preference, so
+a lagging secondary can't put back a summary that was just invalidated.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import time
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.read_preferences import Primary
+
+from app.core.config import settings
+
+# Fields of a user summary; created_at never changes and serves public profiles
+USER_SUMMARY_PROJECTION = {"name": 1, "avatar_url": 1, "role": 1, "created_at": 1}
+
+
+class UserSummaryCache:
+    """
+    Size-bounded TTL cache of user summaries keyed by ObjectId
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[ObjectId, Tuple[float, dict]]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_many(self, keys: Iterable[ObjectId]) -> Tuple[Dict[ObjectId, dict], List[ObjectId]]:
+        """
+        Split keys into cached summaries and the keys that must be fetched
+        """
+        found: Dict[ObjectId, dict] = {}
+        missing: List[ObjectId] = []
+        if not settings.USER_CACHE_ENABLED:
+            return found, list(keys)
+
+        now = time.monotonic()
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                missing.append(key)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    async def load_many(self, db: AsyncIOMotorDatabase, keys: List[ObjectId]) -> Dict[ObjectId, dict]:
+        """
+        Get summaries for several users, fetching the uncached ones in one query
+
+        Missing users are left out of the result. The summaries are shared
+        with other requests: copy them before changing anything.
+        """
+        found, missing = self.get_many(keys)
+        if not missing:
+            return found
+
+        generation = self._generation
+        users = db.users.with_options(read_preference=Primary())
+        cursor = users.find({"_id": {"$in": missing}}, USER_SUMMARY_PROJECTION)
+        fetched = {user["_id"]: user async for user in cursor}
+        # A user changed while fetching may have been read before the write, don't keep it
+        if generation == self._generation:
+            self._store(fetched)
+        found.update(fetched)
+        return found
+
+    async def load(self, db: AsyncIOMotorDatabase, user_id: Any) -> Optional[dict]:
+        """
+        Get one user's summary, None if missing or invalid
+        """
+        if not ObjectId.is_valid(str(user_id)):
+            return None
+        key = ObjectId(str(user_id))
+        return (await self.load_many(db, [key])).get(key)
+
+    def _store(self, summaries: Dict[ObjectId, dict]) -> None:
+        if not settings.USER_CACHE_ENABLED:
+            return
+        expires_at = time.monotonic() + settings.USER_CACHE_TTL_SECONDS
+        for key, summary in summaries.items():
+            self._entries[key] = (expires_at, summary)
+            self._entries.move_to_end(key)
+        while len(self._entries) > settings.USER_CACHE_MAX_ENTRIES:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: Any) -> None:
+        """
+        Drop a user's summary after their name, avatar or role changed,
+        or the account was locked or deleted
+        """
+        self._generation += 1
+        if not ObjectId.is_valid(str(user_id)):
+            return
+        if self._entries.pop(ObjectId(str(user_id)), None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Drop every summary
+        """
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache state for diagnostics
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": settings.USER_CACHE_MAX_ENTRIES,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+user_cache = UserSummaryCache()
@@ -0,0 +1,152 @@
+"""
+Write-behind post view counter
+
+Post reads no longer write. Each worker accumulates view increments in
+memory and a background task applies them with one unordered ``bulk_write``
+every VIEW_COUNT_FLUSH_INTERVAL_SECONDS, or sooner once
+VIEW_COUNT_FLUSH_MAX_EVENTS views are pending. Counts are approximate by
+design: a worker that dies without its shutdown flush loses at most one
+interval of views.
+"""
+from typing import Dict, Optional
+import asyncio
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core.config import settings
+from app.core.hot_ranking import hot_ranking
+
+logger = logging.getLogger(__name__)
+
+# View counts are not worth waiting for replication or the journal
+VIEW_COUNT_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+
+class ViewCounter:
+    """
+    Buffers post view increments and flushes them in batches
+    """
+
+    def __init__(self):
+        self._pending: Dict[ObjectId, int] = {}
+        self._events = 0
+        self._wake = asyncio.Event()
+        self._database: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushes = 0
+        self._flushed_views = 0
+
+    def record(self, post_id: ObjectId, views: int = 1) -> None:
+        """
+        Count views of a post, to be written with the next flush
+        """
+        self._pending[post_id] = self._pending.get(post_id, 0) + views
+        self._events += views
+        if self._events >= settings.VIEW_COUNT_FLUSH_MAX_EVENTS:
+            self._wake.set()
+
+    def pending(self, post_id: ObjectId) -> int:
+        """
+        Get the views of a post recorded by this worker but not flushed yet
+        """
+        return self._pending.get(post_id, 0)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get counter state for diagnostics
+        """
+        return {
+            "pending_posts": len(self._pending),
+            "pending_views": self._events,
+            "flushes": self._flushes,
+            "flushed_views": self._flushed_views
+        }
+
+    async def flush(self) -> int:
+        """
+        Write all pending increments, returns the number of posts updated
+
+        Increments that were not applied are put back so the next flush
+        retries them; those of a partly failed batch that did apply are not.
+        """
+        if not self._pending or self._database is None:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        events, self._events = self._events, 0
+        operations = [
+            UpdateOne({"_id": post_id}, {"$inc": {"view_count": views}})
+            for post_id, views in pending.items()
+        ]
+        collection = self._database.posts.with_options(write_concern=VIEW_COUNT_WRITE_CONCERN)
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every operation not listed as failed was applied
+            post_ids = list(pending)
+            failed = {post_ids[error["index"]] for error in e.details["writeErrors"]}
+            logger.error(f"Failed to flush views of {len(failed)} posts, will retry: {e}")
+            self._requeue({post_id: pending[post_id] for post_id in failed})
+            applied = [post_id for post_id in post_ids if post_id not in failed]
+            self._flushes += 1
+            self._flushed_views += sum(pending[post_id] for post_id in applied)
+            hot_ranking.mark_dirty(applied)
+            return len(applied)
+        except PyMongoError as e:
+            logger.error(f"Failed to flush {events} post views, will retry: {e}")
+            self._requeue(pending)
+            return 0
+
+        self._flushes += 1
+        self._flushed_views += events
+        hot_ranking.mark_dirty(pending)
+        return len(operations)
+
+    def _requeue(self, views_by_post: Dict[ObjectId, int]) -> None:
+        for post_id, views in views_by_post.items():
+            self._pending[post_id] = self._pending.get(post_id, 0) + views
+            self._events += views
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        """
+        Start the periodic flush task
+        """
+        self._database = database
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the flush task and write whatever is still pending
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.VIEW_COUNT_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # flush() retries database errors itself, keep the task alive for anything else
+                logger.error(f"Post view flush failed: {e}")
+
+
+view_counter = ViewCounter()
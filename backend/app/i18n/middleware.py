@@ -71,14 +71,16 @@ class I18nMiddleware(BaseHTTPMiddleware):
         # Tiếp tục xử lý request
         response = await call_next(request)
         
-        # Set cookie locale để lưu lựa chọn người dùng
-        response.set_cookie(
-            key="locale",
-            value=locale,
-            max_age=60 * 60 * 24 * 365,  # 1 năm
-            httponly=True,
-            samesite="lax"
-        )
+        # Set cookie locale để lưu lựa chọn người dùng, chỉ khi thay đổi:
+        # response có Set-Cookie thì nginx không cache được
+        if request.cookies.get("locale") != locale:
+            response.set_cookie(
+                key="locale",
+                value=locale,
+                max_age=60 * 60 * 24 * 365,  # 1 năm
+                httponly=True,
+                samesite="lax"
+            )
         
         return response
 
@@ -6,7 +6,17 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database, warm_connection_pool
+from app.core.indexes import ensure_indexes
+from app.core.query_profiler import query_profiler
+from app.search import post_search, related_posts
+from app.core.background import wait_for_background_tasks
+from app.core.view_counter import view_counter
+from app.core.hot_ranking import hot_ranking
+from app.core.llm_client import llm_client
+from app.core.llm_cache import llm_response_cache
+from app.core.diagnosis_jobs import diagnosis_jobs
+from app.services.ai_diagnosis_service import AIDiagnosisService
 from app.api.v1.api import api_router
 from app.i18n import init_i18n
 from app.i18n.middleware import I18nMiddleware
@@ -23,10 +33,44 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     await connect_to_mongo()
+    await warm_connection_pool()
+    # Create missing indexes declared on the models and hot query shapes
+    if settings.MONGODB_ENSURE_INDEXES:
+        await ensure_indexes(get_database())
+    # Load (or build) the post search index in the background
+    if settings.SEARCH_ENGINE_ENABLED:
+        await post_search.start(get_database())
+    # Build the related posts matrices in the background
+    if settings.RELATED_POSTS_ENABLED:
+        related_posts.start(get_database())
+    # Flush buffered post views periodically
+    view_counter.start(get_database())
+    # Keep the hot posts ranking current
+    if settings.HOT_RANKING_ENABLED:
+        hot_ranking.start(get_database())
+    # Periodically explain the hottest query shapes
+    if settings.QUERY_PROFILER_ENABLED:
+        query_profiler.start(get_database())
+    # Shared LLM client with a pooled, keep-alive HTTP connection
+    llm_client.start()
+    # Identical prompts are answered from the shared response cache
+    llm_response_cache.start(get_database())
+    # Run queued lecture analyses and question generations
+    diagnosis_service = AIDiagnosisService(get_database())
+    diagnosis_jobs.start(get_database(), diagnosis_service.run_job, diagnosis_service.fail_job)
     # Initialize i18n
     init_i18n()
     yield
     # Shutdown
+    await wait_for_background_tasks()
+    await diagnosis_jobs.stop()
+    await query_profiler.stop()
+    await hot_ranking.stop()
+    await related_posts.stop()
+    await post_search.stop()
+    await view_counter.stop()
+    llm_response_cache.stop()
+    await llm_client.stop()
     await close_mongo_connection()
 
 
@@ -2,6 +2,7 @@ from app.models.user import UserModel, PyObjectId, UserRole, UserStatus
 from app.models.tag import TagModel
 from app.models.post import PostModel, VotesModel
 from app.models.answer import AnswerModel, CommentModel
+from app.models.answer_vote import AnswerVoteModel
 from app.models.ai_diagnosis import (
     AIDiagnosisModel,
     InputType,
@@ -12,6 +13,7 @@ from app.models.ai_diagnosis import (
     AIResultModel,
     GeneratedQuestionModel
 )
+from app.models.diagnosis_job import DiagnosisJobModel, DiagnosisJobKind, DiagnosisJobStatus
 from app.models.report import (
     ReportModel,
     ReportType,
@@ -33,6 +35,7 @@ __all__ = [
     "VotesModel",
     "AnswerModel",
     "CommentModel",
+    "AnswerVoteModel",
     "AIDiagnosisModel",
     "InputType",
     "DiagnosisStatus",
@@ -41,6 +44,9 @@ __all__ = [
     "LearnerProfileModel",
     "AIResultModel",
     "GeneratedQuestionModel",
+    "DiagnosisJobModel",
+    "DiagnosisJobKind",
+    "DiagnosisJobStatus",
     "ReportModel",
     "ReportType",
     "ReasonCategory",
@@ -70,6 +70,7 @@ class AIDiagnosisModel(BaseModel):
     ai_result: AIResultModel = Field(default_factory=AIResultModel)
     generated_questions: List[GeneratedQuestionModel] = Field(default_factory=list)
     status: DiagnosisStatus = Field(default=DiagnosisStatus.PENDING)
+    questions_status: Optional[DiagnosisStatus] = None  # Set once question generation is requested
     is_saved: bool = Field(default=False)  # Track if the diagnosis is saved
     subject: Optional[str] = None  # Subject of the lesson
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -26,7 +26,9 @@ class AnswerModel(BaseModel):
     content: str  # rich text/markdown
     is_accepted_solution: bool = Field(default=False)
     votes: VotesModel = Field(default_factory=VotesModel)
-    comments: List[CommentModel] = Field(default_factory=list)
+    comments: List[CommentModel] = Field(default_factory=list)  # The whole thread, or the newest few once external
+    comment_count: int = Field(default=0)
+    comments_external: bool = Field(default=False)  # Thread moved to the answer_comments collection
     is_deleted: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
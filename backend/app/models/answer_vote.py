@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict
+from app.models.user import PyObjectId
+
+
+class AnswerVoteModel(BaseModel):
+    """
+    One user's vote on an answer (answer_votes collection)
+
+    (answer_id, user_id) is unique, so a user holds at most one vote per
+    answer; the answer's votes counters are derived from these documents.
+    """
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={PyObjectId: str}
+    )
+
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
+    answer_id: PyObjectId
+    user_id: PyObjectId
+    value: int = Field(..., ge=-1, le=1)  # 1 helpful, -1 not helpful
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
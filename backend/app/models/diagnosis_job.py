@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict
+from enum import Enum
+from app.models.user import PyObjectId
+
+
+class DiagnosisJobKind(str, Enum):
+    ANALYZE = "analyze"
+    GENERATE_QUESTIONS = "generate_questions"
+
+
+class DiagnosisJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class DiagnosisJobModel(BaseModel):
+    """
+    One LLM step of a diagnosis run in the background (diagnosis_jobs collection)
+
+    A worker owns a running job while its lease is valid; a job whose lease
+    ran out (its worker crashed) is claimed again. ``active`` is only set
+    while the job is queued or running, so there is at most one pending job
+    per diagnosis and kind.
+    """
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_encoders={PyObjectId: str}
+    )
+
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
+    diagnosis_id: PyObjectId
+    user_id: PyObjectId
+    kind: DiagnosisJobKind
+    params: Dict[str, Any] = Field(default_factory=dict)
+    status: DiagnosisJobStatus = DiagnosisJobStatus.QUEUED
+    active: Optional[bool] = True
+    attempts: int = 0
+    available_at: datetime = Field(default_factory=datetime.utcnow)  # Not claimed before (retry backoff)
+    lease_token: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
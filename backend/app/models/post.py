@@ -6,13 +6,37 @@ from app.models.user import PyObjectId
 
 class VotesModel(BaseModel):
     """
-    Votes sub-model for answers
+    Vote counters of an answer
+
+    Individual votes live in the answer_votes collection; the answer only
+    keeps these counters, maintained by AnswerService.vote_answer.
     """
-    upvoted_by: List[PyObjectId] = Field(default_factory=list)
-    downvoted_by: List[PyObjectId] = Field(default_factory=list)
+    up: int = Field(default=0)
+    down: int = Field(default=0)
     score: int = Field(default=0)
 
 
+class PostAuthorSummary(BaseModel):
+    """
+    Author display data embedded on posts
+    """
+    id: PyObjectId = Field(..., alias="_id")
+    name: str = ""
+    avatar_url: Optional[str] = None
+
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
+
+
+class PostTagSummary(BaseModel):
+    """
+    Tag display data embedded on posts
+    """
+    id: PyObjectId = Field(..., alias="_id")
+    name: str = ""
+
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
+
+
 class PostModel(BaseModel):
     """
     Post database model
@@ -23,6 +47,9 @@ class PostModel(BaseModel):
     author_id: PyObjectId = Field(..., index=True)
     category: Optional[str] = Field(default=None, index=True)  # Broad subject: Toán học, Tiếng Anh, Vật lý, etc.
     tag_ids: List[PyObjectId] = Field(default_factory=list, max_length=5)  # Specific topics: Tích phân, Ngữ pháp, JLPT N3, etc.
+    # Denormalized display data, kept in sync by PostSummaryService
+    author: Optional[PostAuthorSummary] = None
+    tags: List[PostTagSummary] = Field(default_factory=list)
     answer_count: int = Field(default=0)
     view_count: int = Field(default=0)
     is_deleted: bool = Field(default=False)
@@ -76,6 +76,7 @@ class AIDiagnosisInDB(AIDiagnosisBase):
     ai_result: AIResultSchema
     generated_questions: List[GeneratedQuestionSchema] = Field(default_factory=list)
     status: DiagnosisStatus
+    questions_status: Optional[DiagnosisStatus] = None
     created_at: datetime
 
     class Config:
@@ -89,6 +90,16 @@ class AIDiagnosis(AIDiagnosisInDB):
     pass
 
 
+class DiagnosisJobAccepted(BaseModel):
+    """
+    Background job accepted for a diagnosis; poll the diagnosis for the result
+    """
+    diagnosis_id: str
+    job_id: str
+    kind: str
+    status: str
+
+
 class QuestionAnswerSubmit(BaseModel):
     """
     Question answer submission schema
@@ -105,6 +116,26 @@ class FeedbackItem(BaseModel):
     is_correct: bool
     correct_answer: str
     explanation: Optional[str] = None
+    evaluated: bool = True  # False when grading this answer failed or timed out
+
+
+class EvaluationItemTiming(BaseModel):
+    """
+    Latency of grading one short answer
+    """
+    question_id: str
+    seconds: float
+    status: str  # batched, ok, failed or timeout
+
+
+class EvaluationMetadata(BaseModel):
+    """
+    How the short answers of a submission were graded
+    """
+    elapsed_seconds: float
+    mode: str = "concurrent"  # batch, batch_fallback (some items graded one by one) or concurrent
+    partial: bool = False
+    items: List[EvaluationItemTiming] = []
 
 
 class DiagnosisEvaluation(BaseModel):
@@ -115,4 +146,5 @@ class DiagnosisEvaluation(BaseModel):
     correct_answers: int
     score_percentage: float
     feedback: List[FeedbackItem]
+    metadata: Optional[EvaluationMetadata] = None
 
@@ -28,8 +28,8 @@ class VotesSchema(BaseModel):
     """
     Votes schema
     """
-    upvoted_by: List[str] = Field(default_factory=list)
-    downvoted_by: List[str] = Field(default_factory=list)
+    up: int = 0
+    down: int = 0
     score: int = 0
 
 
@@ -65,7 +65,9 @@ class AnswerInDB(AnswerBase):
     author_name: Optional[str] = None
     is_accepted_solution: bool
     votes: VotesSchema
-    comments: List[CommentSchema] = Field(default_factory=list)
+    comments: List[CommentSchema] = Field(default_factory=list)  # Newest comments only
+    comment_count: int = 0
+    comments_external: bool = False
     is_deleted: bool
     created_at: datetime
     updated_at: datetime
@@ -78,7 +80,7 @@ class Answer(AnswerInDB):
     """
     Answer response schema
     """
-    pass
+    my_vote: Optional[int] = None  # The signed-in viewer's vote: 1, -1 or 0
 
 
 class AnswerWithAuthor(Answer):
@@ -88,6 +90,16 @@ class AnswerWithAuthor(Answer):
     author: Optional[dict] = None
 
 
+class CommentPage(BaseModel):
+    """
+    Page of an answer's comments, newest first
+    """
+    comments: List[CommentSchema]
+    comment_count: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
 class AnswerVote(BaseModel):
     """
     Answer vote action schema
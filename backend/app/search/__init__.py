@@ -0,0 +1,8 @@
+"""
+search package initialization
+"""
+from .engine import SearchEngine
+from .posts import PostSearchIndex, post_search
+from .related import RelatedPosts, related_posts
+
+__all__ = ["SearchEngine", "PostSearchIndex", "post_search", "RelatedPosts", "related_posts"]
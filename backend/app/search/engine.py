@@ -0,0 +1,307 @@
+"""
+In-memory inverted index with BM25 ranking
+
+The engine knows nothing about MongoDB: documents are added as a mapping of
+field name to text plus a small dict of filterable metadata. Field weights
+are applied to term frequencies (a simplified BM25F), so a hit in a title
+counts more than the same hit in the body.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import bisect
+import gzip
+import json
+import math
+import os
+import tempfile
+
+from app.search.tokenizer import tokenize
+
+# Term-frequency weight per indexed field
+DEFAULT_FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "author": 2.0, "content": 1.0}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Bump when the on-disk layout changes; older snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+# Upper bound on vocabulary terms a prefix query may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+
+class IndexedDocument:
+    """
+    Term frequencies and metadata of one indexed document
+
+    Instances are replaced, never mutated, once added to the engine, which
+    lets a snapshot be taken with a shallow copy of the document table.
+    """
+
+    __slots__ = ("terms", "length", "meta")
+
+    def __init__(self, terms: Dict[str, float], length: float, meta: Dict[str, Any]):
+        self.terms = terms
+        self.length = length
+        self.meta = meta
+
+
+class SearchEngine:
+    """
+    Inverted index over weighted fields with BM25 scoring
+    """
+
+    def __init__(self, field_weights: Optional[Dict[str, float]] = None):
+        self.field_weights = field_weights or DEFAULT_FIELD_WEIGHTS
+        self._docs: Dict[str, IndexedDocument] = {}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._total_length = 0.0
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def analyze(self, fields: Dict[str, str]) -> Tuple[Dict[str, float], float]:
+        """
+        Turn field texts into weighted term frequencies and a document length
+        """
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for token in tokenize(text or ""):
+                terms[token] = terms.get(token, 0.0) + weight
+                length += weight
+        return terms, length
+
+    def add(self, doc_id: str, fields: Dict[str, str], meta: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Add a document, replacing any previous version with the same id
+
+        Returns False if an identical version was already indexed.
+        """
+        terms, length = self.analyze(fields)
+        meta = meta or {}
+        previous = self._docs.get(doc_id)
+        if previous is not None and previous.terms == terms and previous.meta == meta:
+            return False
+        self._put(doc_id, IndexedDocument(terms, length, meta))
+        return True
+
+    def remove(self, doc_id: str) -> bool:
+        """
+        Remove a document, returns False if it was not indexed
+        """
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return False
+        self._unlink(doc_id, doc)
+        return True
+
+    def clear(self) -> None:
+        """
+        Drop every document
+        """
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0.0
+        self._vocabulary = None
+
+    def _put(self, doc_id: str, doc: IndexedDocument) -> None:
+        previous = self._docs.get(doc_id)
+        if previous is not None:
+            self._unlink(doc_id, previous)
+        self._docs[doc_id] = doc
+        self._total_length += doc.length
+        for term, frequency in doc.terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary = None
+            postings[doc_id] = frequency
+
+    def _unlink(self, doc_id: str, doc: IndexedDocument) -> None:
+        self._total_length -= doc.length
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = None
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """
+        Get indexed terms starting with a prefix
+        """
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(
+        self,
+        query: str,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        prefix_last: bool = True
+    ) -> List[Tuple[str, float]]:
+        """
+        Find documents containing every query term, best BM25 score first
+
+        The last query term also matches as a prefix (so "ngu ph" finds
+        "ngữ pháp" while the user is typing), and a predicate over document
+        metadata can narrow the candidates before scoring.
+
+        Returns:
+            List of (doc_id, score) tuples
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._docs:
+            return []
+
+        # Each query term becomes a group of alternative index terms
+        groups: List[List[str]] = [[token] for token in tokens]
+        if prefix_last:
+            expanded = self.expand_prefix(tokens[-1])
+            groups[-1] = expanded or groups[-1]
+
+        group_postings = []
+        for group in groups:
+            merged: Dict[str, List[Tuple[str, float]]] = {}
+            for term in group:
+                for doc_id, frequency in self._postings.get(term, {}).items():
+                    merged.setdefault(doc_id, []).append((term, frequency))
+            if not merged:
+                return []
+            group_postings.append(merged)
+
+        # Intersect, starting from the rarest group
+        group_postings.sort(key=len)
+        candidates = set(group_postings[0])
+        for merged in group_postings[1:]:
+            candidates &= merged.keys()
+            if not candidates:
+                return []
+
+        doc_count = len(self._docs)
+        average_length = self._total_length / doc_count if doc_count else 0.0
+        idf_cache: Dict[str, float] = {}
+
+        results = []
+        for doc_id in candidates:
+            doc = self._docs[doc_id]
+            if predicate is not None and not predicate(doc.meta):
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * (doc.length / average_length if average_length else 0))
+            score = 0.0
+            for merged in group_postings:
+                for term, frequency in merged[doc_id]:
+                    idf = idf_cache.get(term)
+                    if idf is None:
+                        df = len(self._postings[term])
+                        idf = idf_cache[term] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    score += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            results.append((doc_id, score))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
+
+    def get_meta(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata stored with a document
+        """
+        doc = self._docs.get(doc_id)
+        return doc.meta if doc else None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index size statistics
+        """
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+            "average_length": round(self._total_length / len(self._docs), 2) if self._docs else 0
+        }
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, IndexedDocument]:
+        """
+        Take a cheap point-in-time copy of the document table
+
+        Safe to serialize from another thread while the engine keeps
+        changing, because indexed documents are never mutated in place.
+        """
+        return dict(self._docs)
+
+    @staticmethod
+    def write_snapshot(path: str, docs: Dict[str, IndexedDocument], extra: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Write a snapshot as gzipped JSON, atomically replacing the old file
+
+        Only term frequencies are stored; postings are rebuilt on load,
+        which avoids re-tokenizing every post on restart.
+        """
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "extra": extra or {},
+            "docs": {
+                doc_id: [doc.terms, doc.length, doc.meta]
+                for doc_id, doc in docs.items()
+            }
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".search-index-")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=5) as handle:
+                handle.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def read_snapshot(path: str) -> Optional[Tuple[Dict[str, IndexedDocument], Dict[str, Any]]]:
+        """
+        Read a snapshot written by write_snapshot, None if missing or outdated
+        """
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rb") as handle:
+            payload = json.loads(handle.read().decode("utf-8"))
+        if payload.get("version") != SNAPSHOT_VERSION:
+            return None
+        docs = {
+            doc_id: IndexedDocument(terms, length, meta)
+            for doc_id, (terms, length, meta) in payload["docs"].items()
+        }
+        return docs, payload.get("extra", {})
+
+    def restore(self, docs: Iterable[Tuple[str, IndexedDocument]]) -> None:
+        """
+        Replace the whole index with previously snapshotted documents
+        """
+        self.clear()
+        for doc_id, doc in docs:
+            self._put(doc_id, doc)
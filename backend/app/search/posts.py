@@ -0,0 +1,342 @@
+"""
+Post search index
+
+Keeps a SearchEngine over title, content, author name and tag names of every
+live post. The index is loaded from its on-disk snapshot at startup (or built
+from MongoDB when there is none), kept current by the post write paths, and a
+background task catches up on posts changed by other workers (via
+``updated_at``, and ``summary_updated_at`` for author and tag renames) and
+persists the snapshot periodically and on shutdown.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.search.engine import SearchEngine
+
+logger = logging.getLogger(__name__)
+
+POST_PROJECTION = {
+    "title": 1, "content": 1, "author_id": 1, "author": 1, "tag_ids": 1, "tags": 1,
+    "category": 1, "is_deleted": 1, "updated_at": 1, "summary_updated_at": 1
+}
+
+# Posts fetched per round trip while building or catching up
+BATCH_SIZE = 500
+
+# Catch-up re-reads this far behind the newest indexed timestamps, since
+# writes from other workers can commit slightly out of timestamp order
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Recent search results kept so count + page of one request search once
+RESULT_CACHE_SIZE = 128
+
+
+class PostSearchIndex:
+    """
+    Full-text index of forum posts with incremental updates and persistence
+    """
+
+    def __init__(self):
+        self.engine = SearchEngine()
+        self.ready = False
+        self._watermark: Optional[datetime] = None
+        self._summary_watermark: Optional[datetime] = None
+        self._generation = 0
+        self._persisted_generation = 0
+        self._results: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        author_id: Optional[str] = None,
+        tag_ids: Optional[List[str]] = None,
+        category: Optional[str] = None
+    ) -> Optional[List[str]]:
+        """
+        Get ids of posts matching a query, best match first
+
+        At most SEARCH_MAX_RESULTS ids are returned. Returns None while the
+        index is not ready, so callers can fall back to querying MongoDB.
+        """
+        if not self.ready:
+            return None
+
+        tag_set = frozenset(tag_ids or [])
+        key = (query, author_id, tag_set, category, self._generation)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            return cached
+
+        def predicate(meta: Dict[str, Any]) -> bool:
+            if author_id and meta.get("author_id") != author_id:
+                return False
+            if category and meta.get("category") != category:
+                return False
+            if tag_set and tag_set.isdisjoint(meta.get("tag_ids", ())):
+                return False
+            return True
+
+        filtered = bool(author_id or tag_set or category)
+        hits = self.engine.search(query, predicate if filtered else None)
+        ids = [doc_id for doc_id, _ in hits[:settings.SEARCH_MAX_RESULTS]]
+
+        self._results[key] = ids
+        if len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return ids
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index state for diagnostics
+        """
+        return {
+            "ready": self.ready,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            "unsaved_changes": self._generation != self._persisted_generation,
+            **self.engine.stats()
+        }
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    async def index_posts(self, database: AsyncIOMotorDatabase, posts: Iterable[dict]) -> int:
+        """
+        Add, replace or remove posts
+
+        Author and tag names come from the summaries embedded on the post;
+        posts not backfilled yet have theirs resolved in bulk. Deleted posts
+        are removed from the index. Returns the number of index entries that
+        actually changed.
+        """
+        posts = list(posts)
+        if not posts:
+            return 0
+
+        authors = {}
+        tags = {}
+        for post in posts:
+            if post.get("author"):
+                authors[post["author_id"]] = post["author"].get("name", "")
+            for tag in post.get("tags") or []:
+                tags[tag["_id"]] = tag.get("name", "")
+
+        author_ids = {post["author_id"] for post in posts if post.get("author_id")} - authors.keys()
+        tag_ids = {tag_id for post in posts for tag_id in post.get("tag_ids") or []} - tags.keys()
+
+        if author_ids:
+            async for user in database.users.find({"_id": {"$in": list(author_ids)}}, {"name": 1}):
+                authors[user["_id"]] = user.get("name", "")
+        if tag_ids:
+            async for tag in database.tags.find({"_id": {"$in": list(tag_ids)}}, {"name": 1}):
+                tags[tag["_id"]] = tag.get("name", "")
+
+        changed = 0
+        for post in posts:
+            doc_id = str(post["_id"])
+            if post.get("is_deleted"):
+                changed += self.engine.remove(doc_id)
+            else:
+                post_tag_ids = post.get("tag_ids") or []
+                changed += self.engine.add(
+                    doc_id,
+                    {
+                        "title": post.get("title", ""),
+                        "content": post.get("content", ""),
+                        "author": authors.get(post.get("author_id"), ""),
+                        "tags": " ".join(tags.get(tag_id, "") for tag_id in post_tag_ids)
+                    },
+                    {
+                        "author_id": str(post.get("author_id", "")),
+                        "tag_ids": [str(tag_id) for tag_id in post_tag_ids],
+                        "category": post.get("category")
+                    }
+                )
+            updated_at = post.get("updated_at")
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+            summary_updated_at = post.get("summary_updated_at")
+            if summary_updated_at and (self._summary_watermark is None or summary_updated_at > self._summary_watermark):
+                self._summary_watermark = summary_updated_at
+
+        if changed:
+            self._changed()
+        return changed
+
+    async def index_post(self, database: AsyncIOMotorDatabase, post: dict) -> None:
+        """
+        Update the index entry of a post that was just written
+
+        Called from the post write paths with the stored document. Indexing
+        problems are logged and never fail the write that triggered them.
+        """
+        if not settings.SEARCH_ENGINE_ENABLED:
+            return
+        try:
+            await self.index_posts(database, [post])
+        except Exception as e:
+            logger.error(f"Failed to update search index for post {post.get('_id')}: {e}")
+
+    def remove_post(self, post_id: Any) -> None:
+        """
+        Drop a post from the index
+        """
+        if self.engine.remove(str(post_id)):
+            self._changed()
+
+    def _changed(self) -> None:
+        self._generation += 1
+        self._results.clear()
+
+    # ------------------------------------------------------------------
+    # Build, catch-up and persistence
+    # ------------------------------------------------------------------
+
+    async def build(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Rebuild the index from every live post
+        """
+        self.engine.clear()
+        self._watermark = None
+        self._summary_watermark = None
+        total = 0
+        batch = []
+        async for post in database.posts.find({"is_deleted": False}, POST_PROJECTION).batch_size(BATCH_SIZE):
+            batch.append(post)
+            if len(batch) >= BATCH_SIZE:
+                total += await self.index_posts(database, batch)
+                batch = []
+        total += await self.index_posts(database, batch)
+        logger.info(f"Search index built with {total} posts")
+        return total
+
+    async def catch_up(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Apply posts changed since the newest ``updated_at`` already indexed,
+        then posts whose author or tag summaries were fanned out since the
+        newest ``summary_updated_at``
+
+        Picks up writes made by other workers and while the app was down.
+        """
+        query = {"updated_at": {"$gte": self._watermark - SYNC_OVERLAP}} if self._watermark else {}
+        total = await self._catch_up(database, query, "updated_at")
+        if self._summary_watermark:
+            query = {"summary_updated_at": {"$gte": self._summary_watermark - SYNC_OVERLAP}}
+        else:
+            query = {"summary_updated_at": {"$ne": None}}
+        total += await self._catch_up(database, query, "summary_updated_at")
+        return total
+
+    async def _catch_up(self, database: AsyncIOMotorDatabase, query: dict, field: str) -> int:
+        total = 0
+        batch = []
+        cursor = database.posts.find(query, POST_PROJECTION).sort(field, 1).batch_size(BATCH_SIZE)
+        async for post in cursor:
+            batch.append(post)
+            if len(batch) >= BATCH_SIZE:
+                total += await self.index_posts(database, batch)
+                batch = []
+        total += await self.index_posts(database, batch)
+        return total
+
+    async def load(self) -> bool:
+        """
+        Load the on-disk snapshot, returns False if there is none usable
+        """
+        path = settings.SEARCH_INDEX_PATH
+        try:
+            loaded = await asyncio.to_thread(SearchEngine.read_snapshot, path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable search index snapshot {path}: {e}")
+            return False
+        if loaded is None:
+            return False
+
+        docs, extra = loaded
+        self.engine.restore(docs.items())
+        watermark = extra.get("watermark")
+        self._watermark = datetime.fromisoformat(watermark) if watermark else None
+        summary_watermark = extra.get("summary_watermark")
+        self._summary_watermark = datetime.fromisoformat(summary_watermark) if summary_watermark else None
+        self._changed()
+        self._persisted_generation = self._generation
+        logger.info(f"Search index loaded {len(self.engine)} posts from {path}")
+        return True
+
+    async def persist(self) -> None:
+        """
+        Write the snapshot to disk if anything changed since the last write
+        """
+        if not self.ready or self._generation == self._persisted_generation:
+            return
+        generation = self._generation
+        docs = self.engine.snapshot()
+        extra = {
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            "summary_watermark": self._summary_watermark.isoformat() if self._summary_watermark else None
+        }
+        try:
+            await asyncio.to_thread(SearchEngine.write_snapshot, settings.SEARCH_INDEX_PATH, docs, extra)
+            self._persisted_generation = generation
+        except Exception as e:
+            logger.error(f"Failed to persist search index: {e}")
+
+    async def start(self, database: AsyncIOMotorDatabase) -> None:
+        """
+        Load or build the index in the background and keep it in sync
+
+        Search falls back to MongoDB queries until the index is ready.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(database))
+
+    async def stop(self) -> None:
+        """
+        Stop syncing and persist pending changes
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+    async def _run(self, database: AsyncIOMotorDatabase) -> None:
+        try:
+            if await self.load():
+                caught_up = await self.catch_up(database)
+                logger.info(f"Search index caught up on {caught_up} changed posts")
+            else:
+                await self.build(database)
+            self.ready = True
+            await self.persist()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Search index initialization failed, using database search: {e}")
+            return
+
+        while True:
+            await asyncio.sleep(settings.SEARCH_INDEX_SYNC_INTERVAL_SECONDS)
+            try:
+                await self.catch_up(database)
+                await self.persist()
+            except Exception as e:
+                logger.error(f"Search index sync failed: {e}")
+
+
+post_search = PostSearchIndex()
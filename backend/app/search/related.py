@@ -0,0 +1,460 @@
+"""
+Related posts engine
+
+Every live post is kept as a sparse term-frequency row over title + content
+and a row of tag ids. From those the engine publishes, off the event loop:
+
+- an L2-normalized TF-IDF matrix (posts x terms), so the cosine similarity
+  of one post to all others is a single sparse matrix-vector product;
+- a post x tag incidence matrix and a normalized tag co-occurrence matrix
+  (tags x tags), so posts sharing tags that are often used together score
+  even without sharing exact tags.
+
+Post writes update the rows, document frequencies and co-occurrence counts
+of just the changed post; the matrices are re-assembled from those rows at
+most every RELATED_POSTS_REFRESH_SECONDS. A background task also catches up
+on posts changed by other workers through ``updated_at``, and rebuilds
+everything every RELATED_POSTS_FULL_REBUILD_SECONDS: removed posts leave
+their terms and tags behind as empty columns until then.
+
+Needs NumPy and SciPy; without them the engine stays disabled and posts are
+served without related posts.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import math
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.search.tokenizer import tokenize
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+POST_PROJECTION = {
+    "title": 1, "content": 1, "tag_ids": 1, "category": 1, "is_deleted": 1, "updated_at": 1
+}
+
+# Title terms count this many times as much as content terms
+TITLE_WEIGHT = 2
+
+# Posts fetched per round trip while building or catching up
+BATCH_SIZE = 500
+
+# Catch-up re-reads this far behind the newest ``updated_at`` seen
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class RelatedDocument:
+    """
+    Sparse rows and display data of one post
+
+    Instances are replaced, never mutated, so a refresh can read them from
+    another thread while the event loop keeps applying writes.
+    """
+
+    __slots__ = ("term_cols", "term_weights", "tag_cols", "title", "category")
+
+    def __init__(self, term_cols, term_weights, tag_cols, title: str, category: Optional[str]):
+        self.term_cols = term_cols
+        self.term_weights = term_weights
+        self.tag_cols = tag_cols
+        self.title = title
+        self.category = category
+
+
+class RelatedMatrices:
+    """
+    One published, read-only set of similarity matrices
+    """
+
+    def __init__(self, ids: List[str], docs: List[RelatedDocument], tfidf, idf, incidence, tag_counts, cooccurrence):
+        self.ids = ids
+        self.docs = docs
+        self.rows = {post_id: row for row, post_id in enumerate(ids)}
+        self.tfidf = tfidf
+        self.idf = idf
+        self.incidence = incidence
+        self.tag_counts = tag_counts
+        self.cooccurrence = cooccurrence
+
+
+class RelatedPosts:
+    """
+    Content and tag based related-posts index with incremental updates
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._docs: Dict[str, RelatedDocument] = {}
+        # Vocabulary only grows until the next full build, so columns stay stable
+        self._terms: Dict[str, int] = {}
+        self._term_df: List[int] = []
+        self._tags: Dict[str, int] = {}
+        self._tag_df: List[int] = []
+        self._pairs: Dict[Tuple[int, int], int] = {}
+        self._published: Optional[RelatedMatrices] = None
+        self._changed = False
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_full_build = 0.0
+        self.refreshes = 0
+        self.last_refresh_ms = 0.0
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether the numeric dependencies are installed
+        """
+        return np is not None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def related(self, post_id: Any, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the posts most similar to a post, best first
+
+        Each item has the post ``_id``, ``title``, ``category`` and the
+        similarity ``score``. Returns an empty list while the engine is not
+        ready or the post is unknown.
+        """
+        matrices = self._published
+        doc = self._docs.get(str(post_id))
+        if matrices is None or doc is None or not matrices.ids:
+            return []
+        limit = limit or settings.RELATED_POSTS_LIMIT
+
+        # Query with the post's live row, so a just edited post is matched on
+        # its new text; terms and tags newer than the matrices are ignored
+        term_mask = doc.term_cols < matrices.tfidf.shape[1]
+        query = np.zeros(matrices.tfidf.shape[1], dtype=np.float32)
+        query[doc.term_cols[term_mask]] = doc.term_weights[term_mask] * matrices.idf[doc.term_cols[term_mask]]
+        query_norm = np.linalg.norm(query)
+        scores = matrices.tfidf @ (query / query_norm) if query_norm else np.zeros(len(matrices.ids), dtype=np.float32)
+
+        tag_cols = doc.tag_cols[doc.tag_cols < matrices.incidence.shape[1]]
+        tag_weight = settings.RELATED_POSTS_TAG_WEIGHT
+        if len(tag_cols) and tag_weight:
+            # Spread the post's tags to the tags they co-occur with
+            profile = np.asarray(matrices.cooccurrence[tag_cols].sum(axis=0)).ravel()
+            profile_norm = np.linalg.norm(profile)
+            if profile_norm:
+                tag_scores = (matrices.incidence @ (profile / profile_norm)) / matrices.tag_counts
+                scores = (1 - tag_weight) * scores + tag_weight * tag_scores
+
+        own_row = matrices.rows.get(str(post_id))
+        if own_row is not None:
+            scores[own_row] = 0
+
+        count = min(limit, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for row in top:
+            score = float(scores[row])
+            if score <= 0:
+                break
+            related_id = matrices.ids[row]
+            current = self._docs.get(related_id)
+            if current is None:
+                # Deleted since the last refresh
+                continue
+            results.append({
+                "_id": related_id,
+                "title": current.title,
+                "category": current.category,
+                "score": round(score, 4)
+            })
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get engine state for diagnostics
+        """
+        matrices = self._published
+        return {
+            "available": self.available,
+            "ready": self.ready,
+            "posts": len(self._docs),
+            "terms": len(self._terms),
+            "tags": len(self._tags),
+            "tag_pairs": len(self._pairs),
+            "published_posts": len(matrices.ids) if matrices else 0,
+            "tfidf_nonzeros": int(matrices.tfidf.nnz) if matrices else 0,
+            "pending_changes": self._changed,
+            "refreshes": self.refreshes,
+            "last_refresh_ms": round(self.last_refresh_ms, 2)
+        }
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def update_post(self, post: dict) -> None:
+        """
+        Add, replace or remove a post that was just written
+
+        Called from the post write paths with the stored document. Problems
+        are logged and never fail the write that triggered them.
+        """
+        if not self.available or not settings.RELATED_POSTS_ENABLED:
+            return
+        try:
+            self._apply(post)
+        except Exception as e:
+            logger.error(f"Failed to update related posts for post {post.get('_id')}: {e}")
+
+    def remove_post(self, post_id: Any) -> None:
+        """
+        Drop a post
+        """
+        doc = self._docs.pop(str(post_id), None)
+        if doc is not None:
+            self._unlink(doc)
+            self._changed = True
+
+    def _apply(self, post: dict) -> None:
+        post_id = str(post["_id"])
+        updated_at = post.get("updated_at")
+        if updated_at and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+        if post.get("is_deleted"):
+            self.remove_post(post_id)
+            return
+
+        frequencies: Dict[str, int] = {}
+        for token in tokenize(post.get("title", "")):
+            frequencies[token] = frequencies.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(post.get("content", "")):
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        term_cols = np.fromiter((self._column(self._terms, self._term_df, term) for term in frequencies), dtype=np.int32, count=len(frequencies))
+        # Sublinear term frequency, so a long post repeating a word doesn't dominate
+        term_weights = np.fromiter((1 + math.log(count) for count in frequencies.values()), dtype=np.float32, count=len(frequencies))
+        tag_names = list(dict.fromkeys(str(tag_id) for tag_id in post.get("tag_ids") or []))
+        tag_cols = np.fromiter((self._column(self._tags, self._tag_df, tag) for tag in tag_names), dtype=np.int32, count=len(tag_names))
+
+        previous = self._docs.get(post_id)
+        if previous is not None:
+            self._unlink(previous)
+        doc = RelatedDocument(term_cols, term_weights, tag_cols, post.get("title", ""), post.get("category"))
+        self._docs[post_id] = doc
+        self._link(doc)
+        self._changed = True
+
+    @staticmethod
+    def _column(columns: Dict[str, int], counts: List[int], key: str) -> int:
+        column = columns.get(key)
+        if column is None:
+            column = columns[key] = len(counts)
+            counts.append(0)
+        return column
+
+    def _link(self, doc: RelatedDocument) -> None:
+        for column in doc.term_cols.tolist():
+            self._term_df[column] += 1
+        tags = sorted(doc.tag_cols.tolist())
+        for index, tag in enumerate(tags):
+            self._tag_df[tag] += 1
+            for other in tags[index + 1:]:
+                self._pairs[(tag, other)] = self._pairs.get((tag, other), 0) + 1
+
+    def _unlink(self, doc: RelatedDocument) -> None:
+        for column in doc.term_cols.tolist():
+            self._term_df[column] -= 1
+        tags = sorted(doc.tag_cols.tolist())
+        for index, tag in enumerate(tags):
+            self._tag_df[tag] -= 1
+            for other in tags[index + 1:]:
+                remaining = self._pairs.get((tag, other), 0) - 1
+                if remaining > 0:
+                    self._pairs[(tag, other)] = remaining
+                else:
+                    self._pairs.pop((tag, other), None)
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    async def refresh(self) -> None:
+        """
+        Re-assemble the matrices from the current rows if anything changed
+        """
+        if not self._changed and self._published is not None:
+            return
+        self._changed = False
+        # Copied on the loop; the thread only reads these snapshots
+        ids = list(self._docs)
+        docs = list(self._docs.values())
+        term_df = np.array(self._term_df, dtype=np.float32)
+        tag_df = np.array(self._tag_df, dtype=np.float32)
+        pairs = dict(self._pairs)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._published = await asyncio.to_thread(assemble_matrices, ids, docs, term_df, tag_df, pairs)
+        self.refreshes += 1
+        self.last_refresh_ms = (loop.time() - started) * 1000
+
+    # ------------------------------------------------------------------
+    # Build, catch-up and background task
+    # ------------------------------------------------------------------
+
+    async def build(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Rebuild every row from the live posts, with fresh vocabularies
+
+        The rows and matrices are built aside and swapped in together, so
+        queries keep using the previous ones meanwhile. Writes applied
+        during the build are picked up again by the next catch-up.
+        """
+        fresh = RelatedPosts()
+        total = 0
+        async for post in database.posts.find({"is_deleted": False}, POST_PROJECTION).batch_size(BATCH_SIZE):
+            fresh._apply(post)
+            total += 1
+            if total % BATCH_SIZE == 0:
+                # Tokenizing is CPU bound, let requests through between batches
+                await asyncio.sleep(0)
+        await fresh.refresh()
+
+        self._docs = fresh._docs
+        self._terms, self._term_df = fresh._terms, fresh._term_df
+        self._tags, self._tag_df = fresh._tags, fresh._tag_df
+        self._pairs = fresh._pairs
+        self._published = fresh._published
+        self._watermark = fresh._watermark
+        self._changed = False
+        self._last_full_build = time.monotonic()
+        self.refreshes += 1
+        self.last_refresh_ms = fresh.last_refresh_ms
+        logger.info(f"Related posts built with {total} posts")
+        return total
+
+    async def catch_up(self, database: AsyncIOMotorDatabase) -> int:
+        """
+        Apply posts changed since the newest ``updated_at`` already seen
+        """
+        query = {"updated_at": {"$gte": self._watermark - SYNC_OVERLAP}} if self._watermark else {}
+        total = 0
+        async for post in database.posts.find(query, POST_PROJECTION).sort("updated_at", 1).batch_size(BATCH_SIZE):
+            self._apply(post)
+            total += 1
+        return total
+
+    def start(self, database: AsyncIOMotorDatabase) -> None:
+        """
+        Build the engine in the background and keep it in sync
+        """
+        if not self.available:
+            logger.warning("NumPy/SciPy not installed, related posts are disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(database))
+
+    async def stop(self) -> None:
+        """
+        Stop syncing
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, database: AsyncIOMotorDatabase) -> None:
+        try:
+            await self.build(database)
+            self.ready = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Related posts initialization failed: {e}")
+            return
+
+        while True:
+            await asyncio.sleep(settings.RELATED_POSTS_REFRESH_SECONDS)
+            try:
+                if time.monotonic() - self._last_full_build >= settings.RELATED_POSTS_FULL_REBUILD_SECONDS:
+                    await self.build(database)
+                await self.catch_up(database)
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Related posts sync failed: {e}")
+
+
+def assemble_matrices(
+    ids: List[str],
+    docs: List[RelatedDocument],
+    term_df,
+    tag_df,
+    pairs: Dict[Tuple[int, int], int]
+) -> RelatedMatrices:
+    """
+    Build the TF-IDF, tag incidence and tag co-occurrence matrices from rows
+    """
+    rows = len(docs)
+    term_lengths = np.fromiter((len(doc.term_cols) for doc in docs), dtype=np.int64, count=rows)
+    term_indptr = np.concatenate(([0], np.cumsum(term_lengths)))
+    term_indices = np.concatenate([doc.term_cols for doc in docs]) if rows else np.zeros(0, dtype=np.int32)
+    term_data = np.concatenate([doc.term_weights for doc in docs]) if rows else np.zeros(0, dtype=np.float32)
+
+    # Smoothed idf, as in scikit-learn; terms no live post uses get zero weight
+    idf = (np.log((1 + rows) / (1 + term_df)) + 1).astype(np.float32)
+    idf[term_df <= 0] = 0
+    term_data = term_data * idf[term_indices]
+    tfidf = sparse.csr_matrix((term_data, term_indices, term_indptr), shape=(rows, len(term_df)))
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    tfidf = sparse.diags(1 / norms).dot(tfidf).tocsr()
+
+    tag_lengths = np.fromiter((len(doc.tag_cols) for doc in docs), dtype=np.int64, count=rows)
+    tag_indptr = np.concatenate(([0], np.cumsum(tag_lengths)))
+    tag_indices = np.concatenate([doc.tag_cols for doc in docs]) if rows else np.zeros(0, dtype=np.int32)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(tag_indices), dtype=np.float32), tag_indices, tag_indptr),
+        shape=(rows, len(tag_df))
+    )
+    # Normalizes tag scores to a cosine against the post's tag set
+    tag_counts = np.sqrt(np.maximum(tag_lengths, 1)).astype(np.float32)
+
+    # Co-occurrence normalized by sqrt(df_a * df_b), each tag fully related to itself
+    if pairs:
+        pair_keys = np.array(list(pairs.keys()), dtype=np.int32)
+        pair_counts = np.fromiter(pairs.values(), dtype=np.float32, count=len(pairs))
+        strength = pair_counts / np.sqrt(tag_df[pair_keys[:, 0]] * tag_df[pair_keys[:, 1]])
+        pair_rows = np.concatenate((pair_keys[:, 0], pair_keys[:, 1]))
+        pair_cols = np.concatenate((pair_keys[:, 1], pair_keys[:, 0]))
+        strength = np.concatenate((strength, strength))
+    else:
+        pair_rows = pair_cols = np.zeros(0, dtype=np.int32)
+        strength = np.zeros(0, dtype=np.float32)
+    used_tags = np.flatnonzero(tag_df > 0).astype(np.int32)
+    cooccurrence = sparse.csr_matrix(
+        (
+            np.concatenate((strength, np.ones(len(used_tags), dtype=np.float32))),
+            (np.concatenate((pair_rows, used_tags)), np.concatenate((pair_cols, used_tags)))
+        ),
+        shape=(len(tag_df), len(tag_df))
+    )
+
+    return RelatedMatrices(ids, docs, tfidf, idf, incidence, tag_counts, cooccurrence)
+
+
+related_posts = RelatedPosts()
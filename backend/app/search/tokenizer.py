@@ -0,0 +1,80 @@
+"""
+Tokenizer for the post search index
+
+Latin-script text (Vietnamese, English) is folded to lowercase ASCII so that
+"toán" and "toan" match, then split on word boundaries. Japanese and other
+CJK text has no spaces, so CJK runs are indexed as overlapping character
+bigrams; a single-character run is kept as a unigram.
+"""
+from typing import List
+import re
+import unicodedata
+
+# Hiragana, Katakana (incl. half-width and the prolonged sound mark),
+# CJK unified ideographs and extension A
+CJK_RUN = re.compile(r"[\u3040-\u309f\u30a0-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]+")
+
+WORD = re.compile(r"[0-9a-z]+")
+
+# Letters that do not decompose into a base letter plus combining marks
+LATIN_FOLDS = str.maketrans({"đ": "d", "Đ": "d", "ø": "o", "Ø": "o", "ł": "l", "Ł": "l"})
+
+# Single-character Latin tokens are dropped, they match almost everything
+MIN_WORD_LENGTH = 2
+
+
+def fold_diacritics(text: str) -> str:
+    """
+    Lowercase and strip diacritics from Latin-script text
+
+    Only use on non-CJK text: NFD would also split the dakuten off kana.
+    """
+    decomposed = unicodedata.normalize("NFD", text.translate(LATIN_FOLDS))
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return stripped.lower()
+
+
+def cjk_ngrams(run: str) -> List[str]:
+    """
+    Split a CJK run into overlapping character bigrams
+    """
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def latin_words(text: str) -> List[str]:
+    """
+    Split non-CJK text into folded words
+    """
+    if not text:
+        return []
+    return [word for word in WORD.findall(fold_diacritics(text)) if len(word) >= MIN_WORD_LENGTH]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize text for indexing or querying, keeping duplicates and order
+    """
+    if not text:
+        return []
+
+    # NFKC folds full-width Latin letters and half-width katakana
+    text = unicodedata.normalize("NFKC", text)
+    tokens: List[str] = []
+    position = 0
+
+    for match in CJK_RUN.finditer(text):
+        tokens.extend(latin_words(text[position:match.start()]))
+        tokens.extend(cjk_ngrams(match.group()))
+        position = match.end()
+    tokens.extend(latin_words(text[position:]))
+
+    return tokens
+
+
+def is_cjk_token(token: str) -> bool:
+    """
+    Check whether a token came from a CJK run
+    """
+    return bool(CJK_RUN.fullmatch(token))
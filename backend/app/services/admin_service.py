@@ -6,6 +6,10 @@ from bson import ObjectId
 from app.models.user import UserModel, UserRole, UserStatus
 from app.models.audit_log import AuditAction
 from app.services.audit_log_service import AuditLogService
+from app.services.post_summary_service import PostSummaryService, AUTHOR_SUMMARY_FIELDS
+from app.core.background import run_in_background
+from app.core.user_cache import user_cache
+from app.utils.db_helpers import paginate
 
 
 class AdminService:
@@ -68,12 +72,8 @@ class AdminService:
                 date_query["$lte"] = end_date
             query["created_at"] = date_query
 
-        # Get total count
-        total = await self.collection.count_documents(query)
-
-        # Get users with pagination, sorted by most recent first
-        cursor = self.collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-        users = await cursor.to_list(length=limit)
+        # Get users with pagination, sorted by most recent first, and the total count
+        users, total, _ = await paginate(self.collection, query, skip, limit, sort=[("created_at", -1)])
 
         return [UserModel(**user) for user in users], total
 
@@ -123,6 +123,14 @@ class AdminService:
 
         if result:
             updated_user = UserModel(**result)
+            user_cache.invalidate(user_id)
+
+            # Refresh the author summary embedded on the user's posts
+            if any(field in update_dict for field in AUTHOR_SUMMARY_FIELDS):
+                run_in_background(
+                    PostSummaryService(self.collection.database).fan_out_author(user_id),
+                    f"author fan-out for user {user_id}"
+                )
 
             # Create audit log
             old_values = {k: old_user.get(k) for k in update_data.keys() if k in old_user}
@@ -180,6 +188,7 @@ class AdminService:
 
         if result:
             updated_user = UserModel(**result)
+            user_cache.invalidate(user_id)
 
             # Create audit log
             await self.audit_service.create_log(
@@ -226,6 +235,7 @@ class AdminService:
 
         if result:
             updated_user = UserModel(**result)
+            user_cache.invalidate(user_id)
 
             # Create audit log
             await self.audit_service.create_log(
@@ -280,6 +290,7 @@ class AdminService:
 
         if result:
             updated_user = UserModel(**result)
+            user_cache.invalidate(user_id)
 
             # Create audit log
             await self.audit_service.create_log(
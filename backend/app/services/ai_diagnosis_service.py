@@ -4,11 +4,14 @@ AI Diagnosis Service for managing lecture diagnostics.
 This module handles CRUD operations and AI analysis for lecture diagnoses.
 """
 
+import asyncio
 import json
+import logging
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClientSession
 
 from app.models.ai_diagnosis import (
     AIDiagnosisModel,
@@ -17,11 +20,17 @@ from app.models.ai_diagnosis import (
     DiagnosisStatus,
     QuestionType
 )
+from app.models.diagnosis_job import DiagnosisJobKind
+from app.core.config import settings
+from app.core.diagnosis_jobs import diagnosis_jobs
+from app.utils.db_helpers import paginate
 from app.schemas.ai_diagnosis import (
     AIDiagnosisCreate,
     AIDiagnosisUpdate,
     QuestionAnswerSubmit,
     DiagnosisEvaluation,
+    EvaluationItemTiming,
+    EvaluationMetadata,
     FeedbackItem
 )
 from app.services.llm_service import (
@@ -29,9 +38,17 @@ from app.services.llm_service import (
     build_diagnosis_prompt,
     build_question_generation_prompt,
     build_evaluation_prompt,
-    parse_llm_json_response
+    build_batch_evaluation_prompt,
+    parse_llm_json_response,
+    parse_batch_evaluation_response,
+    PROMPT_DIAGNOSIS,
+    PROMPT_QUESTIONS,
+    PROMPT_EVALUATION,
+    PROMPT_BATCH_EVALUATION
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AIDiagnosisService:
     """
@@ -49,7 +66,8 @@ class AIDiagnosisService:
         self,
         diagnosis_data: AIDiagnosisCreate,
         user_id: str,
-        subject: str = None
+        subject: str = None,
+        session: Optional[AsyncIOMotorClientSession] = None
     ) -> AIDiagnosisModel:
         """
         Create a new AI diagnosis.
@@ -58,6 +76,7 @@ class AIDiagnosisService:
             diagnosis_data: The diagnosis creation data
             user_id: The ID of the user creating the diagnosis
             subject: Optional subject of the lesson
+            session: Optional causally consistent session
             
         Returns:
             The created diagnosis model
@@ -71,7 +90,7 @@ class AIDiagnosisService:
         diagnosis_dict["subject"] = subject
         diagnosis_dict["created_at"] = datetime.utcnow()
         
-        result = await self.collection.insert_one(diagnosis_dict)
+        result = await self.collection.insert_one(diagnosis_dict, session=session)
         diagnosis_dict["_id"] = result.inserted_id
         
         return AIDiagnosisModel(**diagnosis_dict)
@@ -91,6 +110,26 @@ class AIDiagnosisService:
         Returns:
             The diagnosis model if found, None otherwise
         """
+        diagnosis = await self.get_diagnosis_document(diagnosis_id, user_id)
+        if diagnosis:
+            return AIDiagnosisModel(**diagnosis)
+        return None
+
+    async def get_diagnosis_document(
+        self,
+        diagnosis_id: str,
+        user_id: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Get a diagnosis by ID as the raw document, for read-only responses.
+        
+        Args:
+            diagnosis_id: The diagnosis ID
+            user_id: Optional user ID to filter by ownership
+            
+        Returns:
+            The diagnosis document if found, None otherwise
+        """
         if not ObjectId.is_valid(diagnosis_id):
             return None
             
@@ -98,10 +137,7 @@ class AIDiagnosisService:
         if user_id:
             query["user_id"] = ObjectId(user_id)
             
-        diagnosis = await self.collection.find_one(query)
-        if diagnosis:
-            return AIDiagnosisModel(**diagnosis)
-        return None
+        return await self.collection.find_one(query)
     
     async def get_diagnoses_by_user(
         self,
@@ -111,10 +147,11 @@ class AIDiagnosisService:
         search: Optional[str] = None,
         subject: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> List[AIDiagnosisModel]:
+        end_date: Optional[datetime] = None,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> Tuple[List[dict], int]:
         """
-        Get all diagnoses for a user with optional filters.
+        Get all diagnoses for a user with optional filters, as raw documents.
         
         Args:
             user_id: The user ID
@@ -124,9 +161,10 @@ class AIDiagnosisService:
             subject: Optional subject filter
             start_date: Optional start date filter
             end_date: Optional end date filter
+            session: Optional causally consistent session
             
         Returns:
-            List of diagnosis models
+            Tuple of (diagnosis documents, total count)
         """
         query = {"user_id": ObjectId(user_id)}
         
@@ -147,47 +185,19 @@ class AIDiagnosisService:
                 # Include the entire end date by setting to end of day
                 query["created_at"]["$lte"] = end_date
         
-        cursor = self.collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-        
-        diagnoses = []
-        async for doc in cursor:
-            diagnoses.append(AIDiagnosisModel(**doc))
-        return diagnoses
+        docs, total, _ = await paginate(
+            self.collection, query, skip, limit,
+            sort=[("created_at", -1)],
+            session=session
+        )
+        return docs, total
 
-    async def count_diagnoses_by_user(
-        self,
-        user_id: str,
-        search: Optional[str] = None,
-        subject: Optional[str] = None,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> int:
-        """Count total diagnoses for a user with optional filters."""
-        query = {"user_id": ObjectId(user_id)}
-        
-        # Add search filter
-        if search:
-            query["title"] = {"$regex": search, "$options": "i"}
-        
-        # Add subject filter
-        if subject:
-            query["subject"] = subject
-        
-        # Add date range filter
-        if start_date or end_date:
-            query["created_at"] = {}
-            if start_date:
-                query["created_at"]["$gte"] = start_date
-            if end_date:
-                query["created_at"]["$lte"] = end_date
-        
-        return await self.collection.count_documents(query)
-    
     async def update_diagnosis(
         self,
         diagnosis_id: str,
         update_data: AIDiagnosisUpdate,
-        user_id: str
+        user_id: str,
+        session: Optional[AsyncIOMotorClientSession] = None
     ) -> Optional[AIDiagnosisModel]:
         """
         Update a diagnosis.
@@ -196,6 +206,7 @@ class AIDiagnosisService:
             diagnosis_id: The diagnosis ID
             update_data: The update data
             user_id: The user ID (for ownership check)
+            session: Optional causally consistent session
             
         Returns:
             The updated diagnosis model if found and updated
@@ -217,7 +228,8 @@ class AIDiagnosisService:
                 "user_id": ObjectId(user_id)
             },
             {"$set": update_dict},
-            return_document=True
+            return_document=True,
+            session=session
         )
         
         if result:
@@ -227,7 +239,8 @@ class AIDiagnosisService:
     async def delete_diagnosis(
         self,
         diagnosis_id: str,
-        user_id: str
+        user_id: str,
+        session: Optional[AsyncIOMotorClientSession] = None
     ) -> bool:
         """
         Delete a diagnosis.
@@ -235,6 +248,7 @@ class AIDiagnosisService:
         Args:
             diagnosis_id: The diagnosis ID
             user_id: The user ID (for ownership check)
+            session: Optional causally consistent session
             
         Returns:
             True if deleted, False otherwise
@@ -245,7 +259,7 @@ class AIDiagnosisService:
         result = await self.collection.delete_one({
             "_id": ObjectId(diagnosis_id),
             "user_id": ObjectId(user_id)
-        })
+        }, session=session)
         
         return result.deleted_count > 0
     
@@ -284,7 +298,8 @@ class AIDiagnosisService:
     async def analyze_lecture(
         self,
         diagnosis_id: str,
-        user_id: str
+        user_id: str,
+        mark_failed: bool = True
     ) -> Optional[AIDiagnosisModel]:
         """
         Run AI analysis on a lecture diagnosis.
@@ -292,6 +307,8 @@ class AIDiagnosisService:
         Args:
             diagnosis_id: The diagnosis ID
             user_id: The user ID
+            mark_failed: Whether an error marks the diagnosis as failed;
+                background jobs only do so after their last attempt
             
         Returns:
             The updated diagnosis with AI results
@@ -309,7 +326,7 @@ class AIDiagnosisService:
         )
         
         try:
-            response = await call_llm(prompt)
+            response = await call_llm(prompt, prompt_type=PROMPT_DIAGNOSIS)
             result = parse_llm_json_response(response)
             
             # Handle suggestions - convert to list of strings
@@ -352,10 +369,11 @@ class AIDiagnosisService:
                 
         except Exception as e:
             # Mark as failed
-            await self.collection.update_one(
-                {"_id": ObjectId(diagnosis_id)},
-                {"$set": {"status": DiagnosisStatus.FAILED}}
-            )
+            if mark_failed:
+                await self.collection.update_one(
+                    {"_id": ObjectId(diagnosis_id)},
+                    {"$set": {"status": DiagnosisStatus.FAILED}}
+                )
             raise e
             
         return None
@@ -395,7 +413,7 @@ class AIDiagnosisService:
             num_questions=num_questions
         )
         
-        response = await call_llm(prompt)
+        response = await call_llm(prompt, prompt_type=PROMPT_QUESTIONS)
         result = parse_llm_json_response(response)
         
         # Parse questions
@@ -421,7 +439,8 @@ class AIDiagnosisService:
             },
             {
                 "$set": {
-                    "generated_questions": [q.model_dump() for q in questions]
+                    "generated_questions": [q.model_dump() for q in questions],
+                    "questions_status": DiagnosisStatus.COMPLETED
                 }
             },
             return_document=True
@@ -431,6 +450,90 @@ class AIDiagnosisService:
             return AIDiagnosisModel(**updated)
         return None
     
+    # =========================================================================
+    # Background Jobs
+    # =========================================================================
+    
+    async def request_analysis(self, diagnosis_id: str, user_id: str) -> Optional[dict]:
+        """
+        Queue the AI analysis of a lecture diagnosis.
+        
+        The diagnosis is pending until the job completes or fails.
+        
+        Returns:
+            The queued (or already pending) job, None if the diagnosis is not found
+        """
+        if not ObjectId.is_valid(diagnosis_id):
+            return None
+        
+        result = await self.collection.update_one(
+            {"_id": ObjectId(diagnosis_id), "user_id": ObjectId(user_id)},
+            {"$set": {"status": DiagnosisStatus.PENDING}}
+        )
+        if result.matched_count == 0:
+            return None
+        
+        return await diagnosis_jobs.enqueue(
+            DiagnosisJobKind.ANALYZE, ObjectId(diagnosis_id), ObjectId(user_id)
+        )
+    
+    async def request_questions(
+        self,
+        diagnosis_id: str,
+        user_id: str,
+        num_questions: int = 5
+    ) -> Optional[dict]:
+        """
+        Queue the generation of assessment questions.
+        
+        questions_status is pending until the job completes or fails.
+        
+        Returns:
+            The queued (or already pending) job, None if the diagnosis is not found
+        """
+        diagnosis = await self.get_diagnosis_by_id(diagnosis_id, user_id)
+        if not diagnosis:
+            return None
+        
+        # Check if analysis has been done
+        if not diagnosis.ai_result.misunderstanding_points:
+            raise ValueError("Diagnosis must be analyzed first before generating questions")
+        
+        await self.collection.update_one(
+            {"_id": ObjectId(diagnosis_id)},
+            {"$set": {"questions_status": DiagnosisStatus.PENDING}}
+        )
+        return await diagnosis_jobs.enqueue(
+            DiagnosisJobKind.GENERATE_QUESTIONS,
+            ObjectId(diagnosis_id),
+            ObjectId(user_id),
+            {"num_questions": num_questions}
+        )
+    
+    async def run_job(self, job: dict) -> None:
+        """
+        Run a claimed diagnosis job (see app.core.diagnosis_jobs).
+        
+        A diagnosis deleted in the meantime completes the job without work.
+        """
+        diagnosis_id, user_id = str(job["diagnosis_id"]), str(job["user_id"])
+        if job["kind"] == DiagnosisJobKind.ANALYZE:
+            await self.analyze_lecture(diagnosis_id, user_id, mark_failed=False)
+        else:
+            await self.generate_questions(
+                diagnosis_id, user_id, job["params"].get("num_questions", 5)
+            )
+    
+    async def fail_job(self, job: dict, error: str) -> None:
+        """
+        Mark the diagnosis step of a job that failed for good as failed.
+        """
+        field = "status" if job["kind"] == DiagnosisJobKind.ANALYZE else "questions_status"
+        await self.collection.update_one(
+            {"_id": job["diagnosis_id"]},
+            {"$set": {field: DiagnosisStatus.FAILED}}
+        )
+    
     async def evaluate_answers(
         self,
         diagnosis_id: str,
@@ -445,6 +548,12 @@ class AIDiagnosisService:
             user_id: The user ID
             answers: List of student answers
             
+        Several short answers are graded with one batch prompt; the items
+        it leaves ungraded, or all of them when its response is malformed,
+        are then graded one by one, concurrently. One that fails or times out
+        is returned ungraded (evaluated=False) instead of failing the
+        submission, and the metadata carries each item's latency.
+        
         Returns:
             Evaluation results with score and feedback
         """
@@ -461,53 +570,159 @@ class AIDiagnosisService:
             str(q.id): q for q in diagnosis.generated_questions
         }
         
-        correct_count = 0
+        started = time.perf_counter()
         total_count = len(answers)
-        feedbacks = []
+        feedbacks: List[FeedbackItem] = []
+        short_answers = []
         
         for answer in answers:
             question = question_map.get(answer.question_id)
             if not question:
                 continue
             
-            is_correct = False
-            explanation = ""
+            feedback = FeedbackItem(
+                question_id=str(question.id),
+                is_correct=False,
+                correct_answer=question.correct_answer
+            )
+            feedbacks.append(feedback)
             
             # For multiple choice, direct comparison
             if question.type == QuestionType.MULTIPLE_CHOICE:
-                is_correct = answer.user_answer.strip().upper() == question.correct_answer.strip().upper()
-                if not is_correct:
-                    explanation = f"Đáp án đúng là {question.correct_answer}"
+                feedback.is_correct = answer.user_answer.strip().upper() == question.correct_answer.strip().upper()
+                if not feedback.is_correct:
+                    feedback.explanation = f"Đáp án đúng là {question.correct_answer}"
             else:
-                # For short answer, use LLM to evaluate
-                prompt = build_evaluation_prompt(
-                    question=question.question_text,
-                    correct_answer=question.correct_answer,
-                    user_answer=answer.user_answer,
-                    question_type="short_answer"
-                )
-                
-                response = await call_llm(prompt)
-                result = parse_llm_json_response(response)
-                
-                is_correct = result.get("is_correct", False)
-                explanation = result.get("feedback", "")
-            
-            if is_correct:
-                correct_count += 1
-                
-            feedbacks.append(FeedbackItem(
-                question_id=str(question.id),
-                is_correct=is_correct,
-                correct_answer=question.correct_answer,
-                explanation=explanation
+                # For short answer, use LLM to evaluate (below, concurrently)
+                short_answers.append((feedback, question, answer.user_answer))
+        
+        # Grade all short answers with one prompt when there are several
+        outcomes: List[Optional[Tuple[Optional[dict], str, float]]] = [None] * len(short_answers)
+        mode = "concurrent"
+        if settings.LLM_EVALUATION_BATCH_ENABLED and len(short_answers) > 1:
+            for index, outcome in (await self._grade_short_answers_batch(short_answers)).items():
+                outcomes[index] = outcome
+            mode = "batch" if None not in outcomes else "batch_fallback"
+        
+        # Grade what is left one by one, side by side, a few at a time per
+        # submission (the LLM client also bounds the calls of the whole worker)
+        remaining = [index for index, outcome in enumerate(outcomes) if outcome is None]
+        semaphore = asyncio.Semaphore(settings.LLM_EVALUATION_CONCURRENCY)
+        graded = await asyncio.gather(*(
+            self._grade_short_answer(short_answers[index][1], short_answers[index][2], semaphore)
+            for index in remaining
+        ))
+        for index, outcome in zip(remaining, graded):
+            outcomes[index] = outcome
+        
+        timings = []
+        for (feedback, question, _), outcome in zip(short_answers, outcomes):
+            result, item_status, seconds = outcome
+            timings.append(EvaluationItemTiming(
+                question_id=feedback.question_id,
+                seconds=round(seconds, 3),
+                status=item_status
             ))
+            if result is None:
+                feedback.evaluated = False
+                continue
+            feedback.is_correct = bool(result.get("is_correct", False))
+            feedback.explanation = result.get("feedback", "")
         
+        correct_count = sum(1 for feedback in feedbacks if feedback.is_correct)
         score_percentage = (correct_count / total_count * 100) if total_count > 0 else 0
         
         return DiagnosisEvaluation(
             total_questions=total_count,
             correct_answers=correct_count,
             score_percentage=round(score_percentage, 2),
-            feedback=feedbacks
+            feedback=feedbacks,
+            metadata=EvaluationMetadata(
+                elapsed_seconds=round(time.perf_counter() - started, 3),
+                mode=mode,
+                partial=any(not feedback.evaluated for feedback in feedbacks),
+                items=timings
+            )
         )
+
+    async def _grade_short_answers_batch(
+        self,
+        short_answers: List[Tuple[FeedbackItem, GeneratedQuestionModel, str]]
+    ) -> Dict[int, Tuple[dict, str, float]]:
+        """
+        Grade several short answers with a single LLM call.
+        
+        Returns:
+            Outcomes keyed by position in short_answers, for the items the
+            response graded. Empty when the call failed or the response was
+            unusable, so the caller falls back to per-item calls.
+        """
+        started = time.perf_counter()
+        prompt = build_batch_evaluation_prompt([
+            (question.question_text, question.correct_answer, user_answer)
+            for _, question, user_answer in short_answers
+        ])
+        try:
+            response = await asyncio.wait_for(
+                call_llm(
+                    prompt,
+                    timeout=settings.LLM_EVALUATION_BATCH_TIMEOUT_SECONDS,
+                    prompt_type=PROMPT_BATCH_EVALUATION
+                ),
+                timeout=settings.LLM_EVALUATION_BATCH_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Batch grading of {len(short_answers)} answers timed out")
+            return {}
+        except Exception as e:
+            logger.warning(f"Batch grading of {len(short_answers)} answers failed: {e}")
+            return {}
+        
+        verdicts = parse_batch_evaluation_response(response, len(short_answers))
+        if len(verdicts) < len(short_answers):
+            logger.warning(
+                f"Batch grading response covered {len(verdicts)} of {len(short_answers)} answers"
+            )
+        seconds = time.perf_counter() - started
+        return {index: (verdict, "batched", seconds) for index, verdict in verdicts.items()}
+
+    async def _grade_short_answer(
+        self,
+        question: GeneratedQuestionModel,
+        user_answer: str,
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[Optional[dict], str, float]:
+        """
+        Grade one short answer with the LLM.
+        
+        Failures are not raised, so one bad item leaves the rest of the
+        submission graded.
+        
+        Returns:
+            The parsed verdict (None on failure), its status (ok, failed or
+            timeout) and the seconds it took, waiting for a slot included
+        """
+        started = time.perf_counter()
+        prompt = build_evaluation_prompt(
+            question=question.question_text,
+            correct_answer=question.correct_answer,
+            user_answer=user_answer,
+            question_type="short_answer"
+        )
+        try:
+            async with semaphore:
+                response = await asyncio.wait_for(
+                    call_llm(
+                        prompt,
+                        timeout=settings.LLM_EVALUATION_TIMEOUT_SECONDS,
+                        prompt_type=PROMPT_EVALUATION
+                    ),
+                    timeout=settings.LLM_EVALUATION_TIMEOUT_SECONDS
+                )
+            return parse_llm_json_response(response), "ok", time.perf_counter() - started
+        except asyncio.TimeoutError:
+            logger.warning(f"Grading question {question.id} timed out")
+            return None, "timeout", time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Grading question {question.id} failed: {e}")
+            return None, "failed", time.perf_counter() - started
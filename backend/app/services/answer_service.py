@@ -1,10 +1,19 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import logging
 
-from app.models.answer import AnswerModel, CommentModel
+from app.core.config import settings
+from app.models.answer import AnswerModel
 from app.schemas.answer import AnswerCreate, AnswerUpdate, CommentCreate
+from app.utils.db_helpers import build_keyset_filter, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
 
 
 class AnswerService:
@@ -14,6 +23,8 @@ class AnswerService:
 
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.answers
+        self.votes = db.answer_votes
+        self.comments = db.answer_comments
 
     async def create_answer(self, answer_data: AnswerCreate, author_id: str) -> AnswerModel:
         """
@@ -26,8 +37,9 @@ class AnswerService:
         answer_dict["updated_at"] = datetime.utcnow()
         answer_dict["is_deleted"] = False
         answer_dict["is_accepted_solution"] = False
-        answer_dict["votes"] = {"upvoted_by": [], "downvoted_by": [], "score": 0}
+        answer_dict["votes"] = {"up": 0, "down": 0, "score": 0}
         answer_dict["comments"] = []
+        answer_dict["comment_count"] = 0
 
         result = await self.collection.insert_one(answer_dict)
         answer_dict["_id"] = result.inserted_id
@@ -41,7 +53,10 @@ class AnswerService:
         if not ObjectId.is_valid(answer_id):
             return None
 
-        answer = await self.collection.find_one({"_id": ObjectId(answer_id), "is_deleted": False})
+        answer = await self.collection.find_one(
+            {"_id": ObjectId(answer_id), "is_deleted": False},
+            comment_preview()
+        )
         if answer:
             return AnswerModel(**answer)
         return None
@@ -52,9 +67,12 @@ class AnswerService:
         skip: int = 0,
         limit: int = 50,
         sort_by: str = "score"
-    ) -> List[AnswerModel]:
+    ) -> List[dict]:
         """
-        Get answers for a post, sorted by score (most helpful first)
+        Get raw answer documents for a post, sorted by score (most helpful first)
+
+        Only the newest ANSWER_COMMENT_PREVIEW_SIZE comments of each answer are
+        loaded; the rest are paged with get_comments_by_cursor.
         """
         if not ObjectId.is_valid(post_id):
             return []
@@ -63,13 +81,12 @@ class AnswerService:
         cursor = self.collection.find({
             "post_id": ObjectId(post_id),
             "is_deleted": False
-        }).sort([
+        }, comment_preview()).sort([
             ("votes.score", -1),
             ("created_at", -1)
         ]).skip(skip).limit(limit)
 
-        answers = await cursor.to_list(length=limit)
-        return [AnswerModel(**answer) for answer in answers]
+        return await cursor.to_list(length=limit)
 
     async def update_answer(self, answer_id: str, answer_data: AnswerUpdate, user_id: str) -> Optional[AnswerModel]:
         """
@@ -94,6 +111,7 @@ class AnswerService:
         result = await self.collection.find_one_and_update(
             {"_id": ObjectId(answer_id)},
             {"$set": update_dict},
+            projection=comment_preview(),
             return_document=True
         )
 
@@ -115,120 +133,359 @@ class AnswerService:
 
         return result.modified_count > 0
 
-    async def vote_answer(self, answer_id: str, user_id: str, is_upvote: bool) -> Optional[AnswerModel]:
+    async def vote_answer(self, answer_id: str, user_id: str, is_upvote: bool) -> Optional[Tuple[AnswerModel, int]]:
         """
         Vote on an answer (helpful or not helpful)
-        User can only vote once per answer
+        User can only vote once per answer; voting the same way again removes the vote
         Author cannot vote on their own answer
+
+        The vote itself is one document in answer_votes, protected by the
+        unique (answer_id, user_id) index. Each write reports the state it
+        replaced, and the answer's counters are moved by exactly that
+        transition with $inc, so concurrent votes never lose updates.
+        Returns the updated answer and the user's resulting vote (1, -1 or 0).
         """
         if not ObjectId.is_valid(answer_id) or not ObjectId.is_valid(user_id):
             return None
 
+        answer_obj_id = ObjectId(answer_id)
         user_obj_id = ObjectId(user_id)
-        answer = await self.collection.find_one({"_id": ObjectId(answer_id), "is_deleted": False})
 
-        if not answer:
-            return None
-        
+        answer = await self.collection.find_one(
+            {"_id": answer_obj_id, "is_deleted": False},
+            {"author_id": 1}
+        )
         # Prevent author from voting on their own answer
-        if answer.get("author_id") == user_obj_id:
+        if not answer or answer["author_id"] == user_obj_id:
             return None
 
-        upvoted_by = answer.get("votes", {}).get("upvoted_by", [])
-        downvoted_by = answer.get("votes", {}).get("downvoted_by", [])
-
-        # Check if user already voted this way
-        already_upvoted = user_obj_id in upvoted_by
-        already_downvoted = user_obj_id in downvoted_by
-
-        # Remove user from both lists first
-        if user_obj_id in upvoted_by:
-            upvoted_by.remove(user_obj_id)
-        if user_obj_id in downvoted_by:
-            downvoted_by.remove(user_obj_id)
-
-        # Add to appropriate list only if not already voted the same way (toggle behavior)
-        if is_upvote and not already_upvoted:
-            upvoted_by.append(user_obj_id)
-        elif not is_upvote and not already_downvoted:
-            downvoted_by.append(user_obj_id)
-
-        score = len(upvoted_by) - len(downvoted_by)
+        wanted = 1 if is_upvote else -1
+        vote_key = {"answer_id": answer_obj_id, "user_id": user_obj_id}
+
+        # Toggle: voting the same way again removes the vote
+        removed = await self.votes.delete_one({**vote_key, "value": wanted})
+        if removed.deleted_count:
+            previous, current = wanted, 0
+        else:
+            now = datetime.utcnow()
+            upsert = {"$set": {"value": wanted, "updated_at": now}, "$setOnInsert": {"created_at": now}}
+            try:
+                before = await self.votes.find_one_and_update(
+                    vote_key, upsert, upsert=True, return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                # A concurrent first vote by the same user inserted the document; update it instead
+                before = await self.votes.find_one_and_update(
+                    vote_key, upsert, upsert=True, return_document=ReturnDocument.BEFORE
+                )
+            previous, current = (before["value"] if before else 0), wanted
+
+        increments = {
+            "votes.up": (current == 1) - (previous == 1),
+            "votes.down": (current == -1) - (previous == -1),
+            "votes.score": current - previous
+        }
+        update = {"$set": {"updated_at": datetime.utcnow()}}
+        increments = {field: delta for field, delta in increments.items() if delta}
+        if increments:
+            update["$inc"] = increments
 
         result = await self.collection.find_one_and_update(
-            {"_id": ObjectId(answer_id)},
-            {"$set": {
-                "votes.upvoted_by": upvoted_by,
-                "votes.downvoted_by": downvoted_by,
-                "votes.score": score,
-                "updated_at": datetime.utcnow()
-            }},
+            {"_id": answer_obj_id},
+            update,
+            projection=comment_preview(),
             return_document=True
         )
 
         if result:
-            return AnswerModel(**result)
+            return AnswerModel(**result), current
         return None
 
+    async def get_my_votes(self, answer_ids: List[Any], user_id: str) -> Dict[str, int]:
+        """
+        Get one user's votes on a page of answers in a single query
+
+        Returns answer id -> 1 or -1; answers the user has not voted on are absent.
+        """
+        if not answer_ids or not ObjectId.is_valid(user_id):
+            return {}
+
+        cursor = self.votes.find(
+            {"user_id": ObjectId(user_id), "answer_id": {"$in": [ObjectId(answer_id) for answer_id in answer_ids]}},
+            {"answer_id": 1, "value": 1, "_id": 0}
+        )
+        return {str(vote["answer_id"]): vote["value"] async for vote in cursor}
+
     async def add_comment(self, answer_id: str, comment_data: CommentCreate, author_id: str) -> Optional[AnswerModel]:
         """
         Add a comment to an answer
+
+        The comment is pushed onto the embedded thread, or, once the thread has
+        moved to answer_comments, stored there and pushed onto the preview.
+        Crossing ANSWER_COMMENT_EXTERNAL_THRESHOLD moves the thread.
         """
         if not ObjectId.is_valid(answer_id) or not ObjectId.is_valid(author_id):
             return None
 
-        comment = CommentModel(
-            id=ObjectId(),
-            author_id=ObjectId(author_id),
-            content=comment_data.content,
-            created_at=datetime.utcnow()
-        )
+        answer_obj_id = ObjectId(answer_id)
+        now = datetime.utcnow()
+        comment = {
+            "id": ObjectId(),
+            "author_id": ObjectId(author_id),
+            "content": comment_data.content,
+            "created_at": now
+        }
 
         result = await self.collection.find_one_and_update(
-            {"_id": ObjectId(answer_id), "is_deleted": False},
-            {
-                "$push": {"comments": comment.model_dump(by_alias=True)},
-                "$set": {"updated_at": datetime.utcnow()}
-            },
+            {"_id": answer_obj_id, "is_deleted": False, "comments_external": {"$ne": True}},
+            [{"$set": {
+                "comments": {"$concatArrays": [{"$ifNull": ["$comments", []]}, {"$literal": [comment]}]},
+                "comment_count": {"$add": [embedded_comment_count(), 1]},
+                "updated_at": now
+            }}],
+            projection=comment_preview(),
             return_document=True
         )
 
+        if result is None:
+            external = await self.collection.find_one(
+                {"_id": answer_obj_id, "is_deleted": False, "comments_external": True},
+                {"_id": 1}
+            )
+            if not external:
+                return None
+            await self.comments.insert_one(external_comment(answer_obj_id, comment))
+            result = await self.collection.find_one_and_update(
+                {"_id": answer_obj_id},
+                {
+                    "$push": {"comments": {"$each": [comment], "$slice": -settings.ANSWER_COMMENT_PREVIEW_SIZE}},
+                    "$inc": {"comment_count": 1},
+                    "$set": {"updated_at": now}
+                },
+                projection=comment_preview(),
+                return_document=True
+            )
+        elif result.get("comment_count", 0) >= settings.ANSWER_COMMENT_EXTERNAL_THRESHOLD:
+            await self.externalize_comments(answer_obj_id)
+
         if result:
             return AnswerModel(**result)
         return None
 
-    async def delete_comment(self, answer_id: str, comment_id: str, user_id: str) -> Optional[AnswerModel]:
+    async def delete_comment(self, answer_id: str, comment_id: str, user_id: Optional[str] = None) -> Optional[AnswerModel]:
         """
         Delete a comment from an answer (only by comment author)
+
+        Without a user_id (admin moderation) any comment can be deleted.
         """
-        if not ObjectId.is_valid(answer_id) or not ObjectId.is_valid(comment_id) or not ObjectId.is_valid(user_id):
+        if not ObjectId.is_valid(answer_id) or not ObjectId.is_valid(comment_id):
+            return None
+        if user_id is not None and not ObjectId.is_valid(user_id):
             return None
 
-        # First check if the comment belongs to the user
-        answer = await self.collection.find_one({
-            "_id": ObjectId(answer_id),
-            "is_deleted": False,
-            "comments": {
-                "$elemMatch": {
-                    "id": ObjectId(comment_id),
-                    "author_id": ObjectId(user_id)
-                }
-            }
-        })
+        answer_obj_id = ObjectId(answer_id)
+        now = datetime.utcnow()
 
-        if not answer:
-            return None
+        # Comments written before ids were stored as ObjectIds hold strings
+        comment_match = {"id": {"$in": [ObjectId(comment_id), comment_id]}}
+        if user_id is not None:
+            comment_match["author_id"] = {"$in": [ObjectId(user_id), user_id]}
 
-        # Remove the comment
+        # Pipeline form of $pull: comment_match, as an aggregation expression
+        kept = [{"$not": {"$in": ["$$this.id", comment_match["id"]["$in"]]}}]
+        if user_id is not None:
+            kept.append({"$not": {"$in": ["$$this.author_id", comment_match["author_id"]["$in"]]}})
         result = await self.collection.find_one_and_update(
-            {"_id": ObjectId(answer_id)},
             {
-                "$pull": {"comments": {"id": ObjectId(comment_id)}},
-                "$set": {"updated_at": datetime.utcnow()}
+                "_id": answer_obj_id,
+                "is_deleted": False,
+                "comments_external": {"$ne": True},
+                "comments": {"$elemMatch": comment_match}
             },
+            [{"$set": {
+                "comments": {"$filter": {"input": "$comments", "cond": {"$or": kept}}},
+                "comment_count": {"$subtract": [embedded_comment_count(), 1]},
+                "updated_at": now
+            }}],
+            projection=comment_preview(),
             return_document=True
         )
 
+        if result is None:
+            external = await self.collection.find_one(
+                {"_id": answer_obj_id, "is_deleted": False, "comments_external": True},
+                {"_id": 1}
+            )
+            if not external:
+                return None
+
+            comment_filter = {"_id": ObjectId(comment_id), "answer_id": answer_obj_id}
+            if user_id is not None:
+                comment_filter["author_id"] = ObjectId(user_id)
+            removed = await self.comments.delete_one(comment_filter)
+            if not removed.deleted_count:
+                return None
+
+            # Refill the preview from the collection
+            newest = await self.comments.find({"answer_id": answer_obj_id}).sort(
+                [("created_at", -1), ("_id", -1)]
+            ).limit(settings.ANSWER_COMMENT_PREVIEW_SIZE).to_list(length=settings.ANSWER_COMMENT_PREVIEW_SIZE)
+            result = await self.collection.find_one_and_update(
+                {"_id": answer_obj_id},
+                {
+                    "$set": {"comments": [embedded_comment(doc) for doc in reversed(newest)], "updated_at": now},
+                    "$inc": {"comment_count": -1}
+                },
+                return_document=True
+            )
+
         if result:
             return AnswerModel(**result)
         return None
+
+    async def get_comments_by_cursor(
+        self,
+        answer_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Optional[Tuple[List[dict], int, Optional[str], bool]]:
+        """
+        Get a page of an answer's raw comments, newest first, using keyset
+        pagination on (created_at, id)
+
+        Embedded threads are sliced on the server by an aggregation so only
+        the page leaves the database; moved threads are read from the
+        answer_comments index.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+
+        Returns:
+            Tuple of (comments, comment_count, next_cursor, has_more), None if
+            the answer does not exist
+        """
+        if not ObjectId.is_valid(answer_id):
+            return None
+
+        answer_obj_id = ObjectId(answer_id)
+        after = decode_cursor(cursor, "created_at", -1) if cursor else None
+
+        answer = await self.collection.find_one(
+            {"_id": answer_obj_id, "is_deleted": False},
+            {"comment_count": 1, "comments_external": 1}
+        )
+        if not answer:
+            return None
+
+        if answer.get("comments_external"):
+            query = {"answer_id": answer_obj_id}
+            if after:
+                query["$and"] = [build_keyset_filter("created_at", -1, *after)]
+            docs = await self.comments.find(query).sort(
+                [("created_at", -1), ("_id", -1)]
+            ).limit(limit + 1).to_list(length=limit + 1)
+            comments = [embedded_comment(doc) for doc in docs]
+        else:
+            thread = "$comments"
+            if after:
+                last_created_at, last_id = after
+                thread = {"$filter": {"input": "$comments", "cond": {"$or": [
+                    {"$lt": ["$$this.created_at", last_created_at]},
+                    {"$and": [
+                        {"$eq": ["$$this.created_at", last_created_at]},
+                        {"$lt": ["$$this.id", last_id]}
+                    ]}
+                ]}}}
+            # The embedded thread is in posting order; take its tail and reverse it
+            rows = await self.collection.aggregate([
+                {"$match": {"_id": answer_obj_id}},
+                {"$project": {"_id": 0, "comments": {"$slice": [thread, -(limit + 1)]}}}
+            ]).to_list(length=1)
+            comments = list(reversed(rows[0]["comments"])) if rows else []
+
+        has_more = len(comments) > limit
+        comments = comments[:limit]
+        next_cursor = None
+        if has_more:
+            last = comments[-1]
+            next_cursor = encode_cursor({"_id": last["id"], "created_at": last["created_at"]}, "created_at", -1)
+
+        return comments, answer.get("comment_count", 0), next_cursor, has_more
+
+    async def externalize_comments(self, answer_id: ObjectId) -> int:
+        """
+        Move an answer's embedded comment thread to the answer_comments collection
+
+        The answer is flagged first, so comments added meanwhile already go
+        to the collection; then the thread is copied and the embedded array
+        is cut down to the preview. Safe to re-run. Returns the comments moved.
+        """
+        answer = await self.collection.find_one_and_update(
+            {"_id": answer_id, "comments_external": {"$ne": True}},
+            [{"$set": {"comments_external": True, "comment_count": embedded_comment_count()}}],
+            projection={"comments": 1},
+            return_document=True
+        )
+        if not answer:
+            return 0
+
+        docs = [external_comment(answer_id, comment) for comment in answer.get("comments", [])]
+        moved = 0
+        if docs:
+            try:
+                result = await self.comments.insert_many(docs, ordered=False)
+                moved = len(result.inserted_ids)
+            except BulkWriteError as e:
+                # Comments copied by an interrupted earlier run
+                if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                    raise
+                moved = e.details["nInserted"]
+
+        await self.collection.update_one(
+            {"_id": answer_id},
+            {"$push": {"comments": {"$each": [], "$slice": -settings.ANSWER_COMMENT_PREVIEW_SIZE}}}
+        )
+        logger.info("Moved %d comments of answer %s to answer_comments", moved, answer_id)
+        return moved
+
+
+def embedded_comment_count() -> dict:
+    """
+    Expression for the comment count of an answer whose thread is still embedded
+
+    Answers written before comment_count existed only have the array, so an
+    $inc would start their count from zero.
+    """
+    return {"$ifNull": ["$comment_count", {"$size": {"$ifNull": ["$comments", []]}}]}
+
+
+def comment_preview() -> dict:
+    """
+    Projection keeping only the newest comments of an answer
+    """
+    return {"comments": {"$slice": -settings.ANSWER_COMMENT_PREVIEW_SIZE}}
+
+
+def external_comment(answer_id: ObjectId, comment: dict) -> dict:
+    """
+    Build an answer_comments document from an embedded comment
+    """
+    return {
+        "_id": ObjectId(comment["id"]),
+        "answer_id": answer_id,
+        "author_id": ObjectId(comment["author_id"]),
+        "content": comment["content"],
+        "created_at": comment["created_at"]
+    }
+
+
+def embedded_comment(doc: dict) -> dict:
+    """
+    Build the embedded comment shape from an answer_comments document
+    """
+    return {
+        "id": doc["_id"],
+        "author_id": doc["author_id"],
+        "content": doc["content"],
+        "created_at": doc["created_at"]
+    }
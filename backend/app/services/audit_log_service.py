@@ -4,6 +4,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 
 from app.models.audit_log import AuditLogModel, AuditAction
+from app.utils.db_helpers import paginate
 
 
 class AuditLogService:
@@ -80,12 +81,8 @@ class AuditLogService:
                 date_query["$lte"] = end_date
             query["created_at"] = date_query
 
-        # Get total count
-        total = await self.collection.count_documents(query)
-
-        # Get logs with pagination, sorted by most recent first
-        cursor = self.collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-        logs = await cursor.to_list(length=limit)
+        # Get logs with pagination, sorted by most recent first, and the total count
+        logs, total, _ = await paginate(self.collection, query, skip, limit, sort=[("created_at", -1)])
 
         return [AuditLogModel(**log) for log in logs], total
 
@@ -5,43 +5,65 @@ This module provides the LLM integration for analyzing lectures and generating
 assessment questions based on learner profiles.
 """
 
+import hashlib
 import json
-from typing import Optional
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import re
+from typing import Dict, List, Optional, Tuple
 
-# Load environment variables from .env file
-load_dotenv()
+from app.core.llm_cache import llm_response_cache
+from app.core.llm_client import llm_client
 
 
 # =============================================================================
-# LLM Call Function (User should replace with actual implementation)
+# LLM Call Function
 # =============================================================================
 
-async def call_llm(prompt: str) -> str:
+async def call_llm(
+    prompt: str,
+    timeout: Optional[float] = None,
+    prompt_type: Optional[str] = None
+) -> str:
     """
     Call the LLM with a prompt and return the response.
     
+    Uses the worker's shared async client (see app.core.llm_client), so
+    waiting for the provider does not block other requests. Prompts of a
+    known type are answered through the response cache (see
+    app.core.llm_cache), keyed by the version of that type's templates.
+    
     Args:
         prompt: The input prompt to send to the LLM
+        timeout: Seconds to wait for this call, LLM_TIMEOUT_SECONDS by default
+        prompt_type: One of PROMPT_TEMPLATES, None to bypass the cache
         
     Returns:
         The LLM response as a string
     """
-    client = OpenAI(
-        base_url="https://ai.megallm.io/v1",
-        api_key=os.environ.get("MEGALLM_API_KEY")
+    if prompt_type is None:
+        return await llm_client.complete(prompt, timeout=timeout)
+    return await llm_response_cache.get_or_call(
+        prompt_type,
+        TEMPLATE_VERSIONS[prompt_type],
+        prompt,
+        lambda: llm_client.complete(prompt, timeout=timeout),
+        cacheable=has_json_object
     )
 
-    response = client.chat.completions.create(
-        model=os.environ.get("LLM_MODEL", "gpt-3.5-turbo"),
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
-    return response.choices[0].message.content
+
+def has_json_object(response: str) -> bool:
+    """
+    Check whether a response holds a JSON object, so garbled completions
+    that would end in the mock fallback are not cached
+    """
+    start_idx = response.find('{')
+    end_idx = response.rfind('}')
+    if start_idx == -1 or end_idx < start_idx:
+        return False
+    json_str = re.sub(r',\s*([}\]])', r'\1', response[start_idx:end_idx + 1])
+    try:
+        return isinstance(json.loads(json_str), dict)
+    except json.JSONDecodeError:
+        return False
 
 
 # =============================================================================
@@ -53,8 +75,6 @@ async def call_llm(prompt: str) -> str:
 # Language Detection
 # =============================================================================
 
-import re
-
 def detect_language(text: str) -> str:
     """
     Detect if text is primarily Vietnamese or should default to Japanese.
@@ -172,6 +192,31 @@ Hãy đánh giá và trả về JSON (Kết quả bằng TIẾNG VIỆT):
 Chỉ trả về JSON, không có text giải thích thêm."""
 
 
+BATCH_EVALUATION_PROMPT_TEMPLATE_VI = """Đánh giá các câu trả lời tự luận ngắn của học viên dưới đây.
+
+{items}
+
+Hãy đánh giá từng câu một cách độc lập và trả về JSON (Kết quả bằng TIẾNG VIỆT):
+{{
+    "results": [
+        {{
+            "index": số thứ tự của câu,
+            "is_correct": true hoặc false,
+            "feedback": "Giải thích ngắn gọn tại sao đúng/sai và gợi ý cải thiện nếu sai (Bằng tiếng Việt)"
+        }}
+    ]
+}}
+
+Mảng "results" phải có đúng {count} phần tử, mỗi câu một phần tử.
+Chỉ trả về JSON, không có text giải thích thêm."""
+
+
+BATCH_EVALUATION_ITEM_TEMPLATE_VI = """### Câu {index}
+**Câu hỏi:** {question}
+**Đáp án đúng:** {correct_answer}
+**Câu trả lời của học viên:** {user_answer}"""
+
+
 # =============================================================================
 # Prompt Templates - Japanese (Default for all non-Vietnamese languages)
 # =============================================================================
@@ -248,6 +293,31 @@ EVALUATION_PROMPT_TEMPLATE_JA = """学習者の回答を評価してください
 JSONのみを返してください。追加の説明テキストは不要です。"""
 
 
+BATCH_EVALUATION_PROMPT_TEMPLATE_JA = """以下の学習者の短答式の回答を評価してください。
+
+{items}
+
+各回答をそれぞれ独立して評価し、以下のJSONを返してください（結果は日本語で）:
+{{
+    "results": [
+        {{
+            "index": 問題番号,
+            "is_correct": true または false,
+            "feedback": "なぜ正解/不正解かを簡潔に説明し、不正解の場合は改善のヒントを提供してください（日本語）"
+        }}
+    ]
+}}
+
+"results" 配列には各問題につき1つ、ちょうど {count} 個の要素を含めてください。
+JSONのみを返してください。追加の説明テキストは不要です。"""
+
+
+BATCH_EVALUATION_ITEM_TEMPLATE_JA = """### 問題 {index}
+**質問:** {question}
+**正解:** {correct_answer}
+**学習者の回答:** {user_answer}"""
+
+
 # =============================================================================
 # Backward compatibility - use Vietnamese as default
 # =============================================================================
@@ -257,6 +327,33 @@ QUESTION_GENERATION_PROMPT_TEMPLATE = QUESTION_GENERATION_PROMPT_TEMPLATE_VI
 EVALUATION_PROMPT_TEMPLATE = EVALUATION_PROMPT_TEMPLATE_VI
 
 
+# =============================================================================
+# Prompt Types
+# =============================================================================
+
+PROMPT_DIAGNOSIS = "diagnosis"
+PROMPT_QUESTIONS = "questions"
+PROMPT_EVALUATION = "evaluation"
+PROMPT_BATCH_EVALUATION = "batch_evaluation"
+
+PROMPT_TEMPLATES = {
+    PROMPT_DIAGNOSIS: (DIAGNOSIS_PROMPT_TEMPLATE_VI, DIAGNOSIS_PROMPT_TEMPLATE_JA),
+    PROMPT_QUESTIONS: (QUESTION_GENERATION_PROMPT_TEMPLATE_VI, QUESTION_GENERATION_PROMPT_TEMPLATE_JA),
+    PROMPT_EVALUATION: (EVALUATION_PROMPT_TEMPLATE_VI, EVALUATION_PROMPT_TEMPLATE_JA),
+    PROMPT_BATCH_EVALUATION: (
+        BATCH_EVALUATION_PROMPT_TEMPLATE_VI, BATCH_EVALUATION_ITEM_TEMPLATE_VI,
+        BATCH_EVALUATION_PROMPT_TEMPLATE_JA, BATCH_EVALUATION_ITEM_TEMPLATE_JA
+    ),
+}
+
+# Editing a template changes its version, so cached responses to the old
+# wording are never served for the new one
+TEMPLATE_VERSIONS = {
+    prompt_type: hashlib.sha256("\x00".join(templates).encode("utf-8")).hexdigest()[:16]
+    for prompt_type, templates in PROMPT_TEMPLATES.items()
+}
+
+
 # =============================================================================
 # Helper Functions
 # =============================================================================
@@ -337,6 +434,67 @@ def build_evaluation_prompt(
         )
 
 
+def build_batch_evaluation_prompt(items: List[Tuple[str, str, str]]) -> str:
+    """
+    Build one prompt grading several short answers.
+    
+    Args:
+        items: (question, correct_answer, user_answer) per short answer;
+            the response refers to them by their 1-based position
+    """
+    language = detect_language(items[0][0])
+    if language == 'ja':
+        template, item_template = BATCH_EVALUATION_PROMPT_TEMPLATE_JA, BATCH_EVALUATION_ITEM_TEMPLATE_JA
+    else:
+        template, item_template = BATCH_EVALUATION_PROMPT_TEMPLATE_VI, BATCH_EVALUATION_ITEM_TEMPLATE_VI
+    
+    rendered = "\n\n".join(
+        item_template.format(
+            index=index,
+            question=question,
+            correct_answer=correct_answer,
+            user_answer=user_answer
+        )
+        for index, (question, correct_answer, user_answer) in enumerate(items, start=1)
+    )
+    return template.format(items=rendered, count=len(items))
+
+
+def parse_batch_evaluation_response(response: str, count: int) -> Dict[int, dict]:
+    """
+    Parse the per-question verdicts of a batch evaluation response.
+    
+    Args:
+        response: The raw LLM response string
+        count: Number of items in the prompt
+        
+    Returns:
+        Verdicts ({"is_correct", "feedback"}) keyed by 0-based item position.
+        Items the response left out or garbled are missing, an unusable
+        response gives an empty dict.
+    """
+    parsed = parse_llm_json_response(response)
+    results = parsed.get("results") if isinstance(parsed, dict) else None
+    if not isinstance(results, list):
+        return {}
+    
+    verdicts = {}
+    for position, result in enumerate(results, start=1):
+        if not isinstance(result, dict) or not isinstance(result.get("is_correct"), bool):
+            continue
+        index = result.get("index", position)
+        try:
+            index = int(index) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and index not in verdicts:
+            verdicts[index] = {
+                "is_correct": result["is_correct"],
+                "feedback": str(result.get("feedback") or "")
+            }
+    return verdicts
+
+
 def parse_llm_json_response(response: str) -> dict:
     """
     Parse JSON from LLM response, handling potential formatting issues.
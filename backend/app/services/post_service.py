@@ -1,10 +1,21 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClientSession
 from bson import ObjectId
 
 from app.models.post import PostModel
 from app.schemas.post import PostCreate, PostUpdate
+from app.core.config import settings
+from app.core.feed_cache import feed_cache
+from app.core.hot_ranking import hot_ranking
+from app.core.view_counter import view_counter
+from app.utils.db_helpers import encode_cursor, decode_cursor, build_keyset_filter, paginate
+from app.search import post_search, related_posts
+from app.services.post_summary_service import PostSummaryService
+
+
+# Fields deciding which cached feed pages a post can appear on
+FEED_KEY_PROJECTION = {"category": 1, "tag_ids": 1}
 
 
 class PostService:
@@ -15,13 +26,25 @@ class PostService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.posts
 
-    async def create_post(self, post_data: PostCreate, author_id: str) -> PostModel:
+    async def create_post(
+        self,
+        post_data: PostCreate,
+        author_id: str,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> PostModel:
         """
         Create a new post
         """
         post_dict = post_data.model_dump()
         post_dict["author_id"] = ObjectId(author_id)
         post_dict["tag_ids"] = [ObjectId(tag_id) for tag_id in post_data.tag_ids] if post_data.tag_ids else []
+
+        # Embed author and tag display data so listings need no lookups
+        summaries = PostSummaryService(self.collection.database)
+        author = await summaries.get_author_summary(post_dict["author_id"])
+        if author:
+            post_dict["author"] = author
+        post_dict["tags"] = await summaries.get_tag_summaries(post_dict["tag_ids"])
         
         # Ensure created_at is set properly for sorting
         now = datetime.utcnow()
@@ -33,123 +56,117 @@ class PostService:
 
         print(f"[DEBUG] Creating post with created_at: {now}, title: {post_dict.get('title')}")
         
-        result = await self.collection.insert_one(post_dict)
+        result = await self.collection.insert_one(post_dict, session=session)
         post_dict["_id"] = result.inserted_id
         
         print(f"[DEBUG] Post created with ID: {result.inserted_id}")
 
+        await post_search.index_post(self.collection.database, post_dict)
+        related_posts.update_post(post_dict)
+        feed_cache.invalidate_post(post_dict)
+
         return PostModel(**post_dict)
 
     async def get_post_by_id(self, post_id: str) -> Optional[PostModel]:
         """
-        Get post by ID and increment view count
+        Get post by ID
         """
         if not ObjectId.is_valid(post_id):
             return None
 
-        # Increment view count
-        await self.collection.update_one(
-            {"_id": ObjectId(post_id), "is_deleted": False},
-            {"$inc": {"view_count": 1}}
-        )
-
         post = await self.collection.find_one({"_id": ObjectId(post_id), "is_deleted": False})
         if post:
             return PostModel(**post)
         return None
 
-    async def count_posts(
+    async def view_post(self, post_id: str) -> Optional[dict]:
+        """
+        Get the raw post document by ID for its detail page and count a view
+
+        The view is buffered by the write-behind view counter; the returned
+        view_count already includes this worker's unflushed views.
+        """
+        if not ObjectId.is_valid(post_id):
+            return None
+
+        post = await self.collection.find_one({"_id": ObjectId(post_id), "is_deleted": False})
+        if post:
+            view_counter.record(post["_id"])
+            post["view_count"] = post.get("view_count", 0) + view_counter.pending(post["_id"])
+            return post
+        return None
+
+    async def get_posts_by_ids(self, post_ids: List[str], projection: Optional[dict] = None) -> List[dict]:
+        """
+        Get several posts with one query, in the order of post_ids
+
+        Returns raw documents (only the projected fields when a projection is
+        given); invalid, missing and deleted posts are skipped. Never counts views.
+        """
+        object_ids = list(dict.fromkeys(
+            ObjectId(str(post_id)) for post_id in post_ids if ObjectId.is_valid(str(post_id))
+        ))
+        if not object_ids:
+            return []
+
+        cursor = self.collection.find({"_id": {"$in": object_ids}, "is_deleted": False}, projection)
+        posts = {post["_id"]: post async for post in cursor}
+        return [posts[post_id] for post_id in object_ids if post_id in posts]
+
+    def _build_query(
         self,
         author_id: Optional[str] = None,
         tag_ids: Optional[List[str]] = None,
         category: Optional[str] = None,
         search: Optional[str] = None,
-        db = None
-    ) -> int:
+        search_ids: Optional[List[str]] = None
+    ) -> dict:
         """
-        Count total posts with filters, including search by author name
+        Build the find() filter for the post list
+
+        A search matches title, content and the embedded author and tag
+        names. When the search index already resolved the search into post
+        ids, those ids replace the regex match.
         """
-        if search and db:
-            # Use aggregation to search by author name and tag names
-            pipeline = [
-                {"$match": {"is_deleted": False}},
-                # Join with users collection
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "author_id",
-                        "foreignField": "_id",
-                        "as": "author_info"
-                    }
-                },
-                {"$unwind": {"path": "$author_info", "preserveNullAndEmptyArrays": True}},
-                # Join with tags collection
-                {
-                    "$lookup": {
-                        "from": "tags",
-                        "localField": "tag_ids",
-                        "foreignField": "_id",
-                        "as": "tag_info"
-                    }
-                },
-                # Unwind tags so we can search within tag names
-                {"$unwind": {"path": "$tag_info", "preserveNullAndEmptyArrays": True}}
-            ]
-            
-            # Build match conditions
-            match_conditions = []
-            
-            if author_id and ObjectId.is_valid(author_id):
-                match_conditions.append({"author_id": ObjectId(author_id)})
-            
-            if tag_ids:
-                valid_tag_ids = [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(tag_id)]
-                if valid_tag_ids:
-                    match_conditions.append({"tag_ids": {"$in": valid_tag_ids}})
-            
-            if category:
-                match_conditions.append({"category": category})
-            
-            # Search in title, content, author name, and tag names
-            search_conditions = [
+        query = {"is_deleted": False}
+
+        if search_ids is not None:
+            query["_id"] = {"$in": [ObjectId(post_id) for post_id in search_ids]}
+            search = None
+
+        if author_id and ObjectId.is_valid(author_id):
+            query["author_id"] = ObjectId(author_id)
+
+        if tag_ids:
+            query["tag_ids"] = {"$in": [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(tag_id)]}
+
+        if category:
+            query["category"] = category
+
+        if search:
+            query["$or"] = [
                 {"title": {"$regex": search, "$options": "i"}},
                 {"content": {"$regex": search, "$options": "i"}},
-                {"author_info.name": {"$regex": search, "$options": "i"}},
-                {"tag_info.name": {"$regex": search, "$options": "i"}}
+                {"author.name": {"$regex": search, "$options": "i"}},
+                {"tags.name": {"$regex": search, "$options": "i"}}
             ]
-            match_conditions.append({"$or": search_conditions})
-            
-            if match_conditions:
-                pipeline.append({"$match": {"$and": match_conditions}})
-            
-            # Count - need to group back after unwinding tags to avoid duplicate counts
-            pipeline.append({"$group": {"_id": "$_id", "doc": {"$first": "$$ROOT"}}})
-            pipeline.append({"$replaceRoot": {"newRoot": "$doc"}})
-            pipeline.append({"$count": "total"})
-            
-            result = await self.collection.aggregate(pipeline).to_list(length=1)
-            return result[0]["total"] if result else 0
-        else:
-            # Original simple query without author name search
-            query = {"is_deleted": False}
-
-            if author_id and ObjectId.is_valid(author_id):
-                query["author_id"] = ObjectId(author_id)
-
-            if tag_ids:
-                query["tag_ids"] = {"$in": [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(tag_id)]}
-
-            if category:
-                query["category"] = category
-
-            if search:
-                query["$or"] = [
-                    {"title": {"$regex": search, "$options": "i"}},
-                    {"content": {"$regex": search, "$options": "i"}}
-                ]
-
-            count = await self.collection.count_documents(query)
-            return count
+
+        return query
+
+    async def count_posts(
+        self,
+        author_id: Optional[str] = None,
+        tag_ids: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        search: Optional[str] = None,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> int:
+        """
+        Count total posts with filters, including search by author and tag name
+        """
+        search_ids = post_search.search(search, author_id, tag_ids, category) if search else None
+        query = self._build_query(author_id, tag_ids, category, search, search_ids)
+        return await self.collection.count_documents(query, session=session)
 
     async def get_posts(
         self,
@@ -161,112 +178,113 @@ class PostService:
         sort_by: str = "created_at",
         sort_order: int = -1,
         search: Optional[str] = None,
-        db = None
-    ) -> List[PostModel]:
+        count_limit: Optional[int] = None,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> Tuple[List[dict], int, bool]:
         """
-        Get list of posts with filters and sorting, including search by author name
+        Get a page of raw post documents with filters and sorting, including search by author and tag name
+
+        The page and the total come back from a single aggregation. With
+        count_limit, counting stops after that many matches and the total is
+        reported as a lower bound.
+
+        With a search, sort_by="relevance" orders by BM25 score from the search
+        index; sort_by="hot" orders by the materialized hot ranking. Both
+        fall back to created_at while their index is not ready.
+
+        Returns:
+            Tuple of (posts, total, total_is_lower_bound)
         """
-        if search and db:
-            # Use aggregation to search by author name and tag names
-            pipeline = [
-                {"$match": {"is_deleted": False}},
-                # Join with users collection
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "author_id",
-                        "foreignField": "_id",
-                        "as": "author_info"
-                    }
-                },
-                {"$unwind": {"path": "$author_info", "preserveNullAndEmptyArrays": True}},
-                # Join with tags collection
-                {
-                    "$lookup": {
-                        "from": "tags",
-                        "localField": "tag_ids",
-                        "foreignField": "_id",
-                        "as": "tag_info"
-                    }
-                },
-                # Unwind tags so we can search within tag names
-                {"$unwind": {"path": "$tag_info", "preserveNullAndEmptyArrays": True}}
-            ]
-            
-            # Build match conditions
-            match_conditions = []
-            
-            if author_id and ObjectId.is_valid(author_id):
-                match_conditions.append({"author_id": ObjectId(author_id)})
-            
-            if tag_ids:
-                valid_tag_ids = [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(tag_id)]
-                if valid_tag_ids:
-                    match_conditions.append({"tag_ids": {"$in": valid_tag_ids}})
-            
-            if category:
-                match_conditions.append({"category": category})
-            
-            # Search in title, content, author name, and tag names
-            search_conditions = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"content": {"$regex": search, "$options": "i"}},
-                {"author_info.name": {"$regex": search, "$options": "i"}},
-                {"tag_info.name": {"$regex": search, "$options": "i"}}
-            ]
-            match_conditions.append({"$or": search_conditions})
-            
-            if match_conditions:
-                pipeline.append({"$match": {"$and": match_conditions}})
-            
-            # Group back posts that were unwound for tag searching to avoid duplicates
-            pipeline.append({"$group": {"_id": "$_id", "doc": {"$first": "$$ROOT"}}})
-            pipeline.append({"$replaceRoot": {"newRoot": "$doc"}})
-            
-            # Sort, skip, limit
-            pipeline.append({"$sort": {sort_by: sort_order}})
-            pipeline.append({"$skip": skip})
-            pipeline.append({"$limit": limit})
-            
-            # Remove the author_info and tag_info fields we added for search
-            pipeline.append({"$project": {"author_info": 0, "tag_info": 0}})
-            
-            posts = await self.collection.aggregate(pipeline).to_list(length=limit)
-            
-            print(f"[DEBUG] get_posts (with author search) found {len(posts)} posts")
-            
-            return [PostModel(**post) for post in posts]
-        else:
-            # Original simple query without author name search
-            query = {"is_deleted": False}
-
-            if author_id and ObjectId.is_valid(author_id):
-                query["author_id"] = ObjectId(author_id)
-
-            if tag_ids:
-                query["tag_ids"] = {"$in": [ObjectId(tag_id) for tag_id in tag_ids if ObjectId.is_valid(tag_id)]}
-
-            if category:
-                query["category"] = category
-
-            if search:
-                query["$or"] = [
-                    {"title": {"$regex": search, "$options": "i"}},
-                    {"content": {"$regex": search, "$options": "i"}}
-                ]
-
-            print(f"[DEBUG] get_posts query: {query}, sort_by: {sort_by}, sort_order: {sort_order}, skip: {skip}, limit: {limit}")
-            
-            cursor = self.collection.find(query).sort(sort_by, sort_order).skip(skip).limit(limit)
-            posts = await cursor.to_list(length=limit)
-            
-            print(f"[DEBUG] Found {len(posts)} posts")
-            for i, post in enumerate(posts[:5]):  # Show first 5 posts
-                print(f"  [{i}] Title: {post.get('title', 'No title')[:50]}, created_at: {post.get('created_at')}, is_deleted: {post.get('is_deleted', 'N/A')}")
-
-            return [PostModel(**post) for post in posts]
-
-    async def update_post(self, post_id: str, post_data: PostUpdate, user_id: str) -> Optional[PostModel]:
+        search_ids = post_search.search(search, author_id, tag_ids, category) if search else None
+
+        if sort_by == "hot":
+            ranked = hot_ranking.page(skip, limit, author_id, tag_ids, category, search_ids)
+            if ranked is not None and (search is None or search_ids is not None):
+                page_ids, total = ranked
+                return await self._get_ranked_page(page_ids, session), total, False
+            sort_by = "created_at"
+
+        if sort_by == "relevance":
+            if search_ids is not None:
+                # The index already applied every filter, so its hit list is the total
+                page_ids = search_ids[skip:skip + limit]
+                total_is_lower_bound = len(search_ids) >= settings.SEARCH_MAX_RESULTS
+                return await self._get_ranked_page(page_ids, session), len(search_ids), total_is_lower_bound
+            sort_by = "created_at"
+
+        query = self._build_query(author_id, tag_ids, category, search, search_ids)
+        posts, total, total_is_lower_bound = await paginate(
+            self.collection, query, skip, limit,
+            sort=[(sort_by, sort_order)],
+            count_limit=count_limit,
+            session=session
+        )
+        return posts, total, total_is_lower_bound
+
+    async def _get_ranked_page(
+        self,
+        page_ids: List[str],
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> List[dict]:
+        """
+        Fetch a page of posts ranked elsewhere (search index, hot ranking), keeping its order
+        """
+        query = self._build_query(search_ids=page_ids)
+        docs = await self.collection.find(query, session=session).to_list(length=len(page_ids))
+        rank = {post_id: index for index, post_id in enumerate(page_ids)}
+        docs.sort(key=lambda doc: rank[str(doc["_id"])])
+        return docs
+
+    async def get_posts_by_cursor(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        author_id: Optional[str] = None,
+        tag_ids: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        sort_by: str = "created_at",
+        sort_order: int = -1,
+        search: Optional[str] = None,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> Tuple[List[dict], Optional[str], bool]:
+        """
+        Get a page of raw post documents using keyset pagination on (sort_by, _id)
+
+        Each page seeks directly past the previous page's last post instead of
+        skipping over every earlier post, so deep pages cost the same as the
+        first one. One extra post is fetched to tell whether more remain.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or was issued for a
+                different sort
+
+        Returns:
+            Tuple of (posts, next_cursor, has_more)
+        """
+        search_ids = post_search.search(search, author_id, tag_ids, category) if search else None
+        query = self._build_query(author_id, tag_ids, category, search, search_ids)
+
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, sort_by, sort_order)
+            query["$and"] = [build_keyset_filter(sort_by, sort_order, last_value, last_id)]
+
+        sort_spec = [(sort_by, sort_order), ("_id", sort_order)]
+        find_cursor = self.collection.find(query, session=session).sort(sort_spec).limit(limit + 1)
+        docs = await find_cursor.to_list(length=limit + 1)
+
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_by, sort_order) if has_more else None
+
+        return docs, next_cursor, has_more
+
+    async def update_post(
+        self,
+        post_id: str,
+        post_data: PostUpdate,
+        user_id: str,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> Optional[PostModel]:
         """
         Update post (only by author)
         """
@@ -278,41 +296,62 @@ class PostService:
             "_id": ObjectId(post_id),
             "author_id": ObjectId(user_id),
             "is_deleted": False
-        })
+        }, session=session)
 
         if not post:
             return None
 
         update_dict = {k: v for k, v in post_data.model_dump().items() if v is not None}
 
-        if "tag_ids" in update_dict and update_dict["tag_ids"]:
+        if "tag_ids" in update_dict:
             update_dict["tag_ids"] = [ObjectId(tag_id) for tag_id in update_dict["tag_ids"]]
+            update_dict["tags"] = await PostSummaryService(self.collection.database).get_tag_summaries(
+                update_dict["tag_ids"]
+            )
 
         update_dict["updated_at"] = datetime.utcnow()
 
         result = await self.collection.find_one_and_update(
             {"_id": ObjectId(post_id)},
             {"$set": update_dict},
-            return_document=True
+            return_document=True,
+            session=session
         )
 
         if result:
+            await post_search.index_post(self.collection.database, result)
+            related_posts.update_post(result)
+            # The post may have moved between categories or tags
+            feed_cache.invalidate_post(post)
+            feed_cache.invalidate_post(result)
             return PostModel(**result)
         return None
 
-    async def delete_post(self, post_id: str, user_id: str) -> bool:
+    async def delete_post(
+        self,
+        post_id: str,
+        user_id: str,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> bool:
         """
         Soft delete post (only by author)
         """
         if not ObjectId.is_valid(post_id):
             return False
 
-        result = await self.collection.update_one(
+        result = await self.collection.find_one_and_update(
             {"_id": ObjectId(post_id), "author_id": ObjectId(user_id), "is_deleted": False},
-            {"$set": {"is_deleted": True, "updated_at": datetime.utcnow()}}
+            {"$set": {"is_deleted": True, "updated_at": datetime.utcnow()}},
+            projection=FEED_KEY_PROJECTION,
+            session=session
         )
 
-        return result.modified_count > 0
+        if result:
+            post_search.remove_post(post_id)
+            related_posts.remove_post(post_id)
+            feed_cache.invalidate_post(result)
+            return True
+        return False
 
     async def increment_answer_count(self, post_id: str) -> bool:
         """
@@ -321,12 +360,15 @@ class PostService:
         if not ObjectId.is_valid(post_id):
             return False
 
-        result = await self.collection.update_one(
+        result = await self.collection.find_one_and_update(
             {"_id": ObjectId(post_id)},
-            {"$inc": {"answer_count": 1}}
+            {"$inc": {"answer_count": 1}},
+            projection=FEED_KEY_PROJECTION
         )
 
-        return result.modified_count > 0
+        if result:
+            feed_cache.invalidate_post(result)
+        return result is not None
 
     async def delete_post_by_admin(self, post_id: str) -> Optional[PostModel]:
         """
@@ -347,6 +389,9 @@ class PostService:
         )
 
         if result:
+            post_search.remove_post(post_id)
+            related_posts.remove_post(post_id)
+            feed_cache.invalidate_post(result)
             return PostModel(**result)
         return None
 
@@ -358,9 +403,12 @@ class PostService:
         if not ObjectId.is_valid(post_id):
             return False
 
-        result = await self.collection.update_one(
+        result = await self.collection.find_one_and_update(
             {"_id": ObjectId(post_id)},
-            {"$inc": {"answer_count": -1}}
+            {"$inc": {"answer_count": -1}},
+            projection=FEED_KEY_PROJECTION
         )
 
-        return result.modified_count > 0
+        if result:
+            feed_cache.invalidate_post(result)
+        return result is not None
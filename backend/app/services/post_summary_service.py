@@ -0,0 +1,185 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.feed_cache import feed_cache
+from app.search import post_search
+from app.search.posts import POST_PROJECTION
+
+logger = logging.getLogger(__name__)
+
+# Posts updated per bulk_write during backfills and search re-indexing
+BATCH_SIZE = 500
+
+AUTHOR_SUMMARY_FIELDS = ("name", "avatar_url")
+TAG_SUMMARY_FIELDS = ("name",)
+
+
+def build_author_summary(user: dict) -> dict:
+    """
+    Build the author summary embedded on posts from a user document
+    """
+    return {
+        "_id": user["_id"],
+        "name": user.get("name", ""),
+        "avatar_url": user.get("avatar_url")
+    }
+
+
+def build_tag_summaries(tag_ids: List[ObjectId], tags: Dict[ObjectId, dict]) -> List[dict]:
+    """
+    Build the tag summaries embedded on posts, in the post's tag_ids order
+    """
+    return [
+        {"_id": tag_id, "name": tags[tag_id].get("name", "")}
+        for tag_id in tag_ids
+        if tag_id in tags
+    ]
+
+
+class PostSummaryService:
+    """
+    Keeps the author and tag summaries embedded on posts in sync
+
+    Posts carry ``author`` ({_id, name, avatar_url}) and ``tags``
+    ([{_id, name}]) so feed pages need no per-post user/tag lookups. The
+    summaries are written with the post and fanned out to every post when
+    a user or tag changes the embedded fields. A fan-out leaves
+    ``updated_at`` alone (it is not an edit of the post) and stamps
+    ``summary_updated_at`` instead, which the search index catch-up of
+    every worker watches.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.posts
+
+    async def get_author_summary(self, author_id: ObjectId) -> Optional[dict]:
+        """
+        Get the summary of one author
+        """
+        user = await self.db.users.find_one({"_id": author_id}, {"name": 1, "avatar_url": 1})
+        return build_author_summary(user) if user else None
+
+    async def get_tag_summaries(self, tag_ids: List[ObjectId]) -> List[dict]:
+        """
+        Get summaries of the given tags, in the given order
+        """
+        if not tag_ids:
+            return []
+        tags = {}
+        async for tag in self.db.tags.find({"_id": {"$in": tag_ids}}, {"name": 1}):
+            tags[tag["_id"]] = tag
+        return build_tag_summaries(tag_ids, tags)
+
+    async def fan_out_author(self, user_id: str) -> int:
+        """
+        Copy a user's current name and avatar onto all of their posts
+
+        Returns the number of posts modified.
+        """
+        user = await self.db.users.find_one({"_id": ObjectId(user_id)}, {"name": 1, "avatar_url": 1})
+        if not user:
+            return 0
+
+        result = await self.collection.update_many(
+            {"author_id": user["_id"]},
+            {"$set": {"author": build_author_summary(user), "summary_updated_at": datetime.utcnow()}}
+        )
+        feed_cache.invalidate()
+        await self._reindex({"author_id": user["_id"], "is_deleted": False})
+        logger.info(f"Fanned out author {user_id} to {result.modified_count} posts")
+        return result.modified_count
+
+    async def fan_out_tag(self, tag_id: str) -> int:
+        """
+        Copy a tag's current name onto every post carrying it
+
+        Returns the number of posts modified.
+        """
+        tag = await self.db.tags.find_one({"_id": ObjectId(tag_id)}, {"name": 1})
+        if not tag:
+            return 0
+
+        # Posts not backfilled yet have no tags array to update, backfill() covers them
+        query = {"tag_ids": tag["_id"], "tags._id": tag["_id"]}
+        result = await self.collection.update_many(
+            query,
+            {"$set": {"tags.$[tag].name": tag.get("name", ""), "summary_updated_at": datetime.utcnow()}},
+            array_filters=[{"tag._id": tag["_id"]}]
+        )
+        feed_cache.invalidate()
+        await self._reindex({**query, "is_deleted": False})
+        logger.info(f"Fanned out tag {tag_id} to {result.modified_count} posts")
+        return result.modified_count
+
+    async def backfill(self, only_missing: bool = True, batch_size: int = BATCH_SIZE) -> int:
+        """
+        Embed author and tag summaries on existing posts
+
+        Walks the posts in _id order and writes one bulk_write per batch,
+        resolving the batch's authors and tags with one query each.
+        With only_missing, posts that already carry an author summary are
+        skipped, so an interrupted run can simply be restarted.
+
+        Returns the number of posts modified.
+        """
+        query = {"author": {"$exists": False}} if only_missing else {}
+        projection = {"author_id": 1, "tag_ids": 1}
+        modified = 0
+        last_id = None
+
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query["_id"] = {"$gt": last_id}
+            posts = await self.collection.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not posts:
+                break
+            last_id = posts[-1]["_id"]
+
+            author_ids = list({post["author_id"] for post in posts if post.get("author_id")})
+            tag_ids = list({tag_id for post in posts for tag_id in post.get("tag_ids") or []})
+            users = {
+                user["_id"]: user
+                async for user in self.db.users.find({"_id": {"$in": author_ids}}, {"name": 1, "avatar_url": 1})
+            }
+            tags = {
+                tag["_id"]: tag
+                async for tag in self.db.tags.find({"_id": {"$in": tag_ids}}, {"name": 1})
+            }
+
+            operations = []
+            for post in posts:
+                update = {"tags": build_tag_summaries(post.get("tag_ids") or [], tags)}
+                user = users.get(post.get("author_id"))
+                if user:
+                    update["author"] = build_author_summary(user)
+                operations.append(UpdateOne({"_id": post["_id"]}, {"$set": update}))
+
+            result = await self.collection.bulk_write(operations, ordered=False)
+            modified += result.modified_count
+            logger.info(f"Backfilled post summaries up to {last_id} ({modified} modified)")
+
+        return modified
+
+    async def _reindex(self, query: dict) -> None:
+        """
+        Refresh this worker's search index entries of posts whose summaries changed
+
+        Other workers pick the new names up through ``summary_updated_at``.
+        """
+        if not post_search.ready:
+            return
+        cursor = self.collection.find(query, POST_PROJECTION)
+        batch = []
+        async for post in cursor.batch_size(BATCH_SIZE):
+            batch.append(post)
+            if len(batch) >= BATCH_SIZE:
+                await post_search.index_posts(self.db, batch)
+                batch = []
+        await post_search.index_posts(self.db, batch)
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 
@@ -11,6 +12,10 @@ from app.models.report import (
     ResolutionModel
 )
 from app.schemas.report import ReportCreate, ReportResolve
+from app.core.loaders import DataLoaders
+from app.core.feed_cache import feed_cache
+from app.core.user_cache import user_cache
+from app.search import post_search, related_posts
 
 
 class ReportService:
@@ -289,9 +294,12 @@ class ReportService:
         reports = await cursor.to_list(length=None)
         return [ReportModel(**report) for report in reports]
 
-    async def get_report_with_details(self, report_id: str) -> Optional[dict]:
+    async def get_report_with_details(self, report_id: str, loaders: DataLoaders) -> Optional[dict]:
         """
         Get report with detailed information about target (post or user)
+
+        Users (reporter, reported user, content author) are resolved through
+        the request's loaders, so they share one query.
         """
         if not ObjectId.is_valid(report_id):
             return None
@@ -306,8 +314,22 @@ class ReportService:
             "target": None
         }
 
+        report_type = report["report_type"]
+        target_id = report["target_id"]
+
+        # Get the target document, users come from the loader
+        if report_type == ReportType.POST:
+            target_lookup = self.posts_collection.find_one({"_id": target_id})
+        elif report_type == ReportType.USER:
+            target_lookup = loaders.load_user(target_id)
+        elif report_type == ReportType.ANSWER:
+            target_lookup = self.answers_collection.find_one({"_id": target_id})
+        else:
+            target_lookup = asyncio.sleep(0)
+
+        reporter, target = await asyncio.gather(loaders.load_user(report["reporter_id"]), target_lookup)
+
         # Get reporter info
-        reporter = await self.users_collection.find_one({"_id": report["reporter_id"]})
         if reporter:
             result["reporter"] = {
                 "id": str(reporter["_id"]),
@@ -315,46 +337,40 @@ class ReportService:
                 "email": reporter.get("email", "")
             }
 
-        # Get target info based on type
-        report_type = report["report_type"]
-        target_id = report["target_id"]
+        if not target:
+            return result
 
+        # Get target info based on type
         if report_type == ReportType.POST:
-            target = await self.posts_collection.find_one({"_id": target_id})
-            if target:
-                author = await self.users_collection.find_one({"_id": target["author_id"]})
-                result["target"] = {
-                    "type": "post",
-                    "id": str(target["_id"]),
-                    "title": target.get("title", ""),
-                    "content": target.get("content", "")[:200],  # Preview
-                    "author_id": str(target["author_id"]),
-                    "author_name": author.get("name", "Unknown") if author else "Unknown",
-                    "is_deleted": target.get("is_deleted", False),
-                    "created_at": target.get("created_at")
-                }
+            author = await loaders.load_user(target["author_id"])
+            result["target"] = {
+                "type": "post",
+                "id": str(target["_id"]),
+                "title": target.get("title", ""),
+                "content": target.get("content", "")[:200],  # Preview
+                "author_id": str(target["author_id"]),
+                "author_name": author.get("name", "Unknown") if author else "Unknown",
+                "is_deleted": target.get("is_deleted", False),
+                "created_at": target.get("created_at")
+            }
         elif report_type == ReportType.USER:
-            target = await self.users_collection.find_one({"_id": target_id})
-            if target:
-                result["target"] = {
-                    "type": "user",
-                    "id": str(target["_id"]),
-                    "name": target.get("name", ""),
-                    "email": target.get("email", ""),
-                    "status": target.get("status", "active"),
-                    "violation_count": target.get("violation_count", 0)
-                }
+            result["target"] = {
+                "type": "user",
+                "id": str(target["_id"]),
+                "name": target.get("name", ""),
+                "email": target.get("email", ""),
+                "status": target.get("status", "active"),
+                "violation_count": target.get("violation_count", 0)
+            }
         elif report_type == ReportType.ANSWER:
-            target = await self.answers_collection.find_one({"_id": target_id})
-            if target:
-                author = await self.users_collection.find_one({"_id": target["author_id"]})
-                result["target"] = {
-                    "type": "answer",
-                    "id": str(target["_id"]),
-                    "content": target.get("content", "")[:200],  # Preview
-                    "author_id": str(target["author_id"]),
-                    "author_name": author.get("name", "Unknown") if author else "Unknown"
-                }
+            author = await loaders.load_user(target["author_id"])
+            result["target"] = {
+                "type": "answer",
+                "id": str(target["_id"]),
+                "content": target.get("content", "")[:200],  # Preview
+                "author_id": str(target["author_id"]),
+                "author_name": author.get("name", "Unknown") if author else "Unknown"
+            }
 
         return result
 
@@ -396,6 +412,9 @@ class ReportService:
                 return_document=True
             )
             if post:
+                post_search.remove_post(target_id)
+                related_posts.remove_post(target_id)
+                feed_cache.invalidate_post(post)
                 action_result["success"] = True
                 action_result["message"] = "Post deleted successfully"
                 action_result["target_author_id"] = str(post["author_id"])
@@ -449,6 +468,7 @@ class ReportService:
                         {"_id": user_to_ban_id},
                         {"$set": update_data}
                     )
+                    user_cache.invalidate(user_to_ban_id)
 
                     action_result["success"] = True
                     action_result["message"] = f"User banned for {ban_duration_str}"
@@ -497,25 +517,3 @@ class ReportService:
             return ActionTaken.NO_ACTION
         else:
             return ActionTaken.NO_ACTION
-
-
-    async def get_user_names(self, user_ids: List[str]) -> dict:
-        """
-        Get names for a list of user IDs
-        Returns map of {user_id: user_name}
-        """
-        if not user_ids:
-            return {}
-            
-        object_ids = [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]
-        
-        if not object_ids:
-            return {}
-            
-        cursor = self.users_collection.find(
-            {"_id": {"$in": object_ids}},
-            {"_id": 1, "name": 1, "email": 1}
-        )
-        
-        users = await cursor.to_list(length=None)
-        return {str(user["_id"]): user.get("name", user.get("email", "Unknown")) for user in users}
@@ -1,9 +1,12 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClientSession
 from bson import ObjectId
 
 from app.models.tag import TagModel
+from app.core.background import run_in_background
+from app.utils.db_helpers import paginate
+from app.services.post_summary_service import PostSummaryService, TAG_SUMMARY_FIELDS
 from app.schemas.tag import TagCreate, TagUpdate
 
 
@@ -16,7 +19,12 @@ class TagService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.tags
 
-    async def create_tag(self, tag_data: TagCreate, user_id: str) -> TagModel:
+    async def create_tag(
+        self,
+        tag_data: TagCreate,
+        user_id: str,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> TagModel:
         """
         Create a new tag
         """
@@ -27,7 +35,7 @@ class TagService:
         tag_dict["post_count"] = 0
         tag_dict["created_by"] = ObjectId(user_id)
 
-        result = await self.collection.insert_one(tag_dict)
+        result = await self.collection.insert_one(tag_dict, session=session)
         tag_dict["_id"] = result.inserted_id
 
         return TagModel(**tag_dict)
@@ -57,18 +65,25 @@ class TagService:
         self,
         skip: int = 0,
         limit: int = 100,
-        search: Optional[str] = None
-    ) -> List[TagModel]:
+        search: Optional[str] = None,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> Tuple[List[TagModel], int]:
         """
         Get list of tags with optional search
+
+        Returns:
+            Tuple of (tags list, total count)
         """
         query = {}
         if search:
             query["name"] = {"$regex": search, "$options": "i"}
 
-        cursor = self.collection.find(query).sort("post_count", -1).skip(skip).limit(limit)
-        tags = await cursor.to_list(length=limit)
-        return [TagModel(**tag) for tag in tags]
+        tags, total, _ = await paginate(
+            self.collection, query, skip, limit,
+            sort=[("post_count", -1)],
+            session=session
+        )
+        return [TagModel(**tag) for tag in tags], total
 
     async def get_tags_by_ids(self, tag_ids: List[str]) -> List[TagModel]:
         """
@@ -82,17 +97,6 @@ class TagService:
         tags = await cursor.to_list(length=len(valid_ids))
         return [TagModel(**tag) for tag in tags]
 
-    async def count_tags(self, search: Optional[str] = None) -> int:
-        """
-        Count total tags
-        """
-        query = {}
-        if search:
-            query["name"] = {"$regex": search, "$options": "i"}
-        
-        count = await self.collection.count_documents(query)
-        return count
-
     async def update_tag(self, tag_id: str, tag_data: TagUpdate) -> Optional[TagModel]:
         """
         Update tag
@@ -109,6 +113,12 @@ class TagService:
         )
 
         if result:
+            # Refresh the tag summary embedded on posts carrying the tag
+            if any(field in update_dict for field in TAG_SUMMARY_FIELDS):
+                run_in_background(
+                    PostSummaryService(self.collection.database).fan_out_tag(tag_id),
+                    f"tag fan-out for tag {tag_id}"
+                )
             return TagModel(**result)
         return None
 
@@ -148,10 +158,14 @@ class TagService:
         )
         return result.modified_count > 0
 
-    async def get_popular_tags(self, limit: int = 20) -> List[TagModel]:
+    async def get_popular_tags(
+        self,
+        limit: int = 20,
+        session: Optional[AsyncIOMotorClientSession] = None
+    ) -> List[TagModel]:
         """
         Get tags sorted by post count (most popular)
         """
-        cursor = self.collection.find().sort("post_count", -1).limit(limit)
+        cursor = self.collection.find({}, session=session).sort("post_count", -1).limit(limit)
         tags = await cursor.to_list(length=limit)
         return [TagModel(**tag) for tag in tags]
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
@@ -6,6 +6,10 @@ from bson import ObjectId
 from app.models.user import UserModel, UserStatus
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
+from app.core.background import run_in_background
+from app.core.user_cache import user_cache
+from app.utils.db_helpers import encode_cursor, decode_cursor
+from app.services.post_summary_service import PostSummaryService, AUTHOR_SUMMARY_FIELDS
 
 
 class UserService:
@@ -53,6 +57,15 @@ class UserService:
             return UserModel(**user)
         return None
     
+    async def get_user_id_by_email(self, email: str) -> Optional[str]:
+        """
+        Get only the ID of the user with an email, e.g. for a bearer token subject
+        """
+        user = await self.collection.find_one({"email": email}, {"_id": 1})
+        if user:
+            return str(user["_id"])
+        return None
+    
     async def get_user_by_username(self, username: str) -> Optional[UserModel]:
         """
         Get user by username
@@ -91,6 +104,13 @@ class UserService:
         )
         
         if result:
+            user_cache.invalidate(user_id)
+            # Refresh the author summary embedded on the user's posts
+            if any(field in update_dict for field in AUTHOR_SUMMARY_FIELDS):
+                run_in_background(
+                    PostSummaryService(self.collection.database).fan_out_author(user_id),
+                    f"author fan-out for user {user_id}"
+                )
             return UserModel(**result)
         return None
     
@@ -102,6 +122,7 @@ class UserService:
             return False
         
         result = await self.collection.delete_one({"_id": ObjectId(user_id)})
+        user_cache.invalidate(user_id)
         return result.deleted_count > 0
     
     async def authenticate_user(self, email: str, password: str) -> Optional[UserModel]:
@@ -194,6 +215,63 @@ class UserService:
             return [str(post_id) for post_id in user["bookmarked_post_ids"]]
         return []
 
+    async def get_bookmark_entries(self, user_id: str) -> List[Tuple[ObjectId, Optional[datetime]]]:
+        """
+        Get a user's bookmarks as (post_id, bookmarked_at) pairs, oldest first
+
+        Users who only have the legacy bookmarked_post_ids list get None
+        timestamps.
+        """
+        if not ObjectId.is_valid(user_id):
+            return []
+
+        user = await self.collection.find_one(
+            {"_id": ObjectId(user_id)},
+            {"bookmarks": 1, "bookmarked_post_ids": 1}
+        )
+        if not user:
+            return []
+        if user.get("bookmarks"):
+            return [(bookmark["post_id"], bookmark.get("created_at")) for bookmark in user["bookmarks"]]
+        return [(post_id, None) for post_id in user.get("bookmarked_post_ids", [])]
+
+    async def get_bookmarks_page(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Tuple[ObjectId, Optional[datetime]]], Optional[str], bool]:
+        """
+        Get one page of a user's bookmarks, most recently bookmarked first
+
+        Pages are keyed on (bookmarked_at, post_id), so removing a bookmark
+        while paging does not shift later pages.
+
+        Returns:
+            Tuple of ((post_id, bookmarked_at) pairs, next_cursor, has_more)
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
+        entries = sorted(
+            await self.get_bookmark_entries(user_id),
+            key=lambda entry: (entry[1] or datetime.min, entry[0]),
+            reverse=True
+        )
+
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, "created_at", -1)
+            last_key = (last_value or datetime.min, last_id)
+            entries = [entry for entry in entries if (entry[1] or datetime.min, entry[0]) < last_key]
+
+        has_more = len(entries) > limit
+        page = entries[:limit]
+        next_cursor = None
+        if has_more and page:
+            post_id, bookmarked_at = page[-1]
+            next_cursor = encode_cursor({"_id": post_id, "created_at": bookmarked_at}, "created_at", -1)
+        return page, next_cursor, has_more
+
     def calculate_ban_duration(self, violation_count: int) -> Optional[timedelta]:
         """
         Calculate ban duration based on violation count
@@ -252,6 +330,7 @@ class UserService:
         )
 
         if updated_user:
+            user_cache.invalidate(user_id)
             return UserModel(**updated_user)
         return None
 
@@ -296,7 +375,7 @@ class UserService:
         if not ObjectId.is_valid(user_id):
             return None
 
-        user = await self.collection.find_one({"_id": ObjectId(user_id)})
+        user = await user_cache.load(db, user_id)
         if not user:
             return None
 
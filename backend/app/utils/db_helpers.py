@@ -1,9 +1,13 @@
 """
 Database helper utilities
 """
-from typing import Optional, List, Dict, Any
-from bson import ObjectId
+from typing import Optional, List, Dict, Any, Tuple
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
 from datetime import datetime
+import base64
+import binascii
+import json
 
 
 def str_to_objectid(id_str: str) -> Optional[ObjectId]:
@@ -143,14 +147,16 @@ class PaginationResult:
         items: List[Any],
         total: int,
         page: int,
-        page_size: int
+        page_size: int,
+        total_is_lower_bound: bool = False
     ):
         self.items = items
         self.total = total
         self.page = page
         self.page_size = page_size
+        self.total_is_lower_bound = total_is_lower_bound
         self.total_pages = (total + page_size - 1) // page_size
-        self.has_next = page < self.total_pages
+        self.has_next = page < self.total_pages or (total_is_lower_bound and len(items) == page_size)
         self.has_prev = page > 1
     
     def to_dict(self) -> Dict[str, Any]:
@@ -161,6 +167,7 @@ class PaginationResult:
             "items": self.items,
             "pagination": {
                 "total": self.total,
+                "total_is_lower_bound": self.total_is_lower_bound,
                 "page": self.page,
                 "page_size": self.page_size,
                 "total_pages": self.total_pages,
@@ -170,13 +177,69 @@ class PaginationResult:
         }
 
 
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    skip: int = 0,
+    limit: int = 20,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    page_stages: Optional[List[Dict[str, Any]]] = None,
+    count_limit: Optional[int] = None,
+    session=None
+) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """
+    Get one page of documents and the total match count in a single round trip
+
+    Runs one aggregation: $match and $sort (which can still use indexes),
+    then a $facet with one branch for the page and one for the count. The
+    count branch still reads every match, so very large collections should
+    use count_limit.
+
+    Args:
+        collection: MongoDB collection
+        query: Query dict
+        skip: Number of documents to skip
+        limit: Page size
+        sort: List of (field, direction) pairs
+        page_stages: Extra stages applied to the page only (e.g. $lookup)
+        count_limit: Estimated total mode; stop counting after this many
+            matches and report the total as a lower bound
+        session: Optional client session
+
+    Returns:
+        Tuple of (documents, total, total_is_lower_bound)
+    """
+    pipeline: List[Dict[str, Any]] = [{"$match": query}]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    cap = None
+    if count_limit is not None:
+        # $facet consumes its whole input, so cap the input itself
+        cap = max(skip + limit, count_limit)
+        pipeline.append({"$limit": cap})
+
+    pipeline.append({"$facet": {
+        "items": [{"$skip": skip}, {"$limit": limit}, *(page_stages or [])],
+        "total": [{"$count": "total"}]
+    }})
+
+    results = await collection.aggregate(pipeline, session=session).to_list(length=1)
+    facet = results[0] if results else {}
+    items = facet.get("items", [])
+    counted = facet["total"][0]["total"] if facet.get("total") else 0
+
+    # Hitting the cap means there may be more matches than were counted
+    return items, counted, cap is not None and counted >= cap
+
+
 async def get_paginated_results(
     collection,
     query: Dict[str, Any],
     page: int = 1,
     page_size: int = 20,
     sort_by: str = "created_at",
-    sort_order: int = -1
+    sort_order: int = -1,
+    count_limit: Optional[int] = None
 ) -> PaginationResult:
     """
     Get paginated results from collection
@@ -188,26 +251,111 @@ async def get_paginated_results(
         page_size: Items per page
         sort_by: Sort field
         sort_order: Sort order (1 or -1)
+        count_limit: Cap the total at this many matches (estimated total mode)
     
     Returns:
         PaginationResult object
     """
-    # Get total count
-    total = await collection.count_documents(query)
-    
-    # Get paginated items
     pagination_params = build_pagination_query(page, page_size, sort_by, sort_order)
-    cursor = collection.find(query).skip(pagination_params["skip"]).limit(pagination_params["limit"])
-    
-    if pagination_params["sort"]:
-        cursor = cursor.sort(pagination_params["sort"])
-    
-    items = await cursor.to_list(length=page_size)
+    items, total, total_is_lower_bound = await paginate(
+        collection,
+        query,
+        skip=pagination_params["skip"],
+        limit=pagination_params["limit"],
+        sort=pagination_params["sort"],
+        count_limit=count_limit
+    )
     
     return PaginationResult(
         items=serialize_documents(items),
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        total_is_lower_bound=total_is_lower_bound
     )
 
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded or does not match the request
+    """
+
+
+def get_field_value(doc: Dict[str, Any], field: str) -> Any:
+    """
+    Get a possibly dotted field (e.g. "votes.score") from a document, None if missing
+    """
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def encode_cursor(doc: Dict[str, Any], sort_by: str, sort_order: int) -> str:
+    """
+    Build an opaque keyset cursor pointing just after a document
+
+    The cursor carries the sort field, direction, the document's value for that
+    field and its _id. Extended JSON keeps datetimes and ObjectIds intact.
+    """
+    payload = {
+        "f": sort_by,
+        "o": sort_order,
+        "v": get_field_value(doc, sort_by),
+        "id": doc["_id"]
+    }
+    raw = json_util.dumps(payload, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: int) -> Tuple[Any, ObjectId]:
+    """
+    Decode a keyset cursor into the (sort value, _id) pair it points after
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was issued for a
+            different sort field or direction
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        last_id = payload["id"]
+        if not isinstance(last_id, ObjectId):
+            last_id = ObjectId(last_id)
+    except (ValueError, KeyError, TypeError, InvalidId, binascii.Error, json.JSONDecodeError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+
+    if payload.get("f") != sort_by or payload.get("o") != sort_order:
+        raise InvalidCursorError("Cursor does not match the requested sort")
+
+    return payload.get("v"), last_id
+
+
+def build_keyset_filter(sort_by: str, sort_order: int, last_value: Any, last_id: ObjectId) -> Dict[str, Any]:
+    """
+    Build the filter selecting documents after (last_value, last_id) in
+    (sort_by, _id) order
+
+    Missing or null sort values sort before every other value, so they come
+    last in descending order and first in ascending order.
+    """
+    if sort_order < 0:
+        if last_value is None:
+            return {sort_by: None, "_id": {"$lt": last_id}}
+        return {"$or": [
+            {sort_by: {"$lt": last_value}},
+            {sort_by: last_value, "_id": {"$lt": last_id}},
+            {sort_by: None}
+        ]}
+
+    if last_value is None:
+        return {"$or": [
+            {sort_by: None, "_id": {"$gt": last_id}},
+            {sort_by: {"$ne": None}}
+        ]}
+    return {"$or": [
+        {sort_by: {"$gt": last_value}},
+        {sort_by: last_value, "_id": {"$gt": last_id}}
+    ]}
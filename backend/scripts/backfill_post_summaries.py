@@ -0,0 +1,51 @@
+"""
+Backfill script for the author and tag summaries embedded on posts
+
+Posts created before the summaries existed resolve their author and tags
+with extra queries on every listing. This script embeds the summaries on
+them in batches. It is safe to interrupt and re-run.
+
+Usage (from the backend directory):
+    python -m scripts.backfill_post_summaries          # only posts missing summaries
+    python -m scripts.backfill_post_summaries --all    # rewrite every post
+"""
+import argparse
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.services.post_summary_service import PostSummaryService, BATCH_SIZE
+
+
+async def main(rewrite_all: bool, batch_size: int):
+    """Main function to backfill post summaries"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    try:
+        await client.admin.command('ping')
+        print("✅ Connected to MongoDB!")
+
+        modified = await PostSummaryService(db).backfill(
+            only_missing=not rewrite_all,
+            batch_size=batch_size
+        )
+        print(f"✅ Backfilled summaries on {modified} posts")
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        raise
+    finally:
+        client.close()
+        print("\n🔌 Disconnected from MongoDB.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Embed author and tag summaries on posts")
+    parser.add_argument("--all", action="store_true", help="Rewrite the summaries of every post")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Posts per bulk write")
+    args = parser.parse_args()
+    asyncio.run(main(args.all, args.batch_size))
@@ -0,0 +1,94 @@
+"""
+Migration script for paginated answer comments
+
+Prepares existing answers for comment previews and moves long threads out
+of the answer documents:
+
+1. Stores comment ids and author ids as ObjectIds (older comments hold strings)
+2. Recounts comment_count on answers whose thread is still embedded and
+   whose count is missing or off (counts written by older code)
+3. Moves every thread with at least --threshold comments to the
+   answer_comments collection, leaving only the newest comments embedded
+
+It is safe to interrupt and re-run.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_answer_comments
+    python -m scripts.migrate_answer_comments --threshold 100
+    python -m scripts.migrate_answer_comments --dry-run
+"""
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+
+from app.core.config import settings
+from app.services.answer_service import AnswerService
+
+
+async def main(threshold: int, dry_run: bool):
+    """Main function to migrate answer comments"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    try:
+        await client.admin.command('ping')
+        print("✅ Connected to MongoDB!")
+
+        string_ids = {"comments": {"$elemMatch": {"$or": [
+            {"id": {"$type": "string"}},
+            {"author_id": {"$type": "string"}}
+        ]}}}
+        embedded_size = {"$size": {"$ifNull": ["$comments", []]}}
+        wrong_count = {"comments_external": {"$ne": True}, "$expr": {"$ne": ["$comment_count", embedded_size]}}
+        large_threads = {"comments_external": {"$ne": True}, f"comments.{threshold - 1}": {"$exists": True}}
+
+        print(f"📋 {await db.answers.count_documents(string_ids)} answers with string comment ids")
+        print(f"📋 {await db.answers.count_documents(wrong_count)} answers with a missing or wrong comment_count")
+        print(f"📋 {await db.answers.count_documents(large_threads)} threads with {threshold}+ comments")
+        if dry_run:
+            return
+
+        result = await db.answers.update_many(string_ids, [{"$set": {"comments": {"$map": {
+            "input": "$comments",
+            "in": {"$mergeObjects": ["$$this", {
+                "id": {"$toObjectId": "$$this.id"},
+                "author_id": {"$toObjectId": "$$this.author_id"}
+            }]}
+        }}}}])
+        print(f"✅ Converted comment ids on {result.modified_count} answers")
+
+        result = await db.answers.update_many(wrong_count, [{"$set": {"comment_count": embedded_size}}])
+        print(f"✅ Recounted comment_count on {result.modified_count} answers")
+
+        await db.answer_comments.create_index(
+            [("answer_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+        )
+        service = AnswerService(db)
+        threads = 0
+        moved = 0
+        async for answer in db.answers.find(large_threads, {"_id": 1}):
+            moved += await service.externalize_comments(answer["_id"])
+            threads += 1
+        print(f"✅ Moved {moved} comments of {threads} threads to answer_comments")
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        raise
+    finally:
+        client.close()
+        print("\n🔌 Disconnected from MongoDB.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare answers for paginated comments")
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=settings.ANSWER_COMMENT_EXTERNAL_THRESHOLD,
+        help="Move threads with at least this many comments"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only count the answers to migrate")
+    args = parser.parse_args()
+    asyncio.run(main(args.threshold, args.dry_run))
@@ -0,0 +1,111 @@
+"""
+Migration script moving answer votes into the answer_votes collection
+
+Answers used to embed the voters in votes.upvoted_by / votes.downvoted_by.
+This script writes one answer_votes document per voter, recounts the
+answer's up/down/score counters from those documents and drops the arrays.
+It is safe to interrupt and re-run: existing vote documents are kept.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_answer_votes
+    python -m scripts.migrate_answer_votes --dry-run
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+
+DUPLICATE_KEY = 11000
+
+
+async def migrate_answer(db, answer: dict) -> int:
+    """Move the embedded voters of one answer, returns the vote documents inserted"""
+    votes = answer.get("votes") or {}
+    now = datetime.utcnow()
+    values = {user_id: -1 for user_id in votes.get("downvoted_by", [])}
+    # A user in both arrays (possible with the old read-modify-write) keeps the upvote
+    values.update({user_id: 1 for user_id in votes.get("upvoted_by", [])})
+
+    inserted = 0
+    if values:
+        try:
+            result = await db.answer_votes.insert_many(
+                [
+                    {
+                        "answer_id": answer["_id"],
+                        "user_id": user_id,
+                        "value": value,
+                        "created_at": answer.get("updated_at", now),
+                        "updated_at": now
+                    }
+                    for user_id, value in values.items()
+                ],
+                ordered=False
+            )
+            inserted = len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Votes already migrated (or cast since) win over the arrays
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+            inserted = e.details["nInserted"]
+
+    counts = {1: 0, -1: 0}
+    async for row in db.answer_votes.aggregate([
+        {"$match": {"answer_id": answer["_id"]}},
+        {"$group": {"_id": "$value", "count": {"$sum": 1}}}
+    ]):
+        counts[row["_id"]] = row["count"]
+
+    await db.answers.update_one(
+        {"_id": answer["_id"]},
+        {
+            "$set": {"votes.up": counts[1], "votes.down": counts[-1], "votes.score": counts[1] - counts[-1]},
+            "$unset": {"votes.upvoted_by": "", "votes.downvoted_by": ""}
+        }
+    )
+    return inserted
+
+
+async def main(dry_run: bool):
+    """Main function to migrate answer votes"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    try:
+        await client.admin.command('ping')
+        print("✅ Connected to MongoDB!")
+
+        legacy = {"$or": [{"votes.upvoted_by": {"$exists": True}}, {"votes.downvoted_by": {"$exists": True}}]}
+        pending = await db.answers.count_documents(legacy)
+        print(f"📋 {pending} answers still embed their voters")
+        if dry_run or pending == 0:
+            return
+
+        # The unique index must exist before inserting, it is what deduplicates re-runs
+        await db.answer_votes.create_index([("answer_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+
+        answers = 0
+        inserted = 0
+        async for answer in db.answers.find(legacy, {"votes": 1, "updated_at": 1}):
+            inserted += await migrate_answer(db, answer)
+            answers += 1
+        print(f"✅ Migrated {answers} answers, {inserted} vote documents inserted")
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        raise
+    finally:
+        client.close()
+        print("\n🔌 Disconnected from MongoDB.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded answer voters into answer_votes")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the answers to migrate")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -426,6 +426,7 @@ async def clear_collections(db):
     await db.tags.delete_many({})
     await db.posts.delete_many({})
     await db.answers.delete_many({})
+    await db.answer_votes.delete_many({})
     print("✅ Collections cleared!")
 
 
@@ -520,14 +521,18 @@ async def seed_posts(db, user_ids, tag_ids):
         author_id = user_ids[author_email]
         
         # Get tag IDs for this post
-        post_tag_ids = [tag_ids[tag_name] for tag_name in post["tags"] if tag_name in tag_ids]
+        post_tag_names = [tag_name for tag_name in post["tags"] if tag_name in tag_ids]
+        post_tag_ids = [tag_ids[tag_name] for tag_name in post_tag_names]
+        author = next(u for u in USERS if u["email"] == author_email)
         
         post_doc = {
             "title": post["title"],
             "content": post["content"],
             "author_id": author_id,
+            "author": {"_id": author_id, "name": author["name"], "avatar_url": author["avatar_url"]},
             "category": post["category"],
             "tag_ids": post_tag_ids,
+            "tags": [{"_id": tag_ids[tag_name], "name": tag_name} for tag_name in post_tag_names],
             "answer_count": 0,
             "view_count": random.randint(10, 500),
             "is_deleted": False,
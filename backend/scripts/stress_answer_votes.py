@@ -0,0 +1,128 @@
+"""
+Concurrency stress test for answer voting
+
+Creates a throwaway answer, lets hundreds of simulated users vote on it at
+the same time (each user toggling a random sequence of up/down votes), and
+checks that the answer_votes documents and the answer's up/down/score
+counters match what every user's own vote sequence implies. Run it against
+a development database; the answer and its votes are deleted afterwards.
+
+Usage (from the backend directory):
+    python -m scripts.stress_answer_votes
+    python -m scripts.stress_answer_votes --voters 500 --votes-per-voter 5
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+
+from app.core.config import settings
+from app.services.answer_service import AnswerService
+
+
+def expected_vote(sequence):
+    """Replay one user's votes with the toggle rules, returns 1, -1 or 0"""
+    state = 0
+    for is_upvote in sequence:
+        wanted = 1 if is_upvote else -1
+        state = 0 if state == wanted else wanted
+    return state
+
+
+async def main(voters: int, votes_per_voter: int, seed: int):
+    """Main function to run the voting stress test"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL, maxPoolSize=max(voters, 100))
+    db = client[settings.MONGODB_DB_NAME]
+    service = AnswerService(db)
+    rng = random.Random(seed)
+
+    # The unique index is what keeps concurrent first votes of a user to one document
+    await db.answer_votes.create_index([("answer_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+
+    answer_id = ObjectId()
+    author_id = ObjectId()
+    await db.answers.insert_one({
+        "_id": answer_id,
+        "post_id": ObjectId(),
+        "author_id": author_id,
+        "content": "Vote stress test answer",
+        "is_accepted_solution": False,
+        "votes": {"up": 0, "down": 0, "score": 0},
+        "comments": [],
+        "is_deleted": False,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    })
+
+    users = {str(ObjectId()): [rng.random() < 0.7 for _ in range(votes_per_voter)] for _ in range(voters)}
+
+    async def vote_as(user_id, sequence):
+        for is_upvote in sequence:
+            await service.vote_answer(str(answer_id), user_id, is_upvote)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(vote_as(user_id, sequence) for user_id, sequence in users.items()))
+        elapsed = time.perf_counter() - started
+
+        # The author's own vote must be rejected
+        assert await service.vote_answer(str(answer_id), str(author_id), True) is None
+
+        answer = await db.answers.find_one({"_id": answer_id})
+        votes = answer["votes"]
+        stored = await db.answer_votes.find({"answer_id": answer_id}).to_list(length=None)
+        voter_ids = [str(vote["user_id"]) for vote in stored]
+        upvoted = {str(vote["user_id"]) for vote in stored if vote["value"] == 1}
+        downvoted = {str(vote["user_id"]) for vote in stored if vote["value"] == -1}
+
+        expected = {user_id: expected_vote(sequence) for user_id, sequence in users.items()}
+        expected_up = {user_id for user_id, vote in expected.items() if vote == 1}
+        expected_down = {user_id for user_id, vote in expected.items() if vote == -1}
+
+        total_votes = voters * votes_per_voter
+        print(f"{total_votes} votes from {voters} concurrent voters in {elapsed:.2f}s "
+              f"({total_votes / elapsed:.0f} votes/s)")
+        print(f"Vote documents: {len(upvoted)} up, {len(downvoted)} down")
+        print(f"Counters: {votes['up']} up, {votes['down']} down, score {votes['score']}")
+        print(f"Expected: {len(expected_up)} up, {len(expected_down)} down, "
+              f"score {len(expected_up) - len(expected_down)}")
+
+        problems = []
+        if len(voter_ids) != len(set(voter_ids)):
+            problems.append("duplicate vote documents")
+        if upvoted != expected_up:
+            problems.append("upvoters differ")
+        if downvoted != expected_down:
+            problems.append("downvoters differ")
+        if (votes["up"], votes["down"]) != (len(expected_up), len(expected_down)):
+            problems.append("counters differ")
+        if votes["score"] != len(expected_up) - len(expected_down):
+            problems.append("score differs")
+        for user_id in list(expected)[:20]:
+            my_votes = await service.get_my_votes([answer_id], user_id)
+            if my_votes.get(str(answer_id), 0) != expected[user_id]:
+                problems.append("my_votes lookup differs")
+                break
+
+        if problems:
+            print(f"❌ FAILED: {', '.join(problems)}")
+            raise SystemExit(1)
+        print("✅ Final votes and counters are correct")
+    finally:
+        await db.answers.delete_one({"_id": answer_id})
+        await db.answer_votes.delete_many({"answer_id": answer_id})
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress test concurrent answer votes")
+    parser.add_argument("--voters", type=int, default=300, help="Concurrent voting users")
+    parser.add_argument("--votes-per-voter", type=int, default=3, help="Votes cast by each user, in order")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the vote sequences")
+    args = parser.parse_args()
+    asyncio.run(main(args.voters, args.votes_per_voter, args.seed))
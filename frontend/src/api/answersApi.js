@@ -83,6 +83,30 @@ export const voteAnswer = async (token, answerId, isUpvote) => {
   return data;
 };
 
+/**
+ * Get a page of an answer's comments, newest first
+ */
+export const getAnswerComments = async (answerId, params = {}) => {
+  const queryParams = new URLSearchParams();
+  if (params.limit) queryParams.append('limit', params.limit);
+  if (params.cursor) queryParams.append('cursor', params.cursor);
+
+  const response = await fetch(`${API_URL}/answers/${answerId}/comments?${queryParams.toString()}`, {
+    method: 'GET',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+  });
+
+  const data = await response.json();
+
+  if (!response.ok) {
+    throw new Error(data.detail || 'Failed to fetch comments');
+  }
+
+  return data;
+};
+
 /**
  * Add a comment to an answer
  */
@@ -4,6 +4,38 @@ import axiosInstance from './axiosConfig';
  * API endpoints cho tính năng AI Diagnosis
  */
 
+// Phân tích và tạo câu hỏi chạy nền: chờ kết quả bằng long polling
+const POLL_WAIT_SECONDS = 20;
+const POLL_MAX_ROUNDS = 15;
+
+/**
+ * Chờ đến khi một bước chạy nền của chẩn đoán hoàn tất
+ * @param {string} diagnosisId - ID chẩn đoán
+ * @param {string} token - Token xác thực
+ * @param {string} field - 'status' (phân tích) hoặc 'questions_status' (tạo câu hỏi)
+ * @returns {Promise} - Chẩn đoán sau khi bước đó hoàn tất
+ */
+export const waitForDiagnosis = async (diagnosisId, token, field = 'status') => {
+  for (let round = 0; round < POLL_MAX_ROUNDS; round++) {
+    const diagnosis = await axiosInstance.get(`/diagnoses/${diagnosisId}/`, {
+      params: { wait: POLL_WAIT_SECONDS },
+      // The server holds the request for up to POLL_WAIT_SECONDS
+      timeout: (POLL_WAIT_SECONDS + 10) * 1000,
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+
+    if (diagnosis[field] === 'failed') {
+      throw new Error(`Diagnosis ${field} failed`);
+    }
+    if (diagnosis[field] !== 'pending') {
+      return diagnosis;
+    }
+  }
+  throw new Error('Timed out waiting for the diagnosis');
+};
+
 /**
  * Tạo chẩn đoán mới
  * @param {Object} data - Dữ liệu chẩn đoán
@@ -15,7 +47,7 @@ import axiosInstance from './axiosConfig';
  * @param {string} data.level - Trình độ học viên (N5-N1)
  * @param {string} data.age - Độ tuổi học viên
  * @param {string} token - Token xác thực
- * @returns {Promise} - Kết quả chẩn đoán
+ * @returns {Promise} - Kết quả chẩn đoán (sau khi phân tích chạy nền hoàn tất)
  * 
  * Expected Response:
  * {
@@ -83,7 +115,18 @@ export const createDiagnosis = async (data, token) => {
 
   // Note: axiosConfig.js response interceptor already returns response.data
   // so 'response' here is already the data object
-  return response;
+  const diagnosis = await waitForDiagnosis(response._id, token);
+  const points = diagnosis.ai_result?.misunderstanding_points || [];
+  const suggestions = diagnosis.ai_result?.suggestions || [];
+
+  // Empty results are left undefined so the page shows its defaults
+  return {
+    ...response,
+    status: diagnosis.status,
+    difficulty_points: points.length ? points : undefined,
+    difficulty_level: points.length > 2 ? 'high' : points.length ? 'medium' : undefined,
+    suggestions: suggestions.length ? suggestions : undefined,
+  };
 };
 
 /**
@@ -199,7 +242,7 @@ export const deleteDiagnosis = async (diagnosisId, token) => {
  * @param {string} diagnosisId - ID chẩn đoán
  * @param {number} numQuestions - Number of questions to generate (default: 5)
  * @param {string} token - Token xác thực
- * @returns {Promise} - Diagnosis with generated questions
+ * @returns {Promise} - Diagnosis with generated questions (sau khi tạo câu hỏi chạy nền hoàn tất)
  * 
  * Expected Response:
  * {
@@ -227,7 +270,7 @@ export const generateQuestions = async (diagnosisId, numQuestions = 5, token) =>
     }
   );
 
-  return response;
+  return waitForDiagnosis(response.diagnosis_id, token, 'questions_status');
 };
 
 /**
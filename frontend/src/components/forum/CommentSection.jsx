@@ -1,8 +1,8 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { useTranslation } from 'react-i18next';
 import { useAuth } from '../../contexts/AuthContext';
 import { useToast } from '../../contexts/ToastContext';
-import { addComment, deleteComment } from '../../api/answersApi';
+import { addComment, deleteComment, getAnswerComments } from '../../api/answersApi';
 import { Button, Input } from '../ui';
 import { ReportButton, UserInfoPopup } from '../forum';
 import { formatDateTime } from '../../utils/formatters';
@@ -10,13 +10,46 @@ import './CommentSection.css';
 
 /**
  * CommentSection Component - Hiển thị và quản lý comments cho một answer
+ *
+ * Answers only carry their newest comments; older ones are loaded page by page.
  */
-const CommentSection = ({ answerId, comments = [], onCommentAdded, onCommentDeleted }) => {
+const CommentSection = ({ answerId, comments = [], commentCount, onCommentAdded, onCommentDeleted }) => {
   const { t, i18n } = useTranslation();
   const { token, isAuthenticated, user } = useAuth();
   const toast = useToast();
   const [newComment, setNewComment] = useState('');
   const [isSubmitting, setIsSubmitting] = useState(false);
+  // null while showing the preview embedded in the answer
+  const [loadedComments, setLoadedComments] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+
+  // The answer was reloaded (comment added/deleted): back to its preview
+  useEffect(() => {
+    setLoadedComments(null);
+    setNextCursor(null);
+  }, [comments]);
+
+  const total = commentCount ?? comments.length;
+  const shownComments = loadedComments ?? comments;
+  const hasOlder = loadedComments ? Boolean(nextCursor) : total > comments.length;
+
+  const handleLoadOlder = async () => {
+    if (isLoadingOlder) return;
+
+    setIsLoadingOlder(true);
+    try {
+      // The first page replaces the preview, later pages go before it
+      const page = await getAnswerComments(answerId, { cursor: loadedComments ? nextCursor : undefined });
+      const older = [...page.comments].reverse();
+      setLoadedComments(loadedComments ? [...older, ...loadedComments] : older);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Failed to load comments:', error);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -55,7 +88,7 @@ const CommentSection = ({ answerId, comments = [], onCommentAdded, onCommentDele
   return (
     <div className="comment-section">
       <h4 className="comment-section-title">
-        {t('comment.title')} ({comments.length})
+        {t('comment.title')} ({total})
       </h4>
 
       {isAuthenticated && (
@@ -75,10 +108,15 @@ const CommentSection = ({ answerId, comments = [], onCommentAdded, onCommentDele
       )}
 
       <div className="comments-list">
-        {comments.length === 0 ? (
+        {hasOlder && (
+          <button onClick={handleLoadOlder} className="comment-load-older" disabled={isLoadingOlder}>
+            {t('comment.load_older')}
+          </button>
+        )}
+        {shownComments.length === 0 ? (
           <p className="no-comments">{t('comment.no_comments')}</p>
         ) : (
-          comments.map((comment) => (
+          shownComments.map((comment) => (
             <div key={comment.id} className="comment-item">
               <div className="comment-header">
                 {/* Avatar */}
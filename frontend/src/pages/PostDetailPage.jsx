@@ -112,16 +112,13 @@ const PostDetailPage = () => {
   };
 
 
+  // my_vote is the signed-in user's own vote: 1, -1 or 0
   const isAnswerUpvoted = (answer) => {
-    if (!user || !answer.votes?.upvoted_by) return false;
-    const userId = user._id || user.id;
-    return answer.votes.upvoted_by.some(id => String(id) === String(userId));
+    return Boolean(user) && answer.my_vote === 1;
   };
 
   const isAnswerDownvoted = (answer) => {
-    if (!user || !answer.votes?.downvoted_by) return false;
-    const userId = user._id || user.id;
-    return answer.votes.downvoted_by.some(id => String(id) === String(userId));
+    return Boolean(user) && answer.my_vote === -1;
   };
 
   const isBookmarked = () => {
@@ -276,6 +273,7 @@ const PostDetailPage = () => {
                       <CommentSection
                         answerId={answer._id}
                         comments={answer.comments || []}
+                        commentCount={answer.comment_count}
                         onCommentAdded={fetchAnswers}
                         onCommentDeleted={fetchAnswers}
                       />
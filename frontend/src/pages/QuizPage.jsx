@@ -242,6 +242,11 @@ const QuizPage = () => {
                                             {fb.explanation && (
                                                 <div className="feedback-explanation">💡 {fb.explanation}</div>
                                             )}
+                                            {fb.evaluated === false && (
+                                                <div className="feedback-explanation">
+                                                    ⚠️ {t('quiz.not_graded', '採点できませんでした。もう一度お試しください。')}
+                                                </div>
+                                            )}
                                         </div>
                                     ))}
                                 </div>